@@ -0,0 +1,96 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Batch job framework for Equinox management commands
+
+A batch command does all its work inside run() so that importing the module (test collection,
+manage.py help etc.) has no side effects. All commands share a common set of arguments:
+
+* --chunk-size the number of rows per database batch
+* --dry-run run the job but roll back all database changes (and skip writing output files)
+
+Work can be split into named stages whose timing is reported at the end of the run. Jobs that
+load data add the number of rows written to self.rows and the load throughput is reported as well.
+
+"""
+
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class BatchCommand(BaseCommand):
+    """
+    Base class for management commands that run a batch (ETL) job
+
+    Subclasses implement run() and optionally add_job_arguments() for job specific arguments
+
+    """
+
+    chunk_size = 10000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=self.chunk_size,
+                            help='Number of rows per database batch')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Run the job but roll back all database changes')
+        self.add_job_arguments(parser)
+
+    def add_job_arguments(self, parser):
+        pass
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a named stage of the job
+
+        """
+        start_time = time.time()
+        yield
+        self.timings.append((name, time.time() - start_time))
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.timings = []
+        self.rows = 0
+
+        start_time = time.time()
+        with transaction.atomic():
+            self.run(*args, **options)
+            if self.dry_run:
+                transaction.set_rollback(True)
+        total_time = time.time() - start_time
+
+        if self.verbosity > 0:
+            for name, elapsed in self.timings:
+                self.stdout.write('> %s: %.3f seconds' % (name, elapsed))
+            self.stdout.write('> Execution Time: %.3f seconds' % total_time)
+            if self.rows:
+                self.stdout.write('> Rows: %d (%.0f rows/sec)' % (self.rows, self.rows / max(total_time, 1e-9)))
+            if self.dry_run:
+                self.stdout.write(self.style.WARNING('Dry run: all database changes rolled back'))
+
+    def run(self, *args, **options):
+        raise NotImplementedError('subclasses of BatchCommand must provide a run() method')
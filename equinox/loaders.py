@@ -0,0 +1,182 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Bulk loading of reference and portfolio data
+
+Model instances are streamed from any iterable and written in batches with bulk_create. When
+unique fields are given, existing rows are updated in place (upsert) so that a refresh of a
+reference dataset does not create duplicates. Loaders are meant to run inside the transaction
+of a BatchCommand so a failed load leaves the database unchanged.
+
+CSV files are loaded with CSVLoader subclasses that declare how CSV columns map onto model fields.
+The file is read in chunks, columns are transformed with vectorized pandas operations and foreign
+keys are resolved against a dictionary fetched with a single query per related model.
+
+"""
+
+from itertools import islice
+
+import pandas as pd
+
+from equinox.versions import touch
+
+
+def batched(iterable, size):
+    """
+    Split an iterable into lists of at most size elements
+
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_load(model, objects, batch_size=10000, unique_fields=None, update_fields=None):
+    """
+    Insert model instances in batches
+
+    :param model: the django model
+    :param objects: an iterable of (unsaved) model instances
+    :param batch_size: the number of rows per INSERT statement
+    :param unique_fields: fields identifying a row, matching rows are updated instead of inserted (upsert)
+    :param update_fields: the fields to update on a match (default: all concrete non key fields)
+    :return: the number of rows loaded
+    """
+    if unique_fields and update_fields is None:
+        update_fields = [f.name for f in model._meta.concrete_fields
+                         if not f.primary_key and f.name not in unique_fields]
+
+    count = 0
+    for batch in batched(objects, batch_size):
+        if unique_fields:
+            # A statement cannot update the same row twice, the last occurrence of a key wins
+            unique = {}
+            for obj in batch:
+                unique[tuple(getattr(obj, name) for name in unique_fields)] = obj
+            batch = list(unique.values())
+            model.objects.bulk_create(batch, update_conflicts=True, unique_fields=unique_fields,
+                                      update_fields=update_fields)
+        else:
+            model.objects.bulk_create(batch)
+        count += len(batch)
+    # bulk_create sends no signals
+    touch(model)
+    return count
+
+
+class ForeignKey:
+    """
+    A foreign key field loaded from a CSV column
+
+    :param column: the CSV column holding the key
+    :param model: the related model
+    :param to_field: the related model field matching the column values (default: the primary key)
+    :param required: whether unmatched (non empty) keys are an error, otherwise they are set to None
+    """
+
+    def __init__(self, column, model, to_field='pk', required=True):
+        self.column = column
+        self.model = model
+        self.to_field = to_field
+        self.required = required
+
+    def mapping(self):
+        return dict(self.model.objects.values_list(self.to_field, 'pk'))
+
+
+class CSVLoader:
+    """
+    Declarative loader of a CSV file into a model
+
+    Subclasses declare:
+
+    * model: the model to load
+    * columns: a dictionary of model field names to CSV column names
+    * foreign_keys: a dictionary of model field names to ForeignKey declarations
+    * constants: a dictionary of model field names to constant values
+
+    and may override normalize() to transform or derive columns of each chunk before the mapping is applied.
+    Empty CSV values are stored as None in nullable fields.
+
+    """
+
+    model = None
+    columns = {}
+    foreign_keys = {}
+    constants = {}
+    delimiter = ','
+
+    def normalize(self, chunk):
+        """
+        Vectorized transformation of a chunk of CSV rows (the chunk index is the row number in the file)
+
+        """
+        return chunk
+
+    def resolve(self):
+        return {field: fk.mapping() for field, fk in self.foreign_keys.items()}
+
+    def frame(self, chunk, mappings):
+        """
+        Map a chunk of CSV rows onto a dataframe of model field values
+
+        """
+        chunk = self.normalize(chunk)
+        data = {field: chunk[column] for field, column in self.columns.items()}
+        for field, fk in self.foreign_keys.items():
+            keys = chunk[fk.column]
+            values = keys.map(mappings[field])
+            unmatched = values.isna() & keys.notna()
+            if fk.required and unmatched.any():
+                raise ValueError('%s: no %s matching %s' % (
+                    fk.column, fk.model.__name__, ', '.join(map(str, keys[unmatched].unique()[:10]))))
+            data[self.model._meta.get_field(field).attname] = values
+        frame = pd.DataFrame(data, index=chunk.index)
+        for field, value in self.constants.items():
+            frame[field] = value
+
+        frame = frame.astype(object)
+        for name in frame.columns:
+            if self.model._meta.get_field(name).null:
+                frame[name] = frame[name].where(frame[name].notna(), None)
+        return frame
+
+    def objects(self, path, chunk_size=10000):
+        """
+        Stream the model instances of a CSV file
+
+        """
+        mappings = self.resolve()
+        for chunk in pd.read_csv(path, header='infer', delimiter=self.delimiter, chunksize=chunk_size):
+            for record in self.frame(chunk, mappings).to_dict('records'):
+                yield self.model(**record)
+
+    def load(self, path, chunk_size=10000):
+        """
+        Load a CSV file into the database
+
+        :return: the number of rows loaded
+        """
+        return bulk_load(self.model, self.objects(path, chunk_size), batch_size=chunk_size)
@@ -0,0 +1,94 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Database held data versions for cache keys
+
+Cached views of database tables are keyed by a version counter per table held in the database
+(start.models.DataVersion) rather than by a counter in the cache. The cache is per process unless a
+shared backend is configured, so a counter bumped by a management command or by another worker
+would not be seen; the database counters are seen by every process and reading them costs a
+single indexed query, whatever the size of the tables.
+
+Counters are bumped once the transaction of a change commits (so rolled back changes never
+invalidate anything). Saves and deletes of tracked models bump their table through signals
+(see track); writers that bypass the signals (bulk_create, bulk_update, queryset.update) call
+touch explicitly, as equinox.loaders.bulk_load does.
+
+"""
+
+import threading
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+
+from start.models import DataVersion
+
+_pending = threading.local()
+
+
+def bump(labels):
+    for label in sorted(labels):
+        if not DataVersion.objects.filter(label=label).update(version=F('version') + 1):
+            DataVersion.objects.get_or_create(label=label, defaults={'version': 1})
+
+
+def flush():
+    labels = getattr(_pending, 'labels', None)
+    if labels:
+        _pending.labels = set()
+        bump(labels)
+
+
+def touch(*models):
+    """
+    Bump the versions of the tables of some models once the current transaction commits
+
+    """
+    if not hasattr(_pending, 'labels'):
+        _pending.labels = set()
+    _pending.labels.update(model._meta.label for model in models)
+    # every change registers a flush; the first one to run after the commit does the work
+    transaction.on_commit(flush)
+
+
+def touch_sender(sender, **kwargs):
+    touch(sender)
+
+
+def track(*models):
+    """
+    Bump the version of the tables of some models on every save and delete
+
+    """
+    for model in models:
+        post_save.connect(touch_sender, sender=model, dispatch_uid='data_version_save_%s' % model._meta.label)
+        post_delete.connect(touch_sender, sender=model, dispatch_uid='data_version_delete_%s' % model._meta.label)
+
+
+def table_version(*models):
+    """
+    A short version string of the current state of a set of tables (one indexed query)
+
+    """
+    labels = [model._meta.label for model in models]
+    versions = dict(DataVersion.objects.filter(label__in=labels).values_list('label', 'version'))
+    return '-'.join(str(versions.get(label, 0)) for label in labels)
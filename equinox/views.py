@@ -18,6 +18,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from django.db import transaction
+from django.utils.http import parse_etags
 from rest_framework import permissions
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
@@ -25,12 +27,8 @@ from rest_framework.response import Response
 from rest_framework.reverse import reverse
 
 from equinox.serializers import ScorecardSerializer, ScorecardDetailSerializer
-from portfolio.Contractor import Contractor
-from portfolio.Loan import Loan
-from portfolio.Operator import Operator
-from portfolio.Revenue import Revenue
-from portfolio.Sponsor import Sponsor
-from portfolio.Stakeholders import Stakeholders
+from risk import concentration, scorecards
+from risk.scoring import score_borrowers
 from risk.Scorecard import Scorecard
 
 
@@ -46,6 +44,14 @@ def api_root(request, _format=None):
         {'Scorecard Data Endpoints':
             [
                 {'scorecard': reverse('portfolio:scorecard_api', request=request, format=_format)},
+                {'scorecard_bulk': reverse('portfolio:scorecard_bulk', request=request, format=_format)},
+            ]},
+        {'Risk Endpoints':
+            [
+                {'sme_scores': reverse('portfolio:sme_scores', request=request, format=_format)},
+                # the portfolio id placeholder of the concentration snapshot
+                {'concentration': reverse('portfolio:concentration_snapshot', kwargs={'portfolio': 0}, request=request,
+                                          format=_format).replace('/0/', '/{portfolio}/')},
             ]},
     ]
 
@@ -74,56 +80,85 @@ def scorecard_detail(request, pk):
         """
         try:
             scorecard = Scorecard.objects.get(pk=pk)
-            # Get all the scorecard data from the various models
-            project_company = scorecard.project_company
-            project = project_company.project
-            revenue = Revenue.objects.filter(project_company=project_company).first()
-            sponsor = Sponsor.objects.filter(project_company=project_company).first()
-            operator = Operator.objects.filter(project_company=project_company).first()
-            contractor = Contractor.objects.filter(project_company=project_company).first()
-            stakeholders = Stakeholders.objects.filter(project_company=project_company).first()
-            loan = Loan.objects.filter(project_company=project_company).first()
-
-            scorecard_data = {
-                "1.1": revenue.market_conditions,
-                "1.2": project_company.financial_ratios,
-                "1.3": revenue.stress_analysis,
-                "1.4.1": project_company.refinancing_risk,
-                "1.4.2": loan.amortisation_schedule,
-                "1.4.3": loan.foreign_exchange_risk,
-                "2.1": stakeholders.political_risk,
-                "2.2": stakeholders.force_majeure_risk,
-                "2.3": stakeholders.government_support,
-                "2.4": stakeholders.legal_and_regulatory_risk,
-                "2.5": stakeholders.project_approval_risk,
-                "2.6": stakeholders.legal_regime,
-                "3.1": project.design_and_technology_risk,
-                "3.2.1": contractor.permitting_and_siting,
-                "3.2.2": contractor.type_of_construction_contract,
-                "3.2.3": project.completion_risk,
-                "3.2.4": contractor.completion_guarantees_and_liquidated_damages,
-                "3.2.5": contractor.contractor_track_record,
-                "3.3.1": operator.o_and_m_contract,
-                "3.3.2": operator.operator_track_record,
-                "3.4.1": revenue.revenue_contract_robustness,
-                "3.4.2": revenue.offtake_contract_case,
-                "3.4.3": revenue.no_offtake_contract_case,
-                "3.5.1": revenue.supply_cost_risks,
-                "3.5.2": revenue.reserve_risk,
-                "4.1": sponsor.sponsor_financial_strength,
-                "4.2": sponsor.sponsor_track_record,
-                "4.3": sponsor.sponsor_support,
-                "5.1": project_company.assignment_of_contracts_and_accounts,
-                "5.2": project_company.pledge_of_assets,
-                "5.3": project_company.control_over_cash_flow,
-                "5.4": project_company.covenant_package,
-                "5.5": project_company.reserve_funds
-            }
-            scorecard.scorecard_data = scorecard_data
-            scorecard.save()
-
         except Scorecard.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
+        # Assemble the scorecard data from the various models (saved only if changed)
+        scorecards.refresh([scorecard])
         serializer = ScorecardDetailSerializer(scorecard)
         return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes((permissions.AllowAny,))
+def scorecard_bulk(request):
+    """
+    List the data of many Scorecards in JSON Format (?ids=1,2,3)
+
+    Responses are cached until the scorecard inputs change and carry an ETag for conditional GET
+
+    """
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip()]
+    except ValueError:
+        return Response({'error': 'ids must be a comma separated list of integers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    etag, data = scorecards.get_scorecards(
+        ids, lambda objects: ScorecardDetailSerializer(objects, many=True).data)
+    # weak comparison of the listed entity tags (RFC 9110 13.1.2)
+    if_none_match = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+    if '*' in if_none_match or etag in if_none_match:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(data, headers={'ETag': etag})
+
+
+@api_view(['POST'])
+@permission_classes((permissions.IsAuthenticated,))
+def sme_scores(request):
+    """
+    Compute SME z-score probabilities of default for the borrowers of a portfolio
+
+    Expects {"weights": [intercept, w1, ..., w5], "portfolio": id} and returns the total, scored
+    and unscored borrower counts. Scoring the whole book is a batch job (score_sme command)
+
+    """
+    try:
+        weights = [float(w) for w in request.data['weights']]
+        portfolio = int(request.data['portfolio'])
+        if len(weights) != 6:
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        return Response({'error': 'weights must be a list of six numbers and portfolio an integer'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        result = score_borrowers(weights, portfolio=portfolio)
+    return Response(result)
+
+
+@api_view(['GET'])
+@permission_classes((permissions.IsAuthenticated,))
+def concentration_snapshot(request, portfolio):
+    """
+    The concentration measures of a portfolio along a dimension (?dimension=Obligor_ID&n=5)
+
+    Served from the concentration tracker of the worker handling the request, ?reconcile=1
+    rebuilds the tracker from the database first (staff users only, otherwise use the
+    reconcile_concentration command)
+
+    """
+    dimension = request.GET.get('dimension', 'Obligor_ID')
+    try:
+        n = int(request.GET.get('n', 5))
+        if dimension not in concentration.DIMENSIONS or n < 1:
+            raise ValueError
+    except ValueError:
+        return Response({'error': 'dimension must be one of %s and n a positive integer' %
+                                  ', '.join(concentration.DIMENSIONS)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.GET.get('reconcile'):
+        if not request.user.is_staff:
+            return Response({'error': 'reconcile is restricted to staff users'}, status=status.HTTP_403_FORBIDDEN)
+        concentration.tracker.reconcile()
+    return Response(concentration.tracker.snapshot(portfolio, dimension, n=n))
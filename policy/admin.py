@@ -28,6 +28,7 @@ from policy.models import DashBoardParams
 from policy.models import DataFlow
 from policy.models import DataSeries
 from policy.models import GeoSlice
+from policy.models import SeriesMetrics
 
 actions = ['export2json', 'export2xml']
 
@@ -72,6 +73,12 @@ class GeoSliceAdmin(admin.ModelAdmin):
     save_as = True
 
 
+class SeriesMetricsAdmin(admin.ModelAdmin):
+    list_display = ('series', 'agg_level', 'activity', 'df_name', 'min_value', 'max_value', 'mean', 'latest')
+    list_filter = ('agg_level', 'activity')
+    raw_id_fields = ('series',)
+
+
 class DashboardParamsAdmin(admin.ModelAdmin):
     formfield_overrides = {
         JSONField: {'widget': JSONEditorWidget(attrs={'initiaĺ': 'parsed'})},
@@ -82,4 +89,5 @@ class DashboardParamsAdmin(admin.ModelAdmin):
 admin.site.register(DataSeries, DataSeriesAdmin)
 admin.site.register(DataFlow, DataFlowAdmin)
 admin.site.register(GeoSlice, GeoSliceAdmin)
+admin.site.register(SeriesMetrics, SeriesMetricsAdmin)
 admin.site.register(DashBoardParams, DashboardParamsAdmin)
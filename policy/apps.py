@@ -23,3 +23,7 @@ from django.apps import AppConfig
 
 class PolicyConfig(AppConfig):
     name = 'policy'
+
+    def ready(self):
+        from policy import regions
+        regions.connect_signals()
@@ -0,0 +1,155 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+from django.core.cache import cache
+
+from policy.models import DataSeries, PolicyCube
+from policy.settings import activities_short
+from policy.timeseries import unpack_series, iso_dates
+
+"""
+Dense (country x date) policy cubes
+
+The dataseries of an activity are aligned on a common daily date axis into a dense float32 array
+with one row per country (dataflow) and NaN for missing observations. Cubes are stored compressed
+in a PolicyCube row and rebuilt incrementally: only the series of countries whose dataseries changed
+(by last_change_date) are loaded, the rows of the other countries are carried over.
+
+The cube payload (aligned dates, values with null for missing observations and cross-country
+statistics per date) is cached under the cube last_change_date and served gzip compressed.
+
+"""
+
+# identifiers per query (below the SQLite host parameter limit)
+ID_BATCH_SIZE = 900
+
+
+def version(changed):
+    return changed.isoformat() if changed else ''
+
+
+def load_rows(pks):
+    """
+    The record arrays of a list of dataseries, keyed by dataflow name
+
+    """
+    rows = {}
+    for start in range(0, len(pks), ID_BATCH_SIZE):
+        for df_name, blob in DataSeries.objects.filter(pk__in=pks[start:start + ID_BATCH_SIZE]) \
+                .order_by('pk').values_list('df_name', 'series_data'):
+            rows[df_name] = unpack_series(blob)
+    return rows
+
+
+def build(activity, agg_level='Country'):
+    """
+    Build or incrementally update the cube of an activity
+
+    :return: (cube, number of reloaded countries)
+    """
+    cube = PolicyCube.objects.filter(activity=activity, agg_level=agg_level).first() or \
+        PolicyCube(activity=activity, agg_level=agg_level)
+    current = {}
+    for pk, df_name, changed in DataSeries.objects.filter(activity=activity, agg_level=agg_level) \
+            .exclude(df_name__isnull=True).order_by('pk').values_list('pk', 'df_name', 'last_change_date'):
+        current[df_name] = (pk, version(changed))
+    versions = cube.versions or {}
+    changed = [df_name for df_name, (pk, v) in current.items() if versions.get(df_name) != v]
+    if cube.pk and not changed and set(current) == set(versions):
+        return cube, 0
+
+    rows = load_rows([current[df_name][0] for df_name in changed])
+    old = cube.get_array()
+    old_index = {df_name: i for i, df_name in enumerate(cube.countries)}
+    old_start = np.datetime64(cube.start_date, 'D').astype(np.int64) if cube.start_date else None
+    retained = [df_name for df_name in current if df_name not in rows and df_name in old_index]
+
+    # the date axis covers the retained rows and the reloaded series
+    bounds = [records['date'][[0, -1]] for records in rows.values() if len(records)]
+    if retained and old_start is not None and cube.dates_n:
+        bounds.append(np.array([old_start, old_start + cube.dates_n - 1]))
+    countries = sorted(current)
+    if bounds:
+        bounds = np.concatenate(bounds)
+        start, end = int(bounds.min()), int(bounds.max())
+    else:
+        start, end = 0, -1
+    array = np.full((len(countries), end - start + 1), np.nan, dtype='<f4')
+    for i, df_name in enumerate(countries):
+        if df_name in rows:
+            records = rows[df_name]
+            array[i, records['date'] - start] = records['value']
+        elif df_name in old_index and old_start is not None:
+            offset = old_start - start
+            array[i, offset:offset + cube.dates_n] = old[old_index[df_name]]
+
+    cube.countries = countries
+    cube.versions = {df_name: v for df_name, (pk, v) in current.items()}
+    cube.start_date = np.datetime64(start, 'D').item() if array.shape[1] else None
+    cube.dates_n = array.shape[1]
+    cube.set_array(array)
+    cube.save()
+    return cube, len(rows)
+
+
+def refresh(activities=None, agg_level='Country'):
+    """
+    Incrementally rebuild the cubes of a list of activities (default all)
+
+    :return: dictionary activity -> number of reloaded countries
+    """
+    return {activity: build(activity, agg_level)[1] for activity in activities or activities_short}
+
+
+def cube_payload(activity, agg_level='Country'):
+    """
+    The aligned dates, the (country x date) values (None for missing observations) and the
+    cross-country mean, minimum and maximum per date of a cube
+
+    """
+    cube = PolicyCube.objects.filter(activity=activity, agg_level=agg_level).first()
+    if cube is None:
+        return None
+    key = 'policy_cube:%s:%s:%s' % (agg_level, activity, version(cube.last_change_date))
+    payload = cache.get(key)
+    if payload is None:
+        array = cube.get_array()
+        mask = np.isnan(array)
+        observed = ~mask.all(axis=0)
+        statistics = {'mean': np.full(cube.dates_n, np.nan), 'min': np.full(cube.dates_n, np.nan),
+                      'max': np.full(cube.dates_n, np.nan)}
+        if observed.any():
+            statistics['mean'][observed] = np.nanmean(array[:, observed], axis=0)
+            statistics['min'][observed] = np.nanmin(array[:, observed], axis=0)
+            statistics['max'][observed] = np.nanmax(array[:, observed], axis=0)
+        start = np.datetime64(cube.start_date, 'D').astype(np.int64) if cube.start_date else 0
+        values = np.round(array.astype(float), 3).astype(object)
+        values[mask] = None
+        payload = {
+            'activity': activity,
+            'countries': cube.countries,
+            'dates': iso_dates(start + np.arange(cube.dates_n)),
+            'values': values.tolist(),
+            'statistics': {name: [None if np.isnan(v) else round(float(v), 3) for v in stat]
+                           for name, stat in statistics.items()},
+        }
+        cache.set(key, payload, None)
+    return payload
@@ -0,0 +1,102 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.core.cache import cache
+
+from equinox.versions import table_version
+from policy.models import DataSeries
+from policy.queries import QUERY_PARAMETERS
+from policy.timeseries import unpack_series, query_series
+
+"""
+GeoSlice data access layer
+
+The member dataseries of a GeoSlice are resolved with batched identifier__in queries against the
+unique (indexed) DataSeries identifier, projecting only the fields a view needs. The slice payloads
+are cached under the GeoSlice last_change_date and the DataSeries data version (see
+equinox.versions and policy.regions), so that series loaded by the populate commands or changed by
+another process are seen without any explicit invalidation.
+
+"""
+
+# identifiers per query (below the SQLite host parameter limit)
+ID_BATCH_SIZE = 900
+
+MAP_FIELDS = ['identifier', 'title', 'title_long', 'series_data']
+LIST_FIELDS = ['pk', 'identifier', 'title', 'title_long', 'last_observation_date', 'rest_url']
+
+
+def members(identifiers, fields):
+    """
+    The selected fields of the dataseries with the given identifiers
+
+    :return: list of field dictionaries in identifier order (unknown identifiers are skipped)
+    """
+    identifiers = list(identifiers or [])
+    rows = {}
+    for start in range(0, len(identifiers), ID_BATCH_SIZE):
+        batch = identifiers[start:start + ID_BATCH_SIZE]
+        for row in DataSeries.objects.filter(identifier__in=batch).values(*dict.fromkeys(['identifier'] + fields)):
+            rows[row['identifier']] = row
+    return [rows[identifier] for identifier in dict.fromkeys(identifiers) if identifier in rows]
+
+
+def cache_key(geoslice, view):
+    return 'geoslice:%s:%s:%s:%s' % (view, table_version(DataSeries), geoslice.identifier,
+                                     geoslice.last_change_date.isoformat() if geoslice.last_change_date else '')
+
+
+def map_payload(geoslice, **query):
+    """
+    The observations of the member dataseries keyed by dataflow (the map view dataset)
+
+    Each series is sliced, resampled and downsampled with the query_series keyword arguments
+    (validated with policy.queries.parse_query)
+
+    """
+    key = cache_key(geoslice, 'map:' + ':'.join(str(query.get(name)) for name in QUERY_PARAMETERS))
+    dataset = cache.get(key)
+    if dataset is None:
+        dataset = {}
+        for row in members(geoslice.dataset_id, MAP_FIELDS):
+            entry = query_series(unpack_series(row['series_data']), **query)
+            dataset[row['identifier'].split('.')[0]] = {
+                # the redirect url in case we want to drill down
+                'url': 'plot/' + row['identifier'],
+                'title': row['title'],
+                'title_long': row['title_long'],
+                'dates': entry['dates'],
+                'values': entry['values'],
+            }
+        cache.set(key, dataset, None)
+    return dataset
+
+
+def list_payload(geoslice):
+    """
+    The descriptive fields of the member dataseries (the list view series list)
+
+    """
+    key = cache_key(geoslice, 'list')
+    series_list = cache.get(key)
+    if series_list is None:
+        series_list = members(geoslice.dataset_id, LIST_FIELDS)
+        cache.set(key, series_list, None)
+    return series_list
@@ -0,0 +1,162 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import json
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+import policy.settings as settings
+from equinox.versions import touch
+from policy.models import DataSeries
+from policy.timeseries import pack_series
+
+"""
+Incremental loading of processed policy dataseries
+
+The valid entries of a dataseries catalog are diffed against the stored dataseries by identifier
+and content hash (the catalog entry together with the processed DF/ID.P.json file). New series are
+bulk inserted, changed series bulk updated and vanished series deleted in a single transaction, so
+readers never see a partially loaded table. Unchanged series are neither parsed nor written.
+
+"""
+
+# the DataSeries fields set from the catalog and the processed data files
+SERIES_FIELDS = ['status', 'color', 'region', 'agg_level', 'activity', 'df_name', 'title', 'title_long', 'rest_url',
+                 'unit', 'field_type', 'code_list', 'frequency', 'metrics', 'geometry_1D', 'series_data',
+                 'last_observation_date', 'content_hash', 'last_change_date']
+
+
+def series_color(metrics):
+    """
+    Color a timeseries by urgency: the average of the last two observations versus the average of
+    the two observations prior
+
+    """
+    delta = (metrics['T'] + metrics['T-1']) / 2 - (metrics['T-2'] + metrics['T-3']) / 2
+    if delta >= settings.CUTOFF_CHANGE_RED:
+        return 'red'
+    elif delta >= settings.CUTOFF_CHANGE_ORANGE:
+        return 'orange'
+    elif delta >= settings.CUTOFF_CHANGE_YELLOW:
+        return 'yellow'
+    return 'gray'
+
+
+def series_region(ref_area):
+    ref_area_parts = ref_area.split('.')
+    region = ''
+    if len(ref_area_parts) == 2:
+        region = ref_area_parts[1]
+    if len(ref_area_parts) == 3:
+        region = ref_area_parts[1] + '.' + ref_area_parts[2]
+    return region
+
+
+def content_hash(entry, raw):
+    digest = hashlib.sha1(json.dumps(entry, sort_keys=True).encode('utf-8'))
+    digest.update(raw)
+    return digest.hexdigest()
+
+
+def build_series(entry, series_data, digest):
+    """
+    A DataSeries from a catalog entry and its processed data
+
+    """
+    return DataSeries(
+        status='Valid',
+        color=series_color(series_data['Metrics']),
+        region=series_region(entry['REF_AREA']),
+        agg_level=entry['AGG_LEVEL'],
+        activity=entry['ACTIVITY'],
+        # Metadata from the dataseries database file
+        df_name=entry['DF_NAME'],
+        title=entry['TITLE'],
+        title_long=entry['TITLE_COMPL'],
+        identifier=entry['ID'],
+        rest_url=entry['URL'],
+        unit=entry['UNIT'],
+        field_type=series_data['Field Type'],
+        code_list=series_data['Code List'],
+        frequency=series_data['Frequency'],
+        metrics=series_data['Metrics'],
+        geometry_1D=series_data['Geometry_1D'],
+        series_data=pack_series(series_data['Dates'], series_data['Values'],
+                                series_data['Delta'], series_data['PDelta']),
+        last_observation_date=series_data['LastDate'],
+        content_hash=digest,
+        last_change_date=timezone.now())
+
+
+def sync_dataseries(catalog, datapath, batch_size=1000):
+    """
+    Synchronize the stored dataseries with the valid entries of a catalog
+
+    :param catalog: list of catalog entries (with ID, DF_NAME, Status etc.)
+    :param datapath: the data directory holding the processed dataflows/DF/ID.P.json files
+    :return: dictionary with the total and tracked (valid) entry counts, the created, updated, deleted
+        and unchanged series counts, the color counts of the tracked series and the list of created
+        and updated DataSeries
+    """
+    existing = {identifier: (pk, digest, color) for pk, identifier, digest, color in
+                DataSeries.objects.values_list('pk', 'identifier', 'content_hash', 'color')}
+    valid = {entry['ID']: entry for entry in catalog if entry['Status'] == 'Valid'}
+
+    created = []
+    updated = []
+    colors = Counter()
+    for identifier, entry in valid.items():
+        load_path = datapath + 'dataflows/' + entry['DF_NAME'] + "/" + identifier + ".P.json"
+        with open(load_path, 'rb') as f:
+            raw = f.read()
+        digest = content_hash(entry, raw)
+        previous = existing.get(identifier)
+        if previous is not None and previous[1] == digest:
+            colors[previous[2]] += 1
+            continue
+        ds = build_series(entry, json.loads(raw), digest)
+        colors[ds.color] += 1
+        if previous is None:
+            created.append(ds)
+        else:
+            ds.pk = previous[0]
+            updated.append(ds)
+    deleted = [pk for identifier, (pk, digest, color) in existing.items() if identifier not in valid]
+
+    with transaction.atomic():
+        for start in range(0, len(deleted), batch_size):
+            DataSeries.objects.filter(pk__in=deleted[start:start + batch_size]).delete()
+        DataSeries.objects.bulk_update(updated, SERIES_FIELDS, batch_size=batch_size)
+        DataSeries.objects.bulk_create(created, batch_size=batch_size)
+        touch(DataSeries)
+
+    return {
+        'total': len(catalog),
+        'tracked': len(valid),
+        'created': len(created),
+        'updated': len(updated),
+        'deleted': len(deleted),
+        'unchanged': len(valid) - len(created) - len(updated),
+        'colors': colors,
+        'changed': created + updated,
+    }
@@ -0,0 +1,40 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from equinox.batch import BatchCommand
+from policy.cube import refresh
+from policy.settings import activities_short
+
+
+class Command(BatchCommand):
+    help = 'Incrementally rebuilds the (country x date) policy cubes of the selected activities'
+
+    def add_job_arguments(self, parser):
+        parser.add_argument('--activity', nargs='*', default=None, choices=activities_short,
+                            help='Activities to rebuild (default all)')
+
+    def run(self, *args, **options):
+        with self.stage('Build cubes'):
+            reloaded = refresh(options['activity'])
+
+        for activity, count in reloaded.items():
+            self.stdout.write('%s: %d countries reloaded' % (activity, count))
+            self.rows += count
+        self.stdout.write(self.style.SUCCESS('Successfully built policy cubes'))
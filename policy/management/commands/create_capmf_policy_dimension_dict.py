@@ -30,9 +30,8 @@ import pprint
 import time
 from datetime import datetime
 
-from django.core.management.base import BaseCommand
-
 import policy.settings as settings
+from equinox.batch import BatchCommand
 from policy.capmf_settings import field_codes, field_description
 
 """
@@ -55,58 +54,59 @@ Example:
 """
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Create policy dimension dictionary'
-    Debug = True
-    Logging = False
-
-    start_time = time.time()
-    start_timestamp = datetime.isoformat(datetime.now())
-    date = datetime.now().strftime('%Y-%m-%d %H:%M')
-
-    if Logging:
-        logfile = open(settings.logfile_path, 'a')
-        logfile.write('> Constructing Policy Data Dimensions \n')
-        logfile.write('> Starting at: ' + str(date) + '\n')
-
-    country_dict = settings.country_dict
-
-    datapath = settings.DATA_PATH
-    dimensions_dict_file = settings.dimensions_file
-
-    dimensions_dict = {}
-    dataflow_dict = pickle.load(open(datapath + '/dataflow_dict' + '.pkl', 'rb'))
-
-    actual_codes = {}
-    print(len(field_codes), len(field_description))
-    for field in field_codes:
-        f_index = field_codes.index(field)
-        actual_codes[field] = field_description[f_index]
-
-    for dataflow in dataflow_dict:
-        # print(dataflow_dict)
-        dimensions_dict[dataflow] = []
-        #
-        # 1. The (trivial because only one) measurement dimension
-        #
-        dimension = {'DimName': 'Reference Area',
-                     'DimDescription': 'Policy Measurement Reference Area',
-                     'CodeListName': 'CL_Reference_Area',
-                     'ActualCodes': actual_codes
-                     }
-        dimensions_dict[dataflow].append(dimension)
-
-    json.dump(dimensions_dict, open(dimensions_dict_file, 'w'), sort_keys=True, indent=4, separators=(',', ': '))
-
-    pp = pprint.PrettyPrinter(indent=4)
-    if Debug:
-        pp.pprint(dimensions_dict)
-
-    if Logging:
-        logfile.write("> Created  Policy Data dimensions \n")
-        logfile.write("> Execution Time: %s seconds --- \n" % (time.time() - start_time))
-        logfile.write(80 * '=' + '\n')
-        logfile.close()
-
-    def handle(self, *args, **options):
+
+    def run(self, *args, **options):
+        Debug = True
+        Logging = False
+
+        start_time = time.time()
+        date = datetime.now().strftime('%Y-%m-%d %H:%M')
+
+        if Logging:
+            logfile = open(settings.logfile_path, 'a')
+            logfile.write('> Constructing Policy Data Dimensions \n')
+            logfile.write('> Starting at: ' + str(date) + '\n')
+
+
+        datapath = settings.DATA_PATH
+        dimensions_dict_file = settings.dimensions_file
+
+        dimensions_dict = {}
+        dataflow_dict = pickle.load(open(datapath + '/dataflow_dict' + '.pkl', 'rb'))
+
+        actual_codes = {}
+        print(len(field_codes), len(field_description))
+        for field in field_codes:
+            f_index = field_codes.index(field)
+            actual_codes[field] = field_description[f_index]
+
+        for dataflow in dataflow_dict:
+            # print(dataflow_dict)
+            dimensions_dict[dataflow] = []
+            #
+            # 1. The (trivial because only one) measurement dimension
+            #
+            dimension = {'DimName': 'Reference Area',
+                         'DimDescription': 'Policy Measurement Reference Area',
+                         'CodeListName': 'CL_Reference_Area',
+                         'ActualCodes': actual_codes
+                         }
+            dimensions_dict[dataflow].append(dimension)
+
+        if not self.dry_run:
+            json.dump(dimensions_dict, open(dimensions_dict_file, 'w'), sort_keys=True, indent=4,
+                      separators=(',', ': '))
+
+        pp = pprint.PrettyPrinter(indent=4)
+        if Debug:
+            pp.pprint(dimensions_dict)
+
+        if Logging:
+            logfile.write("> Created  Policy Data dimensions \n")
+            logfile.write("> Execution Time: %s seconds --- \n" % (time.time() - start_time))
+            logfile.write(80 * '=' + '\n')
+            logfile.close()
+
         self.stdout.write(self.style.SUCCESS('Successfully created policy dimension dictionary'))
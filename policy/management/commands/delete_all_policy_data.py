@@ -33,10 +33,10 @@ class Command(BaseCommand):
     help = 'Deletes all policy data from the database (no backup!)'
     Debug = False
 
-    DataFlow.objects.all().delete()
-    DataSeries.objects.all().delete()
-    DashBoardParams.objects.all().delete()
-    GeoSlice.objects.all().delete()
-
     def handle(self, *args, **options):
+        DataFlow.objects.all().delete()
+        DataSeries.objects.all().delete()
+        DashBoardParams.objects.all().delete()
+        GeoSlice.objects.all().delete()
+
         self.stdout.write(self.style.SUCCESS('Deleted all policy data. Good Luck!'))
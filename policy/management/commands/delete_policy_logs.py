@@ -26,16 +26,17 @@
 """
 import os
 
-from django.core.management.base import BaseCommand
 import policy.settings as settings
+from equinox.batch import BatchCommand
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Deletes all policy related log files '
-    Debug = False
 
-    os.remove(settings.logfile_path)
-
-
-    def handle(self, *args, **options):
+    def run(self, *args, **options):
+        if not os.path.exists(settings.logfile_path):
+            self.stdout.write('No policy log file at %s' % settings.logfile_path)
+            return
+        if not self.dry_run:
+            os.remove(settings.logfile_path)
         self.stdout.write(self.style.SUCCESS('Deleted all policy logs. Good Luck!'))
@@ -32,84 +32,83 @@ import json
 import pickle
 import time
 from datetime import datetime
-from pathlib import Path
 
 import pandas as pd
-from django.core.management.base import BaseCommand
 
 import policy.settings as settings
+from equinox.batch import BatchCommand
 from policy.settings import countryISOMapping
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Extract Dataflow metadata from Raw CSV into a pickle file'
-    Debug = True
-    Logging = False
 
-    BASE_DIR = Path(__file__).resolve().parent.parent
+    def run(self, *args, **options):
+        Debug = True
+        Logging = False
 
-    filepath = settings.CSV_FILE_PATH
-    datapath = settings.DATA_PATH
 
-    start_time = time.time()
-    start_timestamp = datetime.isoformat(datetime.now())
-    date = datetime.now().strftime('%Y-%m-%d %H:%M')
+        filepath = settings.CSV_FILE_PATH
+        datapath = settings.DATA_PATH
 
-    if Logging:
-        logfile = open(settings.logfile_path, 'a')
-        logfile.write('> Extracting Policy Data Country Dataflows \n')
-        logfile.write('> Starting at: ' + str(date) + '\n')
+        start_time = time.time()
+        date = datetime.now().strftime('%Y-%m-%d %H:%M')
 
-    mydata = pd.read_csv(filepath)
+        if Logging:
+            logfile = open(settings.logfile_path, 'a')
+            logfile.write('> Extracting Policy Data Country Dataflows \n')
+            logfile.write('> Starting at: ' + str(date) + '\n')
 
-    total_rows = mydata.shape[0]
+        mydata = pd.read_csv(filepath)
 
-    if Logging:
-        logfile.write('> Found total data rows: ' + str(total_rows) + '\n')
+        total_rows = mydata.shape[0]
 
-    country_dict = {}
-    dataflow_dict = {}
-    count = 0
+        if Logging:
+            logfile.write('> Found total data rows: ' + str(total_rows) + '\n')
 
-    for index, row in mydata.iterrows():
+        country_dict = {}
+        dataflow_dict = {}
+        count = 0
 
-        # The data columns we will work with in this script
-        # Choosing 2 Letter country code
-        # ATTN: EU added as country
-        country_region_code = countryISOMapping[row['REF_AREA']]
-        country_region = row['Reference area']
+        for index, row in mydata.iterrows():
 
-        # Some type issues of pandas
-        if type(country_region_code) is float:
-            country_region_code = 'NA'
+            # The data columns we will work with in this script
+            # Choosing 2 Letter country code
+            # ATTN: EU added as country
+            country_region_code = countryISOMapping[row['REF_AREA']]
+            country_region = row['Reference area']
 
-        if country_region_code not in country_dict:
-            country_dict[country_region_code] = country_region
+            # Some type issues of pandas
+            if type(country_region_code) is float:
+                country_region_code = 'NA'
 
-        # DO WE NEED THIS?
-        if country_region_code not in dataflow_dict:
-            # start new data flow
-            dataflow_dict[country_region_code] = country_region
+            if country_region_code not in country_dict:
+                country_dict[country_region_code] = country_region
 
-        count += 1
-        if Debug:
-            print(count)
+            # DO WE NEED THIS?
+            if country_region_code not in dataflow_dict:
+                # start new data flow
+                dataflow_dict[country_region_code] = country_region
+
+            count += 1
+            if Debug:
+                print(count)
 
-    if Debug:
-        print(country_dict)
+        if Debug:
+            print(country_dict)
 
-    json.dump(dataflow_dict, open(datapath + 'dataflow_dict' + '.json', 'w'), sort_keys=True, indent=4,
-              separators=(',', ': '))
+        if not self.dry_run:
+            json.dump(dataflow_dict, open(datapath + 'dataflow_dict' + '.json', 'w'), sort_keys=True, indent=4,
+                      separators=(',', ': '))
 
-    file = open(datapath + '/dataflow_dict' + '.pkl', 'wb')
-    pickle.dump(obj=dataflow_dict, file=file, protocol=2)
+            with open(datapath + '/dataflow_dict' + '.pkl', 'wb') as file:
+                pickle.dump(obj=dataflow_dict, file=file, protocol=2)
 
-    if Logging:
-        logfile.write("> Created  datafiles/dataflow_dict.json \n")
-        logfile.write("> Created  datafiles/dataflow_dict.pkl   \n")
-        logfile.write("> Execution Time: %s seconds --- \n" % (time.time() - start_time))
-        logfile.write(80 * '=' + '\n')
-        logfile.close()
+        if Logging:
+            logfile.write("> Created  datafiles/dataflow_dict.json \n")
+            logfile.write("> Created  datafiles/dataflow_dict.pkl   \n")
+            logfile.write("> Execution Time: %s seconds --- \n" % (time.time() - start_time))
+            logfile.write(80 * '=' + '\n')
+            logfile.close()
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully extracted Dataflow structure from csv file'))
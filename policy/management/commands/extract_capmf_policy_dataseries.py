@@ -39,163 +39,138 @@ import time
 from datetime import datetime
 
 import pandas as pd
-from django.core.management.base import BaseCommand
 
 import policy.settings as settings
+from equinox.batch import BatchCommand
 from policy.settings import countryISOMapping, country_dict
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Extract CAPMF dataseries data from csv'
-    Debug = True
-    Logging = False
-    dataflowpath = settings.DATA_PATH + 'dataflows/'
 
-    start_time = time.time()
-    start_timestamp = datetime.isoformat(datetime.now())
-    date = datetime.now().strftime('%Y-%m-%d %H:%M')
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default=settings.CSV_FILE_PATH, help='The CAPMF data dump (tab separated)')
 
-    if Logging:
-        logfile = open(settings.logfile_path, 'a')
-        logfile.write('> Extracting Dataseries \n')
-        logfile.write('> Starting at: ' + str(date) + '\n')
+    def run(self, *args, **options):
+        Logging = False
+        dataflowpath = settings.DATA_PATH + 'dataflows/'
 
-    dataseries_list_file = settings.dataseries_file
+        start_time = time.time()
+        date = datetime.now().strftime('%Y-%m-%d %H:%M')
 
-    count = 0
-    filepath = settings.CSV_FILE_PATH
-    mydata = pd.read_csv(filepath, sep='\t')
-    mydata = mydata.fillna(0.0)
-    total_rows = mydata.shape[0]
+        if Logging:
+            logfile = open(settings.logfile_path, 'a')
+            logfile.write('> Extracting Dataseries \n')
+            logfile.write('> Starting at: ' + str(date) + '\n')
 
-    if Logging:
-        logfile.write('> Found total data rows: ' + str(total_rows) + '\n')
+        dataseries_list_file = settings.dataseries_file
 
-    # store identified dataseries dicts into a list
-    dataseries_group_list = []
-    dataseries_dict = {}
+        filepath = options['path']
 
-    # Iterate over the rows of the CSV file
-    # Construct a dataseries identifier from row data
-    # If it exists, add measurement value to array, if not, create it
-
-    REF_AREA = 1
-    MEASURE = 2
-    CLIM_ACT_POL = 3
-    TITLE = 4
-    TIME_PERIOD = 5
-    OBS_VALUE = 6
-    OBS_STATUS = 7
-
-    for row in mydata.itertuples(index=True):
-
-        if Debug:
-            print('Extracting ', row[0])
-
-        country_region_code = countryISOMapping[row[REF_AREA]]
-        country_region = country_dict[country_region_code]
-
-        # Some type issues of pandas
-        if type(country_region_code) is float:
-            country_region_code = 'NA'
-
-        # Construct the dataflow identifier
-        df_identifier = country_region_code
-
-        # Construct the dataseries identifier
-        ds_identifier = df_identifier + '.' + row[MEASURE][4:] + '.' + row[CLIM_ACT_POL][5:]
-
-        # Compile the dataseries data
-
-        # The observation date
-        raw_date = row[TIME_PERIOD]
-        observation_date = datetime.strptime(str(raw_date), '%Y').date().isoformat()
-
-        # The observed value
-        value = row[OBS_VALUE]
-
-        # The status of the observations
-        status = row[OBS_STATUS]
+        # The positions of the used columns in the CSV file
+        REF_AREA = 0
+        MEASURE = 1
+        CLIM_ACT_POL = 2
+        TITLE = 3
+        TIME_PERIOD = 4
+        OBS_VALUE = 5
+        OBS_STATUS = 6
 
         # Record the aggregation level (Currently Country Only)
         aggregation_level = 'Country'
 
-        print('DS ID: ', ds_identifier)
-
-        # Create new dataseries object (if needed)
-        if ds_identifier not in dataseries_group_list:
-            # start new dataseries object
-            dataseries_group_list.append(ds_identifier)
-            # Create the dataseries dict
-            dataseries = {'Identifier': ds_identifier, 'Dates': [], 'Values': [], 'Status': []}
-
-            # Add data
-            dataseries['Dates'].append(observation_date)
-            dataseries['Values'].append(value)
-            dataseries['Status'].append(status)
-
-            # Add attributes
-            title = row[TITLE]
-            dataseries['TITLE'] = title
-            title_compl = title + ' in ' + country_region
-            dataseries['TITLE_COMPL'] = title_compl
-            dataseries['REF_AREA'] = df_identifier
-            dataseries['ACTIVITY'] = title
-            dataseries['AGG_LEVEL'] = aggregation_level
-
-            # Store the dataseries
-            dataseries_dict[ds_identifier] = dataseries
-        # or modify an existing one
-        else:
-
-            dataseries = dataseries_dict[ds_identifier]
-            dataseries['Dates'].append(observation_date)
-            dataseries['Values'].append(value)
-            dataseries['Status'].append(status)
-            title = row[TITLE]
-            dataseries['TITLE'] = title
-            title_compl = title + ' in ' + country_region
-            dataseries['TITLE_COMPL'] = title_compl
-            dataseries['REF_AREA'] = df_identifier
-            dataseries['ACTIVITY'] = title
-            dataseries['AGG_LEVEL'] = aggregation_level
-
-            dataseries_dict[ds_identifier] = dataseries
-
-        count += 1
-        print(str(int(100 * count / total_rows)) + " %", end='\r')
-
-    # Save the dataseries data into the dataflow directory structure
-    for ds in dataseries_dict:
-        dataseries_file = dataflowpath + ds[:2] + '/' + ds + '.json'
-        json.dump(dataseries_dict[ds], open(dataseries_file, 'w'), sort_keys=True, indent=4, separators=(',', ': '))
-        # print(dataseries_file)
-
-    # Save a Dataseries summary fingerprint into a cumulative json list
-    dataseries_list = []
-    for ds in dataseries_dict:
-        if Debug:
-            print('Saving ', ds)
-        ds_data = {}
-        ds_data['DF_NAME'] = ds[:2]
-        ds_data['FREQ'] = 'A'
-        ds_data['ID'] = ds
-        ds_data['REF_AREA'] = dataseries_dict[ds]['REF_AREA']
-        ds_data['Status'] = 'Live'
-        ds_data['TITLE'] = dataseries_dict[ds]['TITLE']
-        ds_data['TITLE_COMPL'] = dataseries_dict[ds]['TITLE_COMPL']
-        ds_data['UNIT'] = 'CHECK'
-        ds_data['URL'] = 'https://www.equinox.com/api/policy_data'
-        ds_data['ACTIVITY'] = dataseries_dict[ds]['ACTIVITY']
-        ds_data['AGG_LEVEL'] = dataseries_dict[ds]['AGG_LEVEL']
-        dataseries_list.append(ds_data)
-
-    json.dump(dataseries_list, open(dataseries_list_file, 'w'), sort_keys=True, indent=4, separators=(',', ': '))
-
-    if Logging:
-        logfile.write("> Execution Time: %s seconds --- \n" % (time.time() - start_time))
-        logfile.write(80 * '=' + '\n')
-        logfile.close()
-
-    def handle(self, *args, **options):
+        # Accumulators of the dataseries data and attributes keyed by dataseries identifier
+        dataseries_dict = {}
+
+        total_rows = 0
+        read_start = time.time()
+        with self.stage('Group rows'):
+            # Stream the CSV file in chunks, construct the dataseries identifiers of each chunk (vectorized)
+            # and append the observations of each group to its dataseries
+            reader = pd.read_csv(filepath, sep='\t', usecols=range(7), chunksize=self.chunk_size)
+            for chunk in reader:
+                chunk = chunk.fillna(0.0)
+                columns = chunk.columns
+
+                country_region_code = chunk[columns[REF_AREA]].map(countryISOMapping).fillna('NA')
+                ds_identifier = country_region_code + '.' + chunk[columns[MEASURE]].str[4:] + '.' + \
+                    chunk[columns[CLIM_ACT_POL]].str[5:]
+                # Annual observations, the date is the start of the year
+                observation_date = chunk[columns[TIME_PERIOD]].astype(str).str[:4] + '-01-01'
+
+                frame = pd.DataFrame({
+                    'ID': ds_identifier,
+                    'REF_AREA': country_region_code,
+                    'TITLE': chunk[columns[TITLE]],
+                    'Dates': observation_date,
+                    'Values': chunk[columns[OBS_VALUE]],
+                    'Status': chunk[columns[OBS_STATUS]],
+                })
+
+                for identifier, group in frame.groupby('ID', sort=False):
+                    dataseries = dataseries_dict.get(identifier)
+                    if dataseries is None:
+                        dataseries = {'Identifier': identifier, 'Dates': [], 'Values': [], 'Status': []}
+                        dataseries_dict[identifier] = dataseries
+                    dataseries['Dates'].extend(group['Dates'].tolist())
+                    dataseries['Values'].extend(group['Values'].tolist())
+                    dataseries['Status'].extend(group['Status'].tolist())
+
+                    # Attributes are taken from the last row of the dataseries
+                    df_identifier = group['REF_AREA'].iat[-1]
+                    title = group['TITLE'].iat[-1]
+                    dataseries['TITLE'] = title
+                    dataseries['TITLE_COMPL'] = title + ' in ' + country_dict.get(df_identifier, df_identifier)
+                    dataseries['REF_AREA'] = df_identifier
+                    dataseries['ACTIVITY'] = title
+                    dataseries['AGG_LEVEL'] = aggregation_level
+
+                total_rows += len(chunk)
+                if self.verbosity > 0:
+                    elapsed = max(time.time() - read_start, 1e-9)
+                    self.stdout.write('> Rows: %d series: %d (%.0f rows/sec)' % (
+                        total_rows, len(dataseries_dict), total_rows / elapsed), ending='\r')
+
+        if self.verbosity > 0:
+            self.stdout.write('')
+        if Logging:
+            logfile.write('> Found total data rows: ' + str(total_rows) + '\n')
+
+        if not self.dry_run:
+            with self.stage('Write files'):
+                # Save the dataseries data into the dataflow directory structure
+                for ds in dataseries_dict:
+                    dataseries_file = dataflowpath + ds[:2] + '/' + ds + '.json'
+                    with open(dataseries_file, 'w') as f:
+                        json.dump(dataseries_dict[ds], f, sort_keys=True, separators=(',', ':'))
+
+                # Save a Dataseries summary fingerprint into a cumulative json list
+                dataseries_list = []
+                for ds in dataseries_dict:
+                    ds_data = {}
+                    ds_data['DF_NAME'] = ds[:2]
+                    ds_data['FREQ'] = 'A'
+                    ds_data['ID'] = ds
+                    ds_data['REF_AREA'] = dataseries_dict[ds]['REF_AREA']
+                    ds_data['Status'] = 'Live'
+                    ds_data['TITLE'] = dataseries_dict[ds]['TITLE']
+                    ds_data['TITLE_COMPL'] = dataseries_dict[ds]['TITLE_COMPL']
+                    ds_data['UNIT'] = 'CHECK'
+                    ds_data['URL'] = 'https://www.equinox.com/api/policy_data'
+                    ds_data['ACTIVITY'] = dataseries_dict[ds]['ACTIVITY']
+                    ds_data['AGG_LEVEL'] = dataseries_dict[ds]['AGG_LEVEL']
+                    dataseries_list.append(ds_data)
+
+                json.dump(dataseries_list, open(dataseries_list_file, 'w'), sort_keys=True, indent=4, separators=(',', ': '))
+
+        if self.verbosity > 0:
+            elapsed = max(time.time() - start_time, 1e-9)
+            self.stdout.write('> Extracted %d rows into %d series (%.0f rows/sec)' % (
+                total_rows, len(dataseries_dict), total_rows / elapsed))
+
+        if Logging:
+            logfile.write("> Execution Time: %s seconds --- \n" % (time.time() - start_time))
+            logfile.write(80 * '=' + '\n')
+            logfile.close()
+
         self.stdout.write(self.style.SUCCESS('Successfully extracted CAPMF dataseries from csv file'))
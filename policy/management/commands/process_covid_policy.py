@@ -19,15 +19,13 @@
 # SOFTWARE.
 
 import json
-import math
+import os
 import time
 from datetime import datetime
 
-import numpy as np
-from django.core.management.base import BaseCommand
-from scipy import stats
-
 import policy.settings as settings
+from equinox.batch import BatchCommand
+from policy.processing import fingerprint, unchanged, load_manifest, save_manifest, run_tasks
 # The field names as they are in the CSV header
 from policy.covid_settings import field_codes, field_description, field_description_long, field_code_list, field_type
 
@@ -68,293 +66,139 @@ STATUS INDICATORS
 """
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Process covid policy dataseries'
-    Debug = False
-    Logging = False
-
-    datapath = settings.DATA_PATH
-
-    start_time = time.time()
-    start_timestamp = datetime.isoformat(datetime.now())
-    date = datetime.now().strftime('%Y-%m-%d %H:%M')
-
-    if Logging:
-        logfile = open(settings.logfile_path, 'a')
-        logfile.write('> Creating Dataflow Directory \n')
-        logfile.write('> Starting at: ' + str(date) + '\n')
-
-    if Debug:
-        print('> Process Oxford Covid Policy Data')
-        print('> ' + str(date) + '\n')
-
-    # Read the list of downloaded dataseries
-    dataseries_list_file = settings.dataseries_file
-    dataseries_list_update_file = settings.dataseries_update_file
-
-    series_list = json.load(open(dataseries_list_file))
-    if Debug:
-        print('N = ', len(series_list))
-    count = 0
-
-    # Select the series to be processed
-    # TODO Currently All
-    download_list = series_list
-    static_list = []
-
-    # # # TODO This must be set to all dataseries if there is a change in the dataflows
-    # # # Otherwise the file is incomplete (missing processing Status)
-    # # Download_Type = 'A'
-    # #
-    # # if Download_Type == 'D':
-    # #     for series in series_list:
-    # #         if series['FREQ'] == 'D' or series['FREQ'] == 'B':
-    # #             download_list.append(series)
-    # #         else:
-    # #             static_list.append(series)
-    # #
-    # # if Download_Type == 'A':
-    # #     download_list = series_list
-    #
-    # Structure to store updated dataseries records
-    series_list_update = []
-    #
-    # Loop over all dataseries listed in catalog
-    for series in download_list:
-
-        count += 1
-        processing_start = time.time()
-
-        dataflow = series['DF_NAME']
-        series_id = series['ID']
-
-        # validity markers (for debugging only)
-        check1 = ''
-        check2 = ''
-        check3 = ''
-        check4 = ''
-
-        Data = {}
-        Data['Df_Name'] = dataflow
-        Data['Title'] = series['TITLE']
-        Data['Definition'] = series['TITLE_COMPL']
-        Data['Identifier'] = series_id
-        Data['Units'] = series['UNIT']
-        Data['Frequency'] = series['FREQ']
-        Data['Reference Area'] = series['REF_AREA']
-
-        field_id = series['ID'][3:]
-        Data['Activity'] = field_id
-
-        field_index = field_codes.index(field_id)
-
-        Data['Description'] = field_description[field_index]
-        Data['Long Description'] = field_description_long[field_index]
-        Data['Code List'] = field_code_list[field_id]
-        Data['Field Type'] = field_type[field_index]
-
-        # Load and parse the saved JSON files
-
-        input_file = str(datapath) + '/dataflows/' + dataflow + '/' + series_id + '.json'
-
-        Dates = []
-        Values = []
-
-        # Try to load the data
-        try:
-            mydata = json.load(open(input_file))
-            Dates = mydata['Dates']
-            Values = mydata['Values']
-            if Debug:
-                print('Parsed ' + series_id + '\n')
-        except Exception as e:
-            if Logging:
-                logfile.write('Could not load/parse ' + series_id + '\n')
-            else:
-                print('Could not load/parse ' + series_id + '\n')
 
-        # Total number of observations
-        ObsCount = len(Values)
+    def add_job_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes (default: number of cores, 1: no pool)')
+        parser.add_argument('--full', action='store_true',
+                            help='Process all series, ignoring the fingerprints of previous runs')
 
-        # Actual measurements (excluding NaN)
-        # ValidCount = np.count_nonzero(~np.isnan(Values))
+    def run(self, *args, **options):
+        Debug = False
+        Logging = False
 
-        LastDate = Dates[len(Dates) - 1]
-        lastDate = datetime.strptime(LastDate, "%Y-%m-%d").date()
+        datapath = settings.DATA_PATH
 
-        # now = datetime.now()
-        # nowDate = now.date()
+        start_time = time.time()
+        date = datetime.now().strftime('%Y-%m-%d %H:%M')
+
+        if Logging:
+            logfile = open(settings.logfile_path, 'a')
+            logfile.write('> Creating Dataflow Directory \n')
+            logfile.write('> Starting at: ' + str(date) + '\n')
 
         if Debug:
-            print(ObsCount, lastDate)
-
-        # if Logging:
-        #     check1 = " len > 6"
-        #     logfile.write(dataflow + ' : ' + series_id + check1 + '\n')
-
-        # Compute absolute and percent differences for numerical types
-        # print(Data['Field Type'], Values[-10:])
-
-        Diffs = []
-        PDiffs = []
-        Diffs.append(0)
-        PDiffs.append(0)
-
-        for k in range(1, len(Values)):
-            if Data['Field Type'] != 'text':
-
-                Diffs.append(Values[k] - Values[k - 1])
-                if math.fabs(Values[k - 1]) > 0:
-                    PDiffs.append((Values[k] - Values[k - 1]) / Values[k - 1])
-                else:
-                    PDiffs.append(0)
-            else:
-                Diffs.append(0)
-                PDiffs.append(0)
-
-        series['Status'] = 'Valid'
-        Data['Dates'] = Dates
-        Data['Values'] = Values
-        Data['Delta'] = Diffs
-        Data['PDelta'] = PDiffs
-
-        # Compute Metrics
-        Metrics = {}
-        Value = np.array(Values)
-        FirstDate = Dates[0]
-        # ObsCount = len(Value)
-
-        # TODO CONVERT TO UTC DATE
-        Data['LastDate'] = LastDate
-
-        if Data['Field Type'] != 'text':
-            # Compute key risk metrics and recent observations
-            max_value = np.max(Value)
-            min_value = np.min(Value)
-            q25_value = np.percentile(Value, 25)
-            # mode_value = stats.mode(Value)
-            median_value = np.median(Value)
-            q75_value = np.percentile(Value, 75)
-            mean_value = np.mean(Value)
-            std_value = np.std(Value)
-            skew_value = stats.skew(Value)
-            kurtosis_value = stats.kurtosis(Value)
-            last_value = Value[len(Value) - 1]
-            value_m1 = Value[len(Value) - 2]
-            value_m2 = Value[len(Value) - 3]
-            value_m3 = Value[len(Value) - 4]
-
-            # Compute scale (range)
-            val_range = math.fabs(max_value - min_value)
-            if val_range > 0:
-                val_orders = math.ceil(math.log10(val_range))
-            else:
-                val_orders = 1
-
-            # pack into dictionary
-            Metrics = {
-                'FirstDate': FirstDate,
-                'LastDate': LastDate,
-                'Frequency': Data['Frequency'],
-                'ObsCount': ObsCount,
-                'Min': round(min_value, 3),
-                'Max': round(max_value, 3),
-                'Median': round(median_value, 3),
-                # 'Mode': round(mode_value, 3),
-                'Q25': round(q25_value, 3),
-                'Q75': round(q75_value, 3),
-                'Mean': round(mean_value, 3),
-                'Vol': round(std_value, 3),
-                'Skew': round(skew_value, 3),
-                'Kurtosis': round(kurtosis_value, 3),
-                'T': round(last_value, 3),
-                'T-1': round(value_m1, 3),
-                'T-2': round(value_m2, 3),
-                'T-3': round(value_m3, 3),
-                'Orders': val_orders
-            }
-        else:
-            Metrics = {
-                'FirstDate': FirstDate,
-                'LastDate': LastDate,
-                'Frequency': Data['Frequency'],
-                'ObsCount': ObsCount,
-                'Min': 0,
-                'Max': 0,
-                'Median': 0,
-                'Q25': 0,
-                'Q75': 0,
-                'Mean': 0,
-                'Vol': 0,
-                'Skew': 0,
-                'Kurtosis': 0,
-                'T': 0,
-                'T-1': 0,
-                'T-2': 0,
-                'T-3': 0,
-                'Orders': 0
-            }
-
-        Data['Metrics'] = Metrics
-
-        if Data['Field Type'] != 'text':
-
-            # Compute Geometry (For Volatility Gauge Visualization)
-
-            # VOLATILITY GAUGE SETTINGS
-            # Map key values onto circle
-            # Average is at 90
-            # 1 std is 30
-            # angle_unit = 3.1415 / 6.0
-            # theta_current = angle_unit * (last_value - mean_value) / std_value
-            # theta_m1 = angle_unit * (value_m1 - mean_value) / std_value
-            # theta_m2 = angle_unit * (value_m2 - mean_value) / std_value
-            # theta_m3 = angle_unit * (value_m3 - mean_value) / std_value
-            # theta_max = angle_unit * (max_value - mean_value) / std_value
-            # theta_min = angle_unit * (min_value - mean_value) / std_value
-
-            # Zero decline / increase is at 90
-            # 20% change is 30 degrees
-            mean_value = 0
-            std_value = 20
-            angle_unit = 3.1415 / 6.0
-            theta_current = angle_unit * (last_value - mean_value) / std_value
-            theta_m1 = angle_unit * (value_m1 - mean_value) / std_value
-            theta_m2 = angle_unit * (value_m2 - mean_value) / std_value
-            theta_m3 = angle_unit * (value_m3 - mean_value) / std_value
-            theta_max = angle_unit * (max_value - mean_value) / std_value
-            theta_min = angle_unit * (min_value - mean_value) / std_value
-
-            Geometry = {'Max': theta_max, 'Min': theta_min, 'Current': theta_current, 'Min1': theta_m1,
-                        'Min2': theta_m2, 'Min3': theta_m3}
-
-        else:
-            Geometry = {'Max': 0, 'Min': 0, 'Current': 0, 'Min1': 0, 'Min2': 0, 'Min3': 0}
-
-        Data['Geometry_1D'] = Geometry
-
-        processing_end = time.time()
-        processing_time = round(processing_end - processing_start, 4)
+            print('> Process Oxford Covid Policy Data')
+            print('> ' + str(date) + '\n')
+
+        # Read the list of downloaded dataseries
+        dataseries_list_file = settings.dataseries_file
+        dataseries_list_update_file = settings.dataseries_update_file
 
+        series_list = json.load(open(dataseries_list_file))
         if Debug:
-            print(count, len(series_list), processing_time)
-
-        output_file = str(datapath) + '/dataflows/' + dataflow + '/' + series_id + '.P' + '.json'
-        print('Dumping File: ', output_file)
-        print(Data)
-        json.dump(Data, open(output_file, 'w'), sort_keys=True, indent=4, separators=(',', ': '))
-        series_list_update.append(series)
-        print('Done')
-
-    # store an updated list of dataseries dicts
-    json.dump(series_list_update, open(dataseries_list_update_file, 'w'), sort_keys=True, indent=4,
-              separators=(',', ': '))
-
-    if Logging:
-        logfile.write("> Processed  Policy Data  \n")
-        logfile.write("> Execution Time: %s seconds --- \n" % (time.time() - start_time))
-        logfile.write(80 * '=' + '\n')
-        logfile.close()
-
-    def handle(self, *args, **options):
+            print('N = ', len(series_list))
+        count = 0
+
+        # Select the series to be processed
+        # Series whose inputs are unchanged since the last run are skipped (use --full to process all)
+        download_list = series_list
+
+        # # # TODO This must be set to all dataseries if there is a change in the dataflows
+        # # # Otherwise the file is incomplete (missing processing Status)
+        # # Download_Type = 'A'
+        # #
+        # # if Download_Type == 'D':
+        # #     for series in series_list:
+        # #         if series['FREQ'] == 'D' or series['FREQ'] == 'B':
+        # #             download_list.append(series)
+        # #         else:
+        # #             static_list.append(series)
+        # #
+        # # if Download_Type == 'A':
+        # #     download_list = series_list
+        #
+
+        manifest_file = settings.processing_manifest_file
+        manifest = {} if options['full'] else load_manifest(manifest_file)
+
+        with self.stage('Fingerprint series'):
+            # Build the processing task of each series and skip those with unchanged inputs
+            tasks = []
+            skipped = 0
+            for series in download_list:
+
+                dataflow = series['DF_NAME']
+                series_id = series['ID']
+
+                Data = {}
+                Data['Df_Name'] = dataflow
+                Data['Title'] = series['TITLE']
+                Data['Definition'] = series['TITLE_COMPL']
+                Data['Identifier'] = series_id
+                Data['Units'] = series['UNIT']
+                Data['Frequency'] = series['FREQ']
+                Data['Reference Area'] = series['REF_AREA']
+
+                field_id = series['ID'][3:]
+                Data['Activity'] = field_id
+
+                field_index = field_codes.index(field_id)
+
+                Data['Description'] = field_description[field_index]
+                Data['Long Description'] = field_description_long[field_index]
+                Data['Code List'] = field_code_list[field_id]
+                Data['Field Type'] = field_type[field_index]
+
+                input_file = str(datapath) + '/dataflows/' + dataflow + '/' + series_id + '.json'
+                output_file = str(datapath) + '/dataflows/' + dataflow + '/' + series_id + '.P' + '.json'
+
+                previous = manifest.get(series_id)
+                try:
+                    current = fingerprint(input_file, Data, previous)
+                except OSError:
+                    current = None
+                if current and unchanged(current, previous) and os.path.exists(output_file):
+                    series['Status'] = previous['status']
+                    skipped += 1
+                    continue
+
+                tasks.append({'data': Data, 'input_file': input_file, 'output_file': output_file,
+                              'carry': [], 'write': not self.dry_run, 'fingerprint': current})
+
+            if Debug:
+                print('Changed: ', len(tasks), ' Unchanged: ', skipped)
+
+        with self.stage('Process series'):
+            series_index = {series['ID']: series for series in download_list}
+            fingerprints = {task['data']['Identifier']: task['fingerprint'] for task in tasks}
+            for series_id, status in run_tasks(tasks, options['workers']):
+                count += 1
+                series_index[series_id]['Status'] = status
+                if status != 'Valid':
+                    if Logging:
+                        logfile.write('Could not load/parse ' + series_id + '\n')
+                    else:
+                        print('Could not load/parse ' + series_id + '\n')
+                if fingerprints[series_id]:
+                    manifest[series_id] = dict(fingerprints[series_id], status=status)
+
+            # Structure to store updated dataseries records
+            series_list_update = download_list
+
+        if not self.dry_run:
+            with self.stage('Write catalog'):
+                # store an updated list of dataseries dicts
+                json.dump(series_list_update, open(dataseries_list_update_file, 'w'), sort_keys=True, indent=4,
+                          separators=(',', ': '))
+                save_manifest(manifest_file, manifest)
+
+        if Logging:
+            logfile.write("> Processed  Policy Data  \n")
+            logfile.write("> Execution Time: %s seconds --- \n" % (time.time() - start_time))
+            logfile.write(80 * '=' + '\n')
+            logfile.close()
+
         self.stdout.write(self.style.SUCCESS('Successfully processed covid policy data'))
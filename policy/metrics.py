@@ -0,0 +1,117 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import pandas as pd
+
+from equinox.loaders import batched
+from policy.models import DataSeries, SeriesMetrics
+
+"""
+Materialized policy dataseries metrics
+
+The summary metrics computed in the processing step (see policy.processing) are stored as a json
+document on each DataSeries. For the statistics views they are also materialized as typed columns
+of a SeriesMetrics row keyed by (agg_level, activity, df_name), so that a statistic of all series
+of an activity is read with a single indexed query and series of two activities are paired
+with a hash join on the dataflow name.
+
+"""
+
+# metric key (as in DataSeries.metrics): SeriesMetrics column
+METRIC_COLUMNS = {
+    'Min': 'min_value',
+    'Max': 'max_value',
+    'Median': 'median',
+    'Q25': 'q25',
+    'Q75': 'q75',
+    'Mean': 'mean',
+    'Vol': 'vol',
+    'Skew': 'skew',
+    'Kurtosis': 'kurtosis',
+    'T': 'latest',
+    'Orders': 'orders',
+    'ObsCount': 'obs_count',
+}
+
+# Keeps the number of query parameters within the database limits
+ID_BATCH_SIZE = 900
+
+
+def series_metrics(series):
+    """
+    The SeriesMetrics row of a (saved) DataSeries
+
+    """
+    metrics = series.get_metrics()
+    values = {column: metrics.get(key) for key, column in METRIC_COLUMNS.items()}
+    return SeriesMetrics(series_id=series.pk, agg_level=series.agg_level, activity=series.activity,
+                         df_name=series.df_name, **values)
+
+
+def materialize(series_list, batch_size=1000):
+    """
+    Create the SeriesMetrics rows of a list of saved dataseries (e.g. after a bulk_create)
+
+    """
+    for batch in batched([series.pk for series in series_list], ID_BATCH_SIZE):
+        SeriesMetrics.objects.filter(series__in=batch).delete()
+    indata = [series_metrics(series) for series in series_list]
+    SeriesMetrics.objects.bulk_create(indata, batch_size=batch_size)
+    return len(indata)
+
+
+def refresh(batch_size=1000):
+    """
+    Rebuild the SeriesMetrics rows of all dataseries
+
+    """
+    SeriesMetrics.objects.all().delete()
+    queryset = DataSeries.objects.only('pk', 'agg_level', 'activity', 'df_name', 'metrics').order_by('pk')
+    indata = [series_metrics(series) for series in queryset.iterator(chunk_size=batch_size)]
+    SeriesMetrics.objects.bulk_create(indata, batch_size=batch_size)
+    return len(indata)
+
+
+def activity_metrics(activity, keys, agg_level='Country'):
+    """
+    The df_name and the selected metrics of all dataseries of an activity (one indexed query)
+
+    :return: list of (df_name, metric values...) tuples in dataseries order
+    """
+    columns = [METRIC_COLUMNS[key] for key in keys]
+    return list(SeriesMetrics.objects.filter(agg_level=agg_level, activity=activity)
+                .order_by('series_id').values_list('df_name', *columns))
+
+
+def paired_metrics(activity1, activity2, keys, agg_level='Country'):
+    """
+    Pair the metrics of the dataseries of two activities by dataflow name
+
+    A single query fetches the series of both activities which are then matched with a hash join
+
+    :return: dataframe with a df_name column and <key>_1, <key>_2 columns for each metric key
+    """
+    columns = [METRIC_COLUMNS[key] for key in keys]
+    rows = SeriesMetrics.objects.filter(agg_level=agg_level, activity__in=[activity1, activity2]) \
+        .order_by('series_id').values_list('activity', 'df_name', *columns)
+    frame = pd.DataFrame.from_records(list(rows), columns=['activity', 'df_name'] + list(keys))
+    left = frame[frame['activity'] == activity1].drop(columns='activity')
+    right = frame[frame['activity'] == activity2].drop(columns='activity')
+    return left.merge(right, on='df_name', how='inner', suffixes=('_1', '_2'))
@@ -18,12 +18,17 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import json
+import zlib
 from datetime import datetime
 
+import numpy as np
 from django.db import models
 from django.db.models import JSONField
 from django.urls import reverse
 
+from policy.timeseries import pack_series, unpack_series, iso_dates
+
 """
 Classes to store Policy data
 
@@ -92,7 +97,7 @@ class DashBoardParams(models.Model):
 
 class DataSeries(models.Model):
     # formal identifier of the policy timeseries (constructed from region identifiers)
-    identifier = models.CharField(null=True, blank=True, max_length=400, help_text="The unique identifier of the Policy dataseries")
+    identifier = models.CharField(null=True, blank=True, unique=True, max_length=400, help_text="The unique identifier of the Policy dataseries")
 
     # policy dataflow metadata
     title = models.CharField(null=True, blank=True, max_length=400, help_text="The title of the Policy (Short)")
@@ -123,8 +128,8 @@ class DataSeries(models.Model):
 
     field_type = models.CharField(null=True, blank=True, default="numerical", max_length=50, help_text="Mathematical nature of the timeseries data (categorical, ordinal, numerical)")
 
-    dates = JSONField(null=True, blank=True, help_text="Array of observation dates")
-    values = JSONField(null=True, blank=True, help_text="Array of observation values")
+    # observation dates, values and value differences packed as a typed record array (see policy.timeseries)
+    series_data = models.BinaryField(null=True, blank=True, help_text="Packed observation dates, values and value differences")
 
     unit = models.CharField(null=True, blank=True, default="%", max_length=50, help_text="The units the data are specified in (if numerical)")
 
@@ -133,8 +138,9 @@ class DataSeries(models.Model):
     # storage of derived data in pre-processing stage
     metrics = JSONField(null=True, blank=True, help_text="Derived metrics (statistics)")
     geometry_1D = JSONField(null=True, blank=True, help_text="Derived graph geometries")
-    values_diff = JSONField(null=True, blank=True, help_text="Value differences")
-    values_diff_p = JSONField(null=True, blank=True, help_text="Value differences %")
+
+    # fingerprint of the catalog entry and processed data file the dataseries was loaded from (see policy.loading)
+    content_hash = models.CharField(null=True, blank=True, max_length=40, help_text="Hash of the loaded source data")
 
     #
     # BOOKKEEPING FIELDS
@@ -148,11 +154,132 @@ class DataSeries(models.Model):
     def get_absolute_url(self):
         return reverse('policy:DataSeries', kwargs={'identifier': self.identifier})
 
+    def set_series(self, dates, values, values_diff=None, values_diff_p=None):
+        self.series_data = pack_series(dates, values, values_diff, values_diff_p)
+
+    def get_series(self):
+        """
+        The observations as a record array with fields date (days since epoch), value, diff, diff_p
+
+        """
+        return unpack_series(self.series_data)
+
+    def get_dates(self):
+        return iso_dates(self.get_series()['date'])
+
+    def get_values(self):
+        return self.get_series()['value']
+
+    def get_metrics(self):
+        # Series stored before the columnar format hold the metrics as a json encoded string
+        if isinstance(self.metrics, str):
+            return json.loads(self.metrics)
+        return self.metrics or {}
+
+    def get_geometry(self):
+        if isinstance(self.geometry_1D, str):
+            return json.loads(self.geometry_1D)
+        return self.geometry_1D or {}
+
+    def series_payload(self):
+        """
+        The observations, metrics and geometries as plain python types (for json encoding)
+
+        """
+        series = self.get_series()
+        return {
+            'dates': iso_dates(series['date']),
+            'values': series['value'].tolist(),
+            'values_diff': series['diff'].tolist(),
+            'values_diff_p': series['diff_p'].tolist(),
+            'metrics': self.get_metrics(),
+            'geometry_1D': self.get_geometry(),
+        }
+
     class Meta:
+        indexes = [models.Index(fields=['df_name', 'region'])]
         verbose_name = "Dataseries"
         verbose_name_plural = "Dataseries"
 
 
+class SeriesMetrics(models.Model):
+    """
+    The summary metrics of a DataSeries materialized as typed columns (see policy.metrics)
+
+    The selection keys of the dataseries are duplicated so that the statistics views are served
+    by a single indexed query
+
+    """
+    series = models.OneToOneField(DataSeries, on_delete=models.CASCADE, related_name='series_metrics',
+                                  help_text="The dataseries the metrics are derived from")
+
+    agg_level = models.CharField(null=True, blank=True, max_length=80, help_text="The aggregation level of the dataseries")
+    activity = models.CharField(null=True, blank=True, max_length=80, help_text="The activity of the dataseries")
+    df_name = models.CharField(null=True, blank=True, max_length=80, help_text="The dataflow of the dataseries")
+
+    min_value = models.FloatField(null=True, blank=True, help_text="Minimum observed value")
+    max_value = models.FloatField(null=True, blank=True, help_text="Maximum observed value")
+    median = models.FloatField(null=True, blank=True, help_text="Median observed value")
+    q25 = models.FloatField(null=True, blank=True, help_text="25% quantile of the observed values")
+    q75 = models.FloatField(null=True, blank=True, help_text="75% quantile of the observed values")
+    mean = models.FloatField(null=True, blank=True, help_text="Average observed value")
+    vol = models.FloatField(null=True, blank=True, help_text="Volatility (standard deviation) of the observed values")
+    skew = models.FloatField(null=True, blank=True, help_text="Skewness of the observed values")
+    kurtosis = models.FloatField(null=True, blank=True, help_text="Kurtosis of the observed values")
+    latest = models.FloatField(null=True, blank=True, help_text="Latest observed value")
+    orders = models.IntegerField(null=True, blank=True, help_text="Orders of magnitude of the value range")
+    obs_count = models.IntegerField(null=True, blank=True, help_text="Number of observations")
+
+    def __str__(self):
+        return str(self.series_id)
+
+    class Meta:
+        indexes = [models.Index(fields=['agg_level', 'activity', 'df_name'])]
+        verbose_name = "Dataseries Metrics"
+        verbose_name_plural = "Dataseries Metrics"
+
+
+class PolicyCube(models.Model):
+    """
+    A dense (country x date) array of the dataseries values of an activity (see policy.cube)
+
+    The values are stored as a zlib compressed float32 array on a daily date axis starting at
+    start_date, with NaN for missing observations. The versions record the last_change_date of the
+    dataseries of each country so that only changed countries are reloaded on a rebuild.
+
+    """
+    activity = models.CharField(max_length=80, help_text="The activity of the dataseries")
+    agg_level = models.CharField(default="Country", max_length=80, help_text="The aggregation level of the dataseries")
+    countries = JSONField(default=list, blank=True, help_text="The dataflow names of the cube rows")
+    versions = JSONField(default=dict, blank=True, help_text="The dataseries version of each dataflow")
+    start_date = models.DateField(null=True, blank=True, help_text="The first date of the date axis")
+    dates_n = models.IntegerField(default=0, help_text="The length of the (daily) date axis")
+    values = models.BinaryField(null=True, blank=True, help_text="Compressed float32 (country x date) values")
+
+    #
+    # BOOKKEEPING FIELDS
+    #
+    creation_date = models.DateTimeField(auto_now_add=True)
+    last_change_date = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '%s.%s' % (self.agg_level, self.activity)
+
+    def set_array(self, array):
+        self.values = zlib.compress(np.ascontiguousarray(array, dtype='<f4').tobytes())
+
+    def get_array(self):
+        if not self.values:
+            return np.full((len(self.countries), self.dates_n), np.nan, dtype='<f4')
+        array = np.frombuffer(zlib.decompress(bytes(self.values)), dtype='<f4')
+        return array.reshape(len(self.countries), self.dates_n)
+
+    class Meta:
+        unique_together = [('agg_level', 'activity')]
+        verbose_name = "Policy Cube"
+        verbose_name_plural = "Policy Cubes"
+
+
 class DataFlow(models.Model):
     #
     # Policy Dataflow MetaData (Country Based)
@@ -0,0 +1,228 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import stats
+
+"""
+Incremental policy dataseries processing engine
+
+Each extracted dataseries file (DF/ID.json) is turned into a processed file (DF/ID.P.json)
+with value differences, summary metrics and gauge geometries.
+
+Inputs are fingerprinted (mtime, size and content hash together with the catalog entry) in a
+manifest file. Series whose fingerprint is unchanged and whose processed file exists are skipped,
+so a catalog refresh costs in proportion to the number of changed series. The remaining series
+are processed in a pool of worker processes.
+
+The worker functions do not touch the database so they can run in any process.
+
+"""
+
+# the minimum number of observations of a processed series (T, T-1, T-2 and T-3)
+MIN_OBSERVATIONS = 4
+
+METRIC_KEYS = ['Min', 'Max', 'Median', 'Q25', 'Q75', 'Mean', 'Vol', 'Skew', 'Kurtosis', 'T', 'T-1', 'T-2', 'T-3',
+               'Orders']
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(path, entry, previous=None):
+    """
+    Fingerprint an input file together with its catalog entry
+
+    The content hash is only recomputed when the mtime or size differ from the previous fingerprint
+
+    """
+    stat = os.stat(path)
+    meta = hashlib.sha1(json.dumps(entry, sort_keys=True).encode('utf-8')).hexdigest()
+    if previous and previous['mtime'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+        content = previous['sha1']
+    else:
+        content = file_hash(path)
+    return {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': content, 'meta': meta}
+
+
+def unchanged(current, previous):
+    return previous is not None and all(previous.get(k) == current[k] for k in ('sha1', 'meta'))
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    with open(path, 'w') as f:
+        json.dump(manifest, f, sort_keys=True, separators=(',', ':'))
+
+
+def differences(values):
+    """
+    Absolute and relative differences with the previous observation (zero for the first observation
+    and for relative differences against a zero value)
+
+    """
+    values = np.asarray(values, dtype=float)
+    diffs = np.zeros_like(values)
+    pdiffs = np.zeros_like(values)
+    if len(values) > 1:
+        diffs[1:] = np.diff(values)
+        previous = values[:-1]
+        np.divide(diffs[1:], previous, out=pdiffs[1:], where=np.abs(previous) > 0)
+    return diffs, pdiffs
+
+
+def series_metrics(values):
+    """
+    Summary metrics of a numerical series (rounded to 3 decimals)
+
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    min_value, q25_value, median_value, q75_value, max_value = np.percentile(values, [0, 25, 50, 75, 100])
+    val_range = math.fabs(max_value - min_value)
+    if val_range > 0:
+        val_orders = math.ceil(math.log10(val_range))
+    else:
+        val_orders = 1
+    metrics = {
+        'Min': min_value,
+        'Max': max_value,
+        'Median': median_value,
+        'Q25': q25_value,
+        'Q75': q75_value,
+        'Mean': np.mean(values),
+        'Vol': np.std(values),
+        'Skew': stats.skew(values),
+        'Kurtosis': stats.kurtosis(values),
+        'T': values[n - 1],
+        'T-1': values[n - 2],
+        'T-2': values[n - 3],
+        'T-3': values[n - 4],
+    }
+    metrics = {key: round(float(value), 3) for key, value in metrics.items()}
+    metrics['Orders'] = val_orders
+    return metrics
+
+
+def gauge_geometry(values):
+    """
+    Map key values onto a circle for the volatility gauge visualization
+
+    Zero decline / increase is at 90, a 20% change is 30 degrees
+
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    mean_value = 0
+    std_value = 20
+    angle_unit = 3.1415 / 6.0
+    points = {'Max': values.max(), 'Min': values.min(), 'Current': values[n - 1], 'Min1': values[n - 2],
+              'Min2': values[n - 3], 'Min3': values[n - 4]}
+    return {name: float(angle_unit * (value - mean_value) / std_value) for name, value in points.items()}
+
+
+def process_series(task):
+    """
+    Process a single dataseries (worker function)
+
+    :param task: dictionary with the Data header, the input and output file paths, the list of input keys
+        to carry over into the output and whether to write the output file
+    :return: (series identifier, status)
+    """
+    data = dict(task['data'])
+    try:
+        with open(task['input_file']) as f:
+            mydata = json.load(f)
+        dates = mydata['Dates']
+        values = mydata['Values']
+    except Exception:
+        return data['Identifier'], 'Invalid'
+    # the metrics and geometries use the last MIN_OBSERVATIONS observations
+    if len(dates) < MIN_OBSERVATIONS or len(values) < MIN_OBSERVATIONS:
+        return data['Identifier'], 'Insufficient'
+
+    for key in task['carry']:
+        data[key] = mydata.get(key, [])
+
+    numerical = data['Field Type'] != 'text'
+    if numerical:
+        diffs, pdiffs = differences(values)
+        data['Delta'] = diffs.tolist()
+        data['PDelta'] = pdiffs.tolist()
+    else:
+        data['Delta'] = [0] * len(values)
+        data['PDelta'] = [0] * len(values)
+
+    data['Dates'] = dates
+    data['Values'] = values
+    # TODO CONVERT TO UTC DATE
+    data['LastDate'] = dates[-1]
+
+    metrics = {
+        'FirstDate': dates[0],
+        'LastDate': dates[-1],
+        'Frequency': data['Frequency'],
+        'ObsCount': len(values),
+    }
+    if numerical:
+        metrics.update(series_metrics(values))
+        geometry = gauge_geometry(values)
+    else:
+        metrics.update({key: 0 for key in METRIC_KEYS})
+        geometry = {'Max': 0, 'Min': 0, 'Current': 0, 'Min1': 0, 'Min2': 0, 'Min3': 0}
+    data['Metrics'] = metrics
+    data['Geometry_1D'] = geometry
+
+    if task['write']:
+        with open(task['output_file'], 'w') as f:
+            json.dump(data, f, sort_keys=True, separators=(',', ':'))
+    return data['Identifier'], 'Valid'
+
+
+def run_tasks(tasks, workers=None):
+    """
+    Process tasks in a pool of worker processes (in process if workers == 1)
+
+    Yields (series identifier, status) in task order
+    """
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield process_series(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(process_series, tasks, chunksize=16)
@@ -0,0 +1,89 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+from django.core.cache import cache
+
+from policy.timeseries import RESAMPLE_AGGREGATIONS, RESAMPLE_RULES, query_series
+
+"""
+Time series query API
+
+Query parameters of a DataSeries display query are validated with parse_query and the results
+of series_query are cached per (series, range, resolution), keyed by the series last_change_date
+so that repopulated series are recomputed. The plot and map views accept the same parameters and
+default to a bounded display resolution (PLOT_QUERY, MAP_QUERY).
+
+"""
+
+# upper bound on the requested number of points
+MAX_POINTS = 10000
+
+QUERY_PARAMETERS = ('start', 'end', 'frequency', 'how', 'points')
+
+# default display resolution of the plot view (shape preserving downsampling)
+PLOT_QUERY = {'points': 1000}
+
+# default display resolution of the map view (weekly means keep the series of all countries on common dates)
+MAP_QUERY = {'frequency': 'W'}
+
+
+def parse_query(params, defaults=None):
+    """
+    Validate the (string) query parameters start, end, frequency, how and points
+
+    :param defaults: values of the parameters missing from params
+    :raises ValueError: on invalid parameters
+    :return: dictionary of query_series keyword arguments
+    """
+    params = dict(defaults or {}, **{name: params.get(name) for name in QUERY_PARAMETERS if params.get(name)})
+    query = {'start': params.get('start') or None, 'end': params.get('end') or None,
+             'frequency': params.get('frequency') or None, 'how': params.get('how') or 'mean', 'points': None}
+    for name in ('start', 'end'):
+        if query[name] is not None:
+            query[name] = str(np.datetime64(query[name], 'D'))
+    if query['frequency'] not in (None, 'D', *RESAMPLE_RULES):
+        raise ValueError('Unknown frequency %s' % query['frequency'])
+    if query['how'] not in RESAMPLE_AGGREGATIONS:
+        raise ValueError('Unknown aggregation %s' % query['how'])
+    if params.get('points'):
+        query['points'] = int(params['points'])
+        if not 3 <= query['points'] <= MAX_POINTS:
+            raise ValueError('Points must be between 3 and %d' % MAX_POINTS)
+    return query
+
+
+def cache_key(dataseries, query):
+    changed = dataseries.last_change_date.timestamp() if dataseries.last_change_date else 0
+    return 'policy_series_query:%s:%s:%s' % (dataseries.pk, changed, ':'.join(
+        str(query.get(name)) for name in QUERY_PARAMETERS))
+
+
+def series_query(dataseries, **query):
+    """
+    The (cached) query_series result of a DataSeries
+
+    """
+    key = cache_key(dataseries, query)
+    result = cache.get(key)
+    if result is None:
+        result = query_series(dataseries.get_series(), **query)
+        cache.set(key, result, None)
+    return result
@@ -0,0 +1,68 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from equinox.versions import table_version, track
+from policy.models import DataSeries
+
+"""
+Per region dataseries counts of policy dataflows
+
+The tracked and live dataseries of a dataflow are counted per stored region code with one grouped
+query (no series payload is loaded). Sub-region codes (REGION.SUBREGION) are folded into their
+top level region. The counts are cached under the DataSeries data version (see equinox.versions),
+which is bumped by saves and deletes and by the populate commands (see policy.loading) once they
+commit, in any process.
+
+"""
+
+# freshness colors of live dataseries
+LIVE_COLORS = ['red', 'orange', 'yellow']
+
+
+def data_version():
+    return table_version(DataSeries)
+
+
+def region_counts(df_name):
+    """
+    The tracked and live dataseries counts per (top level) region of a dataflow
+
+    :return: dictionary region code -> {'dashboard_n': tracked count, 'live_n': live count}
+    """
+    key = 'policy_region_counts:%s:%s' % (data_version(), df_name)
+    counts = cache.get(key)
+    if counts is None:
+        rows = DataSeries.objects.filter(df_name=df_name).exclude(region__isnull=True).exclude(region='') \
+            .values('region').annotate(dashboard_n=Count('pk'), live_n=Count('pk', filter=Q(color__in=LIVE_COLORS))) \
+            .order_by()
+        counts = {}
+        for row in rows:
+            region = counts.setdefault(row['region'].split('.')[0], {'dashboard_n': 0, 'live_n': 0})
+            region['dashboard_n'] += row['dashboard_n']
+            region['live_n'] += row['live_n']
+        cache.set(key, counts, None)
+    return counts
+
+
+def connect_signals():
+    track(DataSeries)
@@ -31,6 +31,7 @@ ROOT_DIR = DATA_PATH
 dataseries_file = ROOT_DIR + "dataseries.latest.json"
 dimensions_file = ROOT_DIR + "dimensions.latest.json"
 dataseries_update_file = ROOT_DIR + "dataseries.update.json"
+processing_manifest_file = ROOT_DIR + "processing.manifest.json"
 metadata_file = ROOT_DIR + 'wikidata_extract_19_05_2020.json'
 
 DATA_FILE = 'CAPMF.csv'
@@ -0,0 +1,183 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+import pandas as pd
+
+"""
+Columnar storage of policy timeseries
+
+The observations of a DataSeries are stored as a single packed binary record array with
+one fixed size record per observation date:
+
+* date: int32, days since 1970-01-01
+* value: float64, the observed value
+* diff: float64, the difference with the previous observation
+* diff_p: float64, the relative difference with the previous observation
+
+The encoding is the native numpy little-endian layout so reading back is a zero-copy np.frombuffer.
+Many series can be read at once by concatenating their buffers (see load_series)
+
+Series are queried for display with query_series: date range slicing (binary search on the sorted
+dates), resampling to a lower frequency and shape preserving downsampling (largest triangle three
+buckets) to a target number of points.
+
+"""
+
+SERIES_DTYPE = np.dtype([('date', '<i4'), ('value', '<f8'), ('diff', '<f8'), ('diff_p', '<f8')])
+
+
+def pack_series(dates, values, values_diff=None, values_diff_p=None):
+    """
+    Pack the observation arrays of a timeseries into bytes
+
+    Dates are ISO formatted strings (or anything numpy can convert to datetime64[D]).
+    Missing values (None) are stored as NaN. Missing difference arrays are stored as NaN.
+
+    """
+    n = len(dates)
+    records = np.empty(n, dtype=SERIES_DTYPE)
+    records['date'] = np.asarray(dates, dtype='datetime64[D]').astype('<i4')
+    records['value'] = np.asarray(values, dtype='<f8')
+    records['diff'] = np.nan if values_diff is None else np.asarray(values_diff, dtype='<f8')
+    records['diff_p'] = np.nan if values_diff_p is None else np.asarray(values_diff_p, dtype='<f8')
+    return records.tobytes()
+
+
+def unpack_series(blob):
+    """
+    Unpack bytes produced by pack_series into a (read only) record array
+
+    """
+    if not blob:
+        return np.empty(0, dtype=SERIES_DTYPE)
+    return np.frombuffer(bytes(blob), dtype=SERIES_DTYPE)
+
+
+def iso_dates(days):
+    """
+    Convert an array of days since epoch into a list of ISO date strings
+
+    """
+    return np.datetime_as_string(np.asarray(days).astype('datetime64[D]')).tolist()
+
+
+def load_series(queryset):
+    """
+    Load the observations of all DataSeries in a queryset with one query and one decoding step
+
+    Returns a long format dataframe with columns identifier, date (datetime64), value, diff, diff_p
+
+    """
+    rows = list(queryset.values_list('identifier', 'series_data'))
+    blobs = [bytes(blob) if blob else b'' for _, blob in rows]
+    lengths = np.fromiter((len(blob) // SERIES_DTYPE.itemsize for blob in blobs), dtype=np.int64, count=len(blobs))
+    records = np.frombuffer(b''.join(blobs), dtype=SERIES_DTYPE)
+    identifiers = np.repeat(np.array([identifier for identifier, _ in rows], dtype=object), lengths)
+    return pd.DataFrame({
+        'identifier': identifiers,
+        'date': records['date'].astype('datetime64[D]'),
+        'value': records['value'],
+        'diff': records['diff'],
+        'diff_p': records['diff_p'],
+    })
+
+
+# frequency: pandas resampling rule (D is the stored daily resolution)
+RESAMPLE_RULES = {'W': 'W', 'M': 'MS'}
+RESAMPLE_AGGREGATIONS = ['mean', 'last', 'max']
+
+
+def slice_range(records, start=None, end=None):
+    """
+    The records with start <= date <= end (ISO date strings, open ended if None)
+
+    Records are sorted by date so the range is found with a binary search
+    """
+    lo = 0 if start is None else np.searchsorted(records['date'], np.datetime64(start, 'D').astype('<i4'), 'left')
+    hi = len(records) if end is None else np.searchsorted(records['date'], np.datetime64(end, 'D').astype('<i4'),
+                                                          'right')
+    return records[lo:hi]
+
+
+def resample(days, values, frequency, how='mean'):
+    """
+    Resample observations to a lower frequency (W weekly or M monthly), aggregating with mean, last or max
+
+    Periods without observations are dropped
+
+    :return: (days since epoch, values) arrays
+    """
+    series = pd.Series(values, index=pd.DatetimeIndex(np.asarray(days).astype('datetime64[D]')))
+    resampled = series.resample(RESAMPLE_RULES[frequency]).agg(how).dropna()
+    return resampled.index.values.astype('datetime64[D]').astype('<i4'), resampled.to_numpy(dtype=float)
+
+
+def lttb(x, y, points):
+    """
+    Largest triangle three buckets downsampling
+
+    The first and last observations are kept, the remaining observations are split into points - 2
+    buckets and from each bucket the observation forming the largest triangle with the previously
+    selected observation and the average of the next bucket is kept.
+
+    :return: the indexes of the selected observations
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (points - 2)
+    edges = np.append((np.arange(points - 1) * every).astype(np.int64) + 1, n)
+    edges[points - 2] = n - 1
+    indexes = np.empty(points, dtype=np.int64)
+    indexes[0] = 0
+    indexes[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], edges[i + 2]
+        cx = x[next_lo:next_hi].mean()
+        cy = np.nanmean(y[next_lo:next_hi]) if np.isfinite(y[next_lo:next_hi]).any() else y[a]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        indexes[i + 1] = a
+    return indexes
+
+
+def query_series(records, start=None, end=None, frequency=None, how='mean', points=None):
+    """
+    Date range slice, resample and downsample a series for display
+
+    :param records: the record array of a series (see unpack_series)
+    :param frequency: None (or D) keeps the stored resolution, W and M resample weekly or monthly with how
+    :param points: target number of points for LTTB downsampling (None keeps all observations)
+    :return: dictionary with the ISO dates and the values
+    """
+    records = slice_range(records, start, end)
+    days = records['date']
+    values = records['value']
+    if frequency and frequency != 'D':
+        days, values = resample(days, values, frequency, how)
+    if points:
+        selected = lttb(days, values, points)
+        days, values = days[selected], values[selected]
+    return {'dates': iso_dates(days), 'values': np.asarray(values, dtype=float).tolist()}
@@ -48,6 +48,8 @@ urlpatterns = [
     re_path(r'^dataseries/metrics/(?P<slug>[-\w.]+)$', views.DSMetricsView.as_view(), name='Metrics'),
     re_path(r'^dataseries/all/(?P<color>\w+)$', views.DataSeriesListView.as_view(), name='DataSeries_filter'),
     re_path(r'^dataseries/plot/(?P<slug>[-\w.]+)$', views.DSPlotView.as_view(), name='Plot'),
+    re_path(r'^dataseries/query/(?P<slug>[-\w.]+)$', views.DSQueryView.as_view(), name='Query'),
+    re_path(r'^cube/(?P<activity>\w+)$', views.PolicyCubeView.as_view(), name='Cube'),
 
     # STATISTICS VIEWS
     re_path(r'^statistics/country/table/(?P<activity>[-\w]+)$', views.StatsCountryTableView.as_view(),
@@ -20,13 +20,22 @@
 
 import json
 
+from django.core.exceptions import BadRequest
 from django.db.models import Q
-from django.views.generic import DetailView, ListView
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from django.views.generic import DetailView, ListView, View
 
 from policy.models import DashBoardParams
 from policy.models import DataFlow
 from policy.models import DataSeries
 from policy.models import GeoSlice
+from policy.cube import cube_payload
+from policy.geoslices import list_payload, map_payload
+from policy.metrics import activity_metrics, paired_metrics
+from policy.queries import MAP_QUERY, PLOT_QUERY, parse_query, series_query
+from policy.regions import region_counts
 from policy.settings import country_dict, activities_short, activities, stat_strings
 
 
@@ -82,14 +91,8 @@ class DataFlowCountryView(DetailView):
         context = super(DetailView, self).get_context_data(**kwargs)
         dataflow = super(DataFlowCountryView, self).get_object()
 
-        # count all tracked series per region
-        series_list = DataSeries.objects.filter(df_name=dataflow.identifier)
-        # count all active series per region
-        f1 = Q(color='red')
-        f2 = Q(color='orange')
-        f3 = Q(color='yellow')
-        f0 = Q(df_name=dataflow.identifier)
-        active_list = DataSeries.objects.filter(f0 & (f1 | f2 | f3))
+        # count all tracked and active series per region (grouped query)
+        counts = region_counts(dataflow.identifier)
 
         dimensions = dataflow.dimensions
         regions = {}
@@ -101,26 +104,13 @@ class DataFlowCountryView(DetailView):
 
         for code in regions:
             code_parts = code.split('.')
-            dashboard_n = 0
-            live_n = 0
             if len(code_parts) == 2:
                 region = {}
                 region['title'] = code_parts[1]
                 region['title_long'] = regions[code]
-
-                for tracked in series_list:
-                    tregion = tracked.identifier.split('.')[1]
-                    if tregion == region['title']:
-                        dashboard_n += 1
-
-                for active in active_list:
-                    tregion = active.identifier.split('.')[1]
-                    if tregion == region['title']:
-                        live_n += 1
-
-                region['dashboard_n'] = dashboard_n
-                region['live_n'] = live_n
-
+                counted = counts.get(code_parts[1], {})
+                region['dashboard_n'] = counted.get('dashboard_n', 0)
+                region['live_n'] = counted.get('live_n', 0)
                 region_list.append(region)
 
         # Construct region list datas
@@ -383,6 +373,7 @@ class DataSeriesView(DetailView):
         unit = dataseries.unit
         context.update({'unit': json.dumps(unit)})
         context.update({'df_size': dataflow.dashboard_n})
+        context.update({'series': json.dumps(dataseries.series_payload())})
         return context
 
 
@@ -399,6 +390,7 @@ class DSMetricsView(DetailView):
         unit = dataseries.unit
         context.update({'unit': json.dumps(unit)})
         context.update({'df_size': dataflow.dashboard_n})
+        context.update({'series': json.dumps(dataseries.series_payload())})
         return context
 
 
@@ -428,14 +420,14 @@ class DSPlotView(DetailView):
 
     # We pass the following to the template
     # * the Dataseries object (implicitly as object, used in ds_breadcrumb)
-    # * object.values, object.unit, object.dates, object.dates as json to
+    # * the series values, dates and metrics as json to
     # timeseries_graph_numerical.js or
     # timeseries_graph_ordinal.js
 
     def get_context_data(self, **kwargs):
         context = super(DetailView, self).get_context_data(**kwargs)
         dataseries = super(DSPlotView, self).get_object()
-        metrics = json.loads(dataseries.metrics)
+        metrics = dataseries.get_metrics()
         maxval = metrics['Max']
         minval = metrics['Min']
         average = metrics['Mean']
@@ -443,6 +435,13 @@ class DSPlotView(DetailView):
         code_list = dataseries.code_list
         context.update({'maxval': maxval, 'minval': minval, 'average': average, 'latest': latest})
         context.update({'code_list': code_list})
+        # the observations at the plot display resolution unless other query parameters are given
+        try:
+            query = parse_query(self.request.GET, defaults=PLOT_QUERY)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        series = series_query(dataseries, **query)
+        context.update({'series': json.dumps(dict(series, metrics=metrics))})
         return context
 
 
@@ -462,6 +461,42 @@ class DSInteractiveView(DetailView):
         return context
 
 
+# 3e Data Series Query (Range, Resampled and Downsampled Observations as JSON)
+class DSQueryView(DetailView):
+    """
+    The observations of a dataseries for display
+
+    Query parameters: start and end dates (ISO), frequency (D, W or M), how (mean, last or max)
+    and points (target number of points for shape preserving downsampling)
+
+    """
+    model = DataSeries
+    slug_field = 'identifier'
+
+    def get(self, request, *args, **kwargs):
+        dataseries = self.get_object()
+        try:
+            query = parse_query(request.GET)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        return JsonResponse(series_query(dataseries, **query))
+
+
+# 3f Policy Cube (Aligned Country x Date Values of an Activity as compressed JSON)
+@method_decorator(gzip_page, name='dispatch')
+class PolicyCubeView(View):
+    """
+    The dense country x date cube of an activity for map animations and cross-country statistics
+
+    """
+
+    def get(self, request, *args, **kwargs):
+        payload = cube_payload(self.kwargs['activity'])
+        if payload is None:
+            raise Http404('No policy cube for this activity')
+        return JsonResponse(payload)
+
+
 # 4 Data Series Filtered by Date List
 # class DataSeriesListView(LoginRequiredMixin, ListView):
 class DataSeriesListView(ListView):
@@ -510,37 +545,13 @@ class GSMapView(DetailView):
         # get the geoslice
         geoslice = super(GSMapView, self).get_object()
         ac = geoslice.identifier.split('.')[1]
-        # get the list of dataseries that are part of the geoslice
-        dataseries = geoslice.dataset_id
-        # print(dataseries)
-        # construct the dataset to send to the template
-        # the dataset for the policy type for each country
-        dataset = {}
-        query = Q()
-        for ds in dataseries:
-            query |= Q(identifier=ds)
-        entries = DataSeries.objects.filter(query)
-
-        for full_entry in entries:
-            # print(full_entry)
-            entry = {}
-            # the redirect url in case we want to drill down
-            entry['url'] = 'plot/' + full_entry.identifier
-            # # we fetch the actual dataseries
-            # full_entry = DataSeries.objects.filter(identifier=ds)
-            # TBD
-            dataid = full_entry.identifier.split('.')[0]
-            # DS title
-            entry['title'] = full_entry.title
-            # DS long title
-            entry['title_long'] = full_entry.title_long
-            # DS observation dates
-            entry['dates'] = full_entry.dates
-            # DS observation values
-            # values (% change)
-            entry['values'] = full_entry.values
-            # values (demeaned)
-            dataset[dataid] = entry
+        # the dataset for the policy type for each country (all member dataseries with one query)
+        # at the map display resolution unless other query parameters are given
+        try:
+            query = parse_query(self.request.GET, defaults=MAP_QUERY)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        dataset = map_payload(geoslice, **query)
 
         activity_dict = {}
         for i in activities_short:
@@ -567,18 +578,7 @@ class GSListView(DetailView):
     def get_context_data(self, **kwargs):
         context = super(DetailView, self).get_context_data(**kwargs)
         geoslice = super(GSListView, self).get_object()
-        gs_list = geoslice.dataset_id
-        series_list = []
-        for ds in gs_list:
-            series_data = {}
-            dataset = DataSeries.objects.filter(identifier=ds)
-            series_data['pk'] = dataset[0].pk
-            series_data['title'] = dataset[0].title
-            series_data['title_long'] = dataset[0].title_long
-            series_data['last_observation_date'] = dataset[0].last_observation_date
-            series_data['identifier'] = dataset[0].identifier
-            series_data['rest_url'] = dataset[0].rest_url
-            series_list.append(series_data)
+        series_list = list_payload(geoslice)
 
         # Construct content description for help display
         content_data = {}
@@ -634,23 +634,17 @@ class StatsCountryTableView(ListView):
         context = super(ListView, self).get_context_data(**kwargs)
         activity = self.kwargs['activity']
 
-        # Iterate over all dataflows and construct the relevant dataseries list
-
-        f1 = Q(agg_level='Country')
-        f2 = Q(activity=activity)
-        series_list = DataSeries.objects.filter(f1 & f2)
-
-        # series_list = DataSeries.objects.all()
+        # The materialized metrics of the relevant dataseries (single indexed query)
         stats_list = []
-        for series in series_list:
-            # if series.region == '' and series.activity == activity:
+        for df_name, max_value, min_value, mean, latest, vol in \
+                activity_metrics(activity, ['Max', 'Min', 'Mean', 'T', 'Vol']):
             stats = {}
-            stats['name'] = country_dict[series.df_name]
-            stats['Max'] = json.loads(series.metrics)['Max']
-            stats['Min'] = json.loads(series.metrics)['Min']
-            stats['Average'] = json.loads(series.metrics)['Mean']
-            stats['Latest'] = json.loads(series.metrics)['T']
-            stats['Vol'] = json.loads(series.metrics)['Vol']
+            stats['name'] = country_dict[df_name]
+            stats['Max'] = max_value
+            stats['Min'] = min_value
+            stats['Average'] = mean
+            stats['Latest'] = latest
+            stats['Vol'] = vol
             stats_list.append(stats)
 
         activity_string = activities[activities_short.index(activity)]
@@ -673,18 +667,8 @@ class StatsCountryHistogramView(ListView):
         activity_string = activities[activities_short.index(activity)]
         stat_string = stat_strings[stat]
 
-        # Iterate over all dataflows and construct the relevant dataseries list
-
-        f1 = Q(agg_level='Country')
-        f2 = Q(activity=activity)
-        series_list = DataSeries.objects.filter(f1 & f2)
-
-        # series_list = DataSeries.objects.all()
-        values = []
-        for series in series_list:
-            # if series.region == '' and series.activity == activity:
-            value = json.loads(series.metrics)[stat]
-            values.append(value)
+        # The materialized metric of the relevant dataseries (single indexed query)
+        values = [value for _, value in activity_metrics(activity, [stat])]
 
         # print(stat)
         context.update({'stat': stat_string})
@@ -709,15 +693,8 @@ class StatsCountryCorrelationView(ListView):
         activity_string1 = activities[activities_short.index(activity1)]
         activity_string2 = activities[activities_short.index(activity2)]
 
-        # Filter the relevant dataseries list
-
-        f1 = Q(agg_level='Country')
-        f2 = Q(activity=activity1)
-        f3 = Q(activity=activity2)
-        series_list1 = DataSeries.objects.filter(f1 & f2)
-        series_list2 = DataSeries.objects.filter(f1 & f3)
-        N1 = len(series_list1)
-        N2 = len(series_list2)
+        # Pair the materialized metrics of the relevant dataseries by dataflow (hash join)
+        pairs = paired_metrics(activity1, activity2, ['Min', 'Max', 'Mean', 'T'])
 
         dictionary_data = {
             'A1': 'Minimum Observed ' + activity_string1 + ' Mobility',
@@ -726,43 +703,34 @@ class StatsCountryCorrelationView(ListView):
             'A4': 'Latest Mobility Observation for ' + activity_string1,
         }
 
-        stat_dict = {
-            ''
-        }
-
         # All country dict
         policy1 = {}
         policy2 = {}
 
-        i = 1
-        for series1 in series_list1:
-            for series2 in series_list2:
-                if series2.df_name == series1.df_name:
-                    # country data dict
-                    country_name = country_dict[series1.df_name]
-                    country1 = {}
-                    country1['A1'] = json.loads(series1.metrics)['Min']
-                    country1['A2'] = json.loads(series1.metrics)['Max']
-                    country1['A3'] = json.loads(series1.metrics)['Mean']
-                    country1['A4'] = json.loads(series1.metrics)['T']
-                    country1['M0'] = country_name
-                    country1['M1'] = metadata[series1.df_name]['population_count']
-                    try:
-                        country1['M2'] = metadata[series1.df_name]['stress_level']
-                    except:
-                        country1['M2'] = 0
-                    country2 = {}
-                    country2['A1'] = json.loads(series2.metrics)['Min']
-                    country2['A2'] = json.loads(series2.metrics)['Max']
-                    country2['A3'] = json.loads(series2.metrics)['Mean']
-                    country2['A4'] = json.loads(series2.metrics)['T']
-                    country2['M0'] = country_name
-                    country1['M1'] = metadata[series1.df_name]['population_count']
-                    # country1['M2'] = metadata[series1.df_name]['stress_level']
-                    # indexed by integer value
-                    policy1[str(i)] = country1
-                    policy2[str(i)] = country2
-                    i += 1
+        for i, pair in enumerate(pairs.to_dict('records'), start=1):
+            # country data dict
+            df_name = pair['df_name']
+            country_name = country_dict[df_name]
+            country1 = {}
+            country1['A1'] = pair['Min_1']
+            country1['A2'] = pair['Max_1']
+            country1['A3'] = pair['Mean_1']
+            country1['A4'] = pair['T_1']
+            country1['M0'] = country_name
+            country1['M1'] = metadata[df_name]['population_count']
+            try:
+                country1['M2'] = metadata[df_name]['stress_level']
+            except:
+                country1['M2'] = 0
+            country2 = {}
+            country2['A1'] = pair['Min_2']
+            country2['A2'] = pair['Max_2']
+            country2['A3'] = pair['Mean_2']
+            country2['A4'] = pair['T_2']
+            country2['M0'] = country_name
+            # indexed by integer value
+            policy1[str(i)] = country1
+            policy2[str(i)] = country2
 
         context.update({'policy1': policy1})
         context.update({'policy2': policy2})
@@ -328,6 +328,18 @@ class Borrower(models.Model):
     total_liabilities = models.BigIntegerField(blank=True, null=True,
                                                help_text='Amount of total liabilities held by the Corporate Counterparty on the balance sheet as defined by the applicable accounting standard as per the latest available financial statements. <a class="risk_manual_url" href="https://www.openriskmanual.org/wiki/EBA_NPL.Counterparty.Total_Liabilities">Documentation</a>')
 
+    #
+    # CREDIT SCORING FIELDS (not part of the EBA template)
+    #
+    retained_earnings = models.BigIntegerField(blank=True, null=True,
+                                               help_text='Amount of retained earnings of the Corporate Counterparty as per the latest available financial statements. Input of the SME z-score model')
+
+    interest_expenses = models.BigIntegerField(blank=True, null=True,
+                                               help_text='Amount of annual interest expenses of the Corporate Counterparty as per the latest available financial statements. Input of the SME z-score model')
+
+    probability_of_default = models.FloatField(blank=True, null=True,
+                                               help_text='Probability of default estimated by the SME z-score model')
+
     #
     # BOOKKEEPING FIELDS
     #
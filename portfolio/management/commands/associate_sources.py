@@ -18,27 +18,28 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
 from portfolio.EmissionsSource import GPPEmissionsSource
 from portfolio.Project import Project
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Associate an emissions source with a project'
 
-    indata = []
-    serial = 1
-    for pr in Project.objects.all():
-        source = GPPEmissionsSource(
-            source_identifier='GPP-' + str(serial),
-            project=pr,
-            comments='Created automatically')
+    def run(self, *args, **options):
+        with self.stage('Create sources'):
+            indata = []
+            serial = 1
+            for pr_id in Project.objects.order_by('pk').values_list('pk', flat=True):
+                source = GPPEmissionsSource(
+                    source_identifier='GPP-' + str(serial),
+                    project_id=pr_id,
+                    comments='Created automatically')
 
-        serial += 1
-        indata.append(source)
+                serial += 1
+                indata.append(source)
 
-    GPPEmissionsSource.objects.bulk_create(indata)
+        with self.stage('Insert sources'):
+            GPPEmissionsSource.objects.bulk_create(indata, batch_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully associated GPP emissions sources with Projects'))
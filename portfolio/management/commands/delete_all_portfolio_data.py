@@ -54,39 +54,39 @@ class Command(BaseCommand):
     help = 'Deletes all portfolio data from the database (no backup!)'
     Debug = False
 
-    ProjectAsset.objects.all().delete()
-    Building.objects.all().delete()
-    PowerPlant.objects.all().delete()
-    PointSource.objects.all().delete()
-    AreaSource.objects.all().delete()
-    MultiAreaSource.objects.all().delete()
-    PortfolioManager.objects.all().delete()
-    ProjectPortfolio.objects.all().delete()
-    PortfolioSnapshot.objects.all().delete()
-    PortfolioTable.objects.all().delete()
-    LimitStructure.objects.all().delete()
-    Borrower.objects.all().delete()
-    Contractor.objects.all().delete()
-    Counterparty.objects.all().delete()
-    EmissionsSource.objects.all().delete()
-    GPCEmissionsSource.objects.all().delete()
-    BuildingEmissionsSource.objects.all().delete()
-    GPPEmissionsSource.objects.all().delete()
-    Loan.objects.all().delete()
-    Mortgage.objects.all().delete()
-    Operator.objects.all().delete()
-    PrimaryEffect.objects.all().delete()
-    Project.objects.all().delete()
-    ProjectActivity.objects.all().delete()
-    ProjectCategory.objects.all().delete()
-    ProjectCompany.objects.all().delete()
-    ProjectEvent.objects.all().delete()
-    Revenue.objects.all().delete()
-    SecondaryEffect.objects.all().delete()
-    Sponsor.objects.all().delete()
-    Stakeholders.objects.all().delete()
-    Swap.objects.all().delete()
-    Certificate.objects.all().delete()
-
     def handle(self, *args, **options):
+        ProjectAsset.objects.all().delete()
+        Building.objects.all().delete()
+        PowerPlant.objects.all().delete()
+        PointSource.objects.all().delete()
+        AreaSource.objects.all().delete()
+        MultiAreaSource.objects.all().delete()
+        PortfolioManager.objects.all().delete()
+        ProjectPortfolio.objects.all().delete()
+        PortfolioSnapshot.objects.all().delete()
+        PortfolioTable.objects.all().delete()
+        LimitStructure.objects.all().delete()
+        Borrower.objects.all().delete()
+        Contractor.objects.all().delete()
+        Counterparty.objects.all().delete()
+        EmissionsSource.objects.all().delete()
+        GPCEmissionsSource.objects.all().delete()
+        BuildingEmissionsSource.objects.all().delete()
+        GPPEmissionsSource.objects.all().delete()
+        Loan.objects.all().delete()
+        Mortgage.objects.all().delete()
+        Operator.objects.all().delete()
+        PrimaryEffect.objects.all().delete()
+        Project.objects.all().delete()
+        ProjectActivity.objects.all().delete()
+        ProjectCategory.objects.all().delete()
+        ProjectCompany.objects.all().delete()
+        ProjectEvent.objects.all().delete()
+        Revenue.objects.all().delete()
+        SecondaryEffect.objects.all().delete()
+        Sponsor.objects.all().delete()
+        Stakeholders.objects.all().delete()
+        Swap.objects.all().delete()
+        Certificate.objects.all().delete()
+
         self.stdout.write(self.style.SUCCESS('Deleted all portfolio data. Good Luck!'))
@@ -18,50 +18,49 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader, ForeignKey
 from portfolio.Contractor import Contractor
 from portfolio.Project import Project
 
 
-class Command(BaseCommand):
-    help = 'Imports Contractor data'
+class ContractorLoader(CSVLoader):
+    """
+    PK,PROJECT,SME,OFFICIALNAME,NATIONALID,ADDRESS,TOWN,POSTAL_CODE,COUNTRY,NUTS,PHONE,E_MAIL,URL,FAX
 
-    # Delete existing objects
-    Contractor.objects.all().delete()
+    """
+    model = Contractor
+    columns = {
+        'contractor_identifier': 'PK',
+        'is_sme': 'SME',
+        'contractor_legal_entity_identifier': 'NATIONALID',
+        'name_of_contractor': 'OFFICIALNAME',
+        'address': 'ADDRESS',
+        'town': 'TOWN',
+        'postal_code': 'POSTAL_CODE',
+        'country': 'COUNTRY',
+        'phone': 'PHONE',
+        'email': 'E_MAIL',
+        'fax': 'FAX',
+        'region': 'NUTS',
+        'website': 'URL',
+    }
+    foreign_keys = {'project': ForeignKey('PROJECT', Project)}
 
-    # Import data from file
-    data = pd.read_csv("co.csv", header='infer', delimiter=',')
 
-    """
-    SME,OFFICIALNAME,NATIONALID,ADDRESS,TOWN,POSTAL_CODE,COUNTRY,NUTS,PHONE,E_MAIL,URL,FAX
+class Command(BatchCommand):
+    help = 'Imports Contractor data'
 
-    """
-    indata = []
-    serial = 10000
-    for index, entry in data.iterrows():
-        pr = Project.objects.get(pk=entry['PROJECT'])
-        co = Contractor(
-            contractor_identifier=entry['PK'],
-            project=pr,
-            is_sme=entry['SME'],
-            contractor_legal_entity_identifier=entry['NATIONALID'],
-            name_of_contractor=entry['OFFICIALNAME'],
-            address=entry['ADDRESS'],
-            town=entry['TOWN'],
-            postal_code=entry['POSTAL_CODE'],
-            country=entry['COUNTRY'],
-            phone=entry['PHONE'],
-            email=entry['E_MAIL'],
-            fax=entry['FAX'],
-            region=entry['NUTS'],
-            website=entry['URL'])
-        serial += 1
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='co.csv', help='The contractor data file (csv)')
 
-        indata.append(co)
+    def run(self, *args, **options):
+        # Delete existing objects
+        with self.stage('Delete contractors'):
+            Contractor.objects.all().delete()
 
-    Contractor.objects.bulk_create(indata)
+        # Import data from file
+        with self.stage('Insert contractors'):
+            self.rows += ContractorLoader().load(options['path'], chunk_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully inserted contractor data into db'))
@@ -20,39 +20,41 @@
 
 import json
 
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
 from portfolio.Portfolios import ProjectPortfolio, PortfolioSnapshot
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Imports Equator Principles portfolio data'
 
-    ep_data = json.load(open('bt_ep.json', 'r'))
-    ps = []  # portfolio snapshot (year)
-    po = []  # portfolio (bank)
-
-    for entry in ep_data:
-        ps.append(entry['Year'])
-        po.append(entry['Bank'])
-    ps = list(set(ps))
-    po = list(set(po))
-
-    # Delete existing objects
-    ProjectPortfolio.objects.all().delete()
-    PortfolioSnapshot.objects.all().delete()
-
-    indata = []
-    for e in ps:
-        snap = PortfolioSnapshot(name=e)
-        indata.append(snap)
-    PortfolioSnapshot.objects.bulk_create(indata)
-
-    indata = []
-    for e in po:
-        portfolio = ProjectPortfolio(name=e)
-        indata.append(portfolio)
-    ProjectPortfolio.objects.bulk_create(indata)
-
-    def handle(self, *args, **options):
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='bt_ep.json', help='The Equator Principles project data file (json)')
+
+    def run(self, *args, **options):
+        ep_data = json.load(open(options['path'], 'r'))
+        ps = []  # portfolio snapshot (year)
+        po = []  # portfolio (bank)
+
+        for entry in ep_data:
+            ps.append(entry['Year'])
+            po.append(entry['Bank'])
+        ps = list(set(ps))
+        po = list(set(po))
+
+        # Delete existing objects
+        ProjectPortfolio.objects.all().delete()
+        PortfolioSnapshot.objects.all().delete()
+
+        indata = []
+        for e in ps:
+            snap = PortfolioSnapshot(name=e)
+            indata.append(snap)
+        PortfolioSnapshot.objects.bulk_create(indata, batch_size=self.chunk_size)
+
+        indata = []
+        for e in po:
+            portfolio = ProjectPortfolio(name=e)
+            indata.append(portfolio)
+        ProjectPortfolio.objects.bulk_create(indata, batch_size=self.chunk_size)
+
         self.stdout.write(self.style.SUCCESS('Successfully inserted equator principles portfolio data into db'))
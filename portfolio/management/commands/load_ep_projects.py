@@ -20,34 +20,43 @@
 
 import json
 
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.versions import touch
 from portfolio.Portfolios import ProjectPortfolio, PortfolioSnapshot
 from portfolio.Project import Project
 from portfolio.ProjectCategory import ProjectCategory
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Imports Equator Principles project data'
 
-    ep_data = json.load(open('bt_ep.json', 'r'))
-
-    # Delete existing objects
-    Project.objects.all().delete()
-
-    indata = []
-    for e in ep_data:
-        category = ProjectCategory.objects.get(name=e['Sector'])
-        portfolio = ProjectPortfolio.objects.get(name=e['Bank'])
-        snap = PortfolioSnapshot.objects.get(name=e['Year'])
-        print(category.name, portfolio.name, snap.name)
-        project = Project(project_identifier=e['Project'],
-                          project_category=category,
-                          snapshot=snap,
-                          portfolio=portfolio
-                          )
-        indata.append(project)
-    Project.objects.bulk_create(indata)
-
-    def handle(self, *args, **options):
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='bt_ep.json', help='The Equator Principles project data file (json)')
+
+    def run(self, *args, **options):
+        with self.stage('Read file'):
+            with open(options['path'], 'r') as f:
+                ep_data = json.load(f)
+
+        # Delete existing objects
+        with self.stage('Delete projects'):
+            Project.objects.all().delete()
+
+        with self.stage('Create projects'):
+            categories = {c.name: c for c in ProjectCategory.objects.all()}
+            portfolios = {p.name: p for p in ProjectPortfolio.objects.all()}
+            snapshots = {s.name: s for s in PortfolioSnapshot.objects.all()}
+            indata = []
+            for e in ep_data:
+                project = Project(project_identifier=e['Project'],
+                                  project_category=categories[e['Sector']],
+                                  snapshot=snapshots[str(e['Year'])],
+                                  portfolio=portfolios[e['Bank']]
+                                  )
+                indata.append(project)
+
+        with self.stage('Insert projects'):
+            Project.objects.bulk_create(indata, batch_size=self.chunk_size)
+            touch(Project)
+
         self.stdout.write(self.style.SUCCESS('Successfully inserted equator principles portfolio data into db'))
@@ -18,48 +18,43 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader, ForeignKey
 from portfolio.Project import Project
 from portfolio.ProjectActivity import ProjectActivity
 
 
-class Command(BaseCommand):
-    help = 'Imports project activity data'
-
-    # Delete existing objects
-    ProjectActivity.objects.all().delete()
-
-    # Import data from file
-    data = pd.read_csv("pa.csv", header='infer', delimiter=',')
-
+class ProjectActivityLoader(CSVLoader):
     """
-    TITLE,NUTS,MAIN_SITE,SHORT_DESCR
+    PK,PROJECT,TITLE,NUTS,MAIN_SITE,SHORT_DESCR
 
     """
-    indata = []
-    serial = 10000
-
-    for index, entry in data.iterrows():
-        pr = Project.objects.get(pk=entry['PROJECT'])
-
-        # TODO fix null issue with markdown field
-        pa = ProjectActivity(
-            project_activity_identifier=entry['PK'],
-            project=pr,
-            project_activity_title=entry['TITLE'],
-            project_activity_description=entry['SHORT_DESCR'],
-            region=entry['NUTS'],
-            baseline_procedure_justification="",
-            main_site=entry['MAIN_SITE'])
+    model = ProjectActivity
+    columns = {
+        'project_activity_identifier': 'PK',
+        'project_activity_title': 'TITLE',
+        'project_activity_description': 'SHORT_DESCR',
+        'region': 'NUTS',
+        'main_site': 'MAIN_SITE',
+    }
+    foreign_keys = {'project': ForeignKey('PROJECT', Project)}
+    # TODO fix null issue with markdown field
+    constants = {'baseline_procedure_justification': ''}
+
+
+class Command(BatchCommand):
+    help = 'Imports project activity data'
 
-        serial += 1
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='pa.csv', help='The project activity data file (csv)')
 
-        indata.append(pa)
-        # pa.save()
+    def run(self, *args, **options):
+        # Delete existing objects
+        with self.stage('Delete activities'):
+            ProjectActivity.objects.all().delete()
 
-    ProjectActivity.objects.bulk_create(indata)
+        # Import data from file
+        with self.stage('Insert activities'):
+            self.rows += ProjectActivityLoader().load(options['path'], chunk_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully inserted project activity data into db'))
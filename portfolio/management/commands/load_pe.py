@@ -18,44 +18,40 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader, ForeignKey
 from portfolio.Project import Project
 from portfolio.ProjectEvent import ProjectEvent
 
 
-class Command(BaseCommand):
-    help = 'Imports project activity data'
-
-    # Delete existing objects
-    ProjectEvent.objects.all().delete()
-
-    # Import data from file
-    data = pd.read_csv("pe.csv", header='infer', delimiter=',')
-
+class ProjectEventLoader(CSVLoader):
     """
-    TITLE,NUTS,MAIN_SITE,SHORT_DESCR
+    PK,PROJECT,TYPE,PUB_DATE,SHORT_DESCR
 
     """
-    indata = []
-    serial = 10000
+    model = ProjectEvent
+    columns = {
+        'project_event_identifier': 'PK',
+        'project_event_type': 'TYPE',
+        'project_event_date': 'PUB_DATE',
+        'project_event_description': 'SHORT_DESCR',
+    }
+    foreign_keys = {'project': ForeignKey('PROJECT', Project)}
 
-    for index, entry in data.iterrows():
-        pr = Project.objects.get(pk=entry['PROJECT'])
 
-        pe = ProjectEvent(
-            project_event_identifier=entry['PK'],
-            project=pr,
-            project_event_type=entry['TYPE'],
-            project_event_date=entry['PUB_DATE'],
-            project_event_description=entry['SHORT_DESCR'])
+class Command(BatchCommand):
+    help = 'Imports project activity data'
 
-        serial += 1
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='pe.csv', help='The project event data file (csv)')
 
-        indata.append(pe)
+    def run(self, *args, **options):
+        # Delete existing objects
+        with self.stage('Delete events'):
+            ProjectEvent.objects.all().delete()
 
-    ProjectEvent.objects.bulk_create(indata)
+        # Import data from file
+        with self.stage('Insert events'):
+            self.rows += ProjectEventLoader().load(options['path'], chunk_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully inserted project event data into db'))
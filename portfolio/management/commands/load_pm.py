@@ -18,50 +18,54 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader
 from portfolio.PortfolioManager import PortfolioManager
 
 
-class Command(BaseCommand):
-    help = 'Imports portfolio manager data'
-
-    # Delete existing objects
-    PortfolioManager.objects.all().delete()
-
-    # Import data from file
-    data = pd.read_csv("pm.csv", header='infer', delimiter=',')
-
+class PortfolioManagerLoader(CSVLoader):
     """
-    
     PK,OFFICIALNAME,ENTITY_TYPE,ENTITY_ACTIVITY,NATIONALID,ADDRESS,TOWN,POSTAL_CODE,COUNTRY,E_MAIL,NUTS,URL_GENERAL,URL_BUYER,CONTACT_POINT,PHONE,FAX
+
     """
-    indata = []
-    serial = 0
-    for index, entry in data.iterrows():
-        pm = PortfolioManager(
-            manager_identifier=serial,
-            manager_legal_entity_identifier=entry['NATIONALID'],
-            name_of_manager=entry['OFFICIALNAME'],
-            entity_type=entry['ENTITY_TYPE'],
-            entity_activity=entry['ENTITY_ACTIVITY'],
-            address=entry['ADDRESS'],
-            town=entry['TOWN'],
-            postal_code=entry['POSTAL_CODE'],
-            country=entry['COUNTRY'],
-            phone=entry['PHONE'],
-            email=entry['E_MAIL'],
-            fax=entry['FAX'],
-            region=entry['NUTS'],
-            website=entry['URL_GENERAL'],
-            pm_website=entry['URL_BUYER'],
-            contact_point=entry['CONTACT_POINT'])
-        serial += 1
+    model = PortfolioManager
+    columns = {
+        'manager_identifier': 'SERIAL',
+        'manager_legal_entity_identifier': 'NATIONALID',
+        'name_of_manager': 'OFFICIALNAME',
+        'entity_type': 'ENTITY_TYPE',
+        'entity_activity': 'ENTITY_ACTIVITY',
+        'address': 'ADDRESS',
+        'town': 'TOWN',
+        'postal_code': 'POSTAL_CODE',
+        'country': 'COUNTRY',
+        'phone': 'PHONE',
+        'email': 'E_MAIL',
+        'fax': 'FAX',
+        'region': 'NUTS',
+        'website': 'URL_GENERAL',
+        'pm_website': 'URL_BUYER',
+        'contact_point': 'CONTACT_POINT',
+    }
+
+    def normalize(self, chunk):
+        # managers are numbered in file order
+        return chunk.assign(SERIAL=chunk.index)
+
+
+class Command(BatchCommand):
+    help = 'Imports portfolio manager data'
+
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='pm.csv', help='The portfolio manager data file (csv)')
 
-        indata.append(pm)
+    def run(self, *args, **options):
+        # Delete existing objects
+        with self.stage('Delete managers'):
+            PortfolioManager.objects.all().delete()
 
-    PortfolioManager.objects.bulk_create(indata)
+        # Import data from file
+        with self.stage('Insert managers'):
+            self.rows += PortfolioManagerLoader().load(options['path'], chunk_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully inserted portfolio manager data into db'))
@@ -18,37 +18,36 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
 from portfolio.Portfolios import ProjectPortfolio, PortfolioManager
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Imports (project) portfolio data'
 
-    # Delete existing objects
-    ProjectPortfolio.objects.all().delete()
+    def run(self, *args, **options):
+        # Delete existing objects
+        ProjectPortfolio.objects.all().delete()
 
-    # Import portfolio manager data from file
-    # NB: For now we do 1-1 portfolio - portfolio manager
+        # Import portfolio manager data from file
+        # NB: For now we do 1-1 portfolio - portfolio manager
 
-    """
-    OFFICIALNAME,ADDRESS,TOWN,POSTAL_CODE,COUNTRY,PHONE,E_MAIL,FAX,NUTS,URL_GENERAL,URL_BUYER,CONTACT_POINT,NATIONALID
-    """
+        """
+        OFFICIALNAME,ADDRESS,TOWN,POSTAL_CODE,COUNTRY,PHONE,E_MAIL,FAX,NUTS,URL_GENERAL,URL_BUYER,CONTACT_POINT,NATIONALID
+        """
 
-    serial = 1
-    indata = []
-    for pm in PortfolioManager.objects.all():
-        po = ProjectPortfolio(
-            name='Portfolio ' + str(serial),
-            manager=pm,
-            notes='The Portfolio of ' + pm.name_of_manager,
-            portfolio_type=0)
-        serial += 1
+        serial = 1
+        indata = []
+        for pm in PortfolioManager.objects.only('pk', 'name_of_manager'):
+            po = ProjectPortfolio(
+                name='Portfolio ' + str(serial),
+                manager=pm,
+                notes='The Portfolio of ' + pm.name_of_manager,
+                portfolio_type=0)
+            serial += 1
 
-        indata.append(po)
+            indata.append(po)
 
-    ProjectPortfolio.objects.bulk_create(indata)
+        ProjectPortfolio.objects.bulk_create(indata, batch_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully inserted portfolio data into db'))
@@ -18,79 +18,64 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader, ForeignKey
 from portfolio.Portfolios import ProjectPortfolio
 from portfolio.Project import Project
 from portfolio.ProjectCategory import ProjectCategory
 
 
-class Command(BaseCommand):
-    help = 'Imports Project data from csv file'
-
-    # Delete existing objects
-    Project.objects.all().delete()
-
-    # Import data from file
-    data = pd.read_csv("pr.csv", header='infer', delimiter=',')
-
+class ProjectLoader(CSVLoader):
     """
-    TITLE,REFERENCE_NUMBER,CPV_CODE, CPA_CODE, COUNTRY, TYPE_CONTRACT,
-    SHORT_DESCR,VAL_TOTAL,CURRENCY
+    TITLE,REFERENCE_NUMBER,CPV_CODE,COUNTRY,REGION,TYPE_CONTRACT,SHORT_DESCR,VAL_TOTAL,CURRENCY
+    and optionally MANAGER (the portfolio key) and DOCUMENT (the project identifier)
 
     """
-    indata = []
-    serial = 0
-
-    pk1 = ProjectCategory.objects.get(name="SUPPLIES")
-    pk2 = ProjectCategory.objects.get(name="WORKS")
-    pk3 = ProjectCategory.objects.get(name="SERVICES")
-    fk = None
-
-    for index, entry in data.iterrows():
-
-        if entry['TYPE_CONTRACT'] == 'SUPPLIES':
-            fk = pk1
-        elif entry['TYPE_CONTRACT'] == 'WORKS':
-            fk = pk2
-        elif entry['TYPE_CONTRACT'] == 'SERVICES':
-            fk = pk3
-
-        if 'MANAGER' in entry.keys():
-            # po = ProjectPortfolio.objects.get(manager=entry['MANAGER'])
-            po = ProjectPortfolio.objects.get(pk=entry['MANAGER'])
-        else:
-            po = ProjectPortfolio.objects.first()
-
-        if 'DOCUMENT' in entry.keys():
-            project_identifier = entry['DOCUMENT']
-        else:
-            project_identifier = str(serial)
-
-        description = 'No Project Description is given'
-        if type(entry['SHORT_DESCR']) is str:
-            description = entry['SHORT_DESCR']
+    model = Project
+    columns = {
+        'project_identifier': 'DOCUMENT',
+        'project_reference': 'REFERENCE_NUMBER',
+        'project_title': 'TITLE',
+        'project_description': 'SHORT_DESCR',
+        'cpv_code': 'CPV_CODE',
+        'country': 'COUNTRY',
+        'region': 'REGION',
+        'project_budget': 'VAL_TOTAL',
+        'project_currency': 'CURRENCY',
+    }
+    foreign_keys = {
+        # SUPPLIES, WORKS or SERVICES
+        'project_category': ForeignKey('TYPE_CONTRACT', ProjectCategory, 'name', required=False),
+        'portfolio': ForeignKey('MANAGER', ProjectPortfolio),
+    }
+    constants = {'cpa_code': None}
+
+    def __init__(self):
+        # Projects without a MANAGER column are assigned to the first portfolio
+        self.default_portfolio = ProjectPortfolio.objects.values_list('pk', flat=True).first()
+
+    def normalize(self, chunk):
+        if 'MANAGER' not in chunk.columns:
+            chunk = chunk.assign(MANAGER=self.default_portfolio)
+        if 'DOCUMENT' not in chunk.columns:
+            chunk = chunk.assign(DOCUMENT=chunk.index.astype(str))
+        chunk = chunk.assign(SHORT_DESCR=chunk['SHORT_DESCR'].fillna('No Project Description is given'))
+        return chunk
+
+
+class Command(BatchCommand):
+    help = 'Imports Project data from csv file'
 
-        pr = Project(
-            # id=entry['PK'],
-            project_identifier=project_identifier,
-            project_reference=entry['REFERENCE_NUMBER'],
-            project_title=entry['TITLE'],
-            project_description=description,
-            cpv_code=entry['CPV_CODE'],
-            cpa_code=None,
-            country=entry['COUNTRY'],
-            region=entry['REGION'],
-            project_category=fk,
-            portfolio=po,
-            project_budget=entry['VAL_TOTAL'],
-            project_currency=entry['CURRENCY'])
-        serial += 1
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='pr.csv', help='The project data file (csv)')
 
-        indata.append(pr)
+    def run(self, *args, **options):
+        # Delete existing objects
+        with self.stage('Delete projects'):
+            Project.objects.all().delete()
 
-    Project.objects.bulk_create(indata)
+        # Import data from file
+        with self.stage('Insert projects'):
+            self.rows += ProjectLoader().load(options['path'], chunk_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully inserted project data into db'))
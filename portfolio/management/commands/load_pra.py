@@ -18,49 +18,44 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader, ForeignKey
 from portfolio.Asset import ProjectAsset
 from portfolio.Project import Project
 
 
-class Command(BaseCommand):
-    help = 'Imports project asset data'
-
-    # Delete existing objects
-    ProjectAsset.objects.all().delete()
-
-    # Import data from file
-    data = pd.read_csv("pra.csv", header='infer', delimiter=',')
-
+class ProjectAssetLoader(CSVLoader):
     """
     PK,PROJECT,ASSET_CLASS,DESCRIPTION,REGISTRATION_NUMBER,LEGAL_OWNER,ASSET_GHG_EMISSIONS,CITY_OF_REGISTERED_LOCATION,COUNTRY_OF_REGISTERED_LOCATION
 
-
     """
-    indata = []
-    serial = 10000
-
-    for index, entry in data.iterrows():
-        pr = Project.objects.get(pk=entry['PROJECT'])
-
-        pra = ProjectAsset(
-            asset_identifier=entry['PK'],
-            project=pr,
-            asset_class=entry['ASSET_CLASS'],
-            description=entry['DESCRIPTION'],
-            registration_number=entry['REGISTRATION_NUMBER'],
-            legal_owner=entry['LEGAL_OWNER'],
-            asset_ghg_emissions=entry['ASSET_GHG_EMISSIONS'],
-            city_of_registered_location=entry['CITY_OF_REGISTERED_LOCATION'],
-            country_of_registered_location=entry['COUNTRY_OF_REGISTERED_LOCATION'])
+    model = ProjectAsset
+    columns = {
+        'asset_identifier': 'PK',
+        'asset_class': 'ASSET_CLASS',
+        'description': 'DESCRIPTION',
+        'registration_number': 'REGISTRATION_NUMBER',
+        'legal_owner': 'LEGAL_OWNER',
+        'asset_ghg_emissions': 'ASSET_GHG_EMISSIONS',
+        'city_of_registered_location': 'CITY_OF_REGISTERED_LOCATION',
+        'country_of_registered_location': 'COUNTRY_OF_REGISTERED_LOCATION',
+    }
+    foreign_keys = {'project': ForeignKey('PROJECT', Project)}
+
+
+class Command(BatchCommand):
+    help = 'Imports project asset data'
 
-        serial += 1
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='pra.csv', help='The project asset data file (csv)')
 
-        indata.append(pra)
+    def run(self, *args, **options):
+        # Delete existing objects
+        with self.stage('Delete assets'):
+            ProjectAsset.objects.all().delete()
 
-    ProjectAsset.objects.bulk_create(indata)
+        # Import data from file
+        with self.stage('Insert assets'):
+            self.rows += ProjectAssetLoader().load(options['path'], chunk_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully inserted project asset data into db'))
@@ -21,31 +21,38 @@
 import json
 import os
 
-from django.core.management.base import BaseCommand
-
+from equinox.batch import BatchCommand
 from equinox.settings import BASE_DIR
+from equinox.versions import touch
 from portfolio.Project import Project
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Map a CPV Code to a CPA Code'
 
-    # Load the mapping table from disk
-    FILE = os.path.join(BASE_DIR, 'reference/cpv_cpa_dict.json')
-    f = open(FILE, mode='r')
-    cpv_map = json.load(f)
-    # Update the CPA code for all projects
-    indata = []
-    for pr in Project.objects.all():
-        if len(pr.cpv_code) == 8:
-            pr.cpa_code = cpv_map[pr.cpv_code]
-        else:  # hack for string based definition of single digit division cpv codes (03, 09 etc)
-            cpv_code = '0' + pr.cpv_code
-            pr.cpa_code = cpv_map[cpv_code]
-        indata.append(pr)
-
-    Project.objects.bulk_update(indata, ['cpa_code'])
-    f.close()
-
-    def handle(self, *args, **options):
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default=os.path.join(BASE_DIR, 'reference/cpv_cpa_dict.json'),
+                            help='The CPV to CPA mapping table (json)')
+
+    def run(self, *args, **options):
+        # Load the mapping table from disk
+        with self.stage('Load mapping'):
+            with open(options['path'], mode='r') as f:
+                cpv_map = json.load(f)
+
+        # Update the CPA code for all projects
+        with self.stage('Map codes'):
+            indata = []
+            for pr in Project.objects.only('pk', 'cpv_code'):
+                if len(pr.cpv_code) == 8:
+                    pr.cpa_code = cpv_map[pr.cpv_code]
+                else:  # hack for string based definition of single digit division cpv codes (03, 09 etc)
+                    cpv_code = '0' + pr.cpv_code
+                    pr.cpa_code = cpv_map[cpv_code]
+                indata.append(pr)
+
+        with self.stage('Update projects'):
+            Project.objects.bulk_update(indata, ['cpa_code'], batch_size=self.chunk_size)
+            touch(Project)
+
         self.stdout.write(self.style.SUCCESS('Successfully mapped CPV codes to CPA codes'))
@@ -3,7 +3,6 @@ const attribution = '&copy; <a href="https://www.openstreetmap.org/copyright">Op
 const map = L.map('map')
 
 L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {attribution: attribution}).addTo(map);
-const geodata = JSON.parse(document.getElementById('geodata').textContent);
 
 L.Marker.prototype.options.icon = L.icon({
     iconUrl: "/static/reporting/img/sort_desc.png",
@@ -11,17 +10,25 @@ L.Marker.prototype.options.icon = L.icon({
     iconAnchor: [5, 5]
 });
 
-let feature = L.geoJSON(geodata).bindPopup(function (layer) {
-}).addTo(map);
-
 function onEachFeature(feature, layer) {
     if (feature.properties && feature.properties.nuts_id) {
-        layer.bindPopup(feature.properties.nuts_id);
+        let label = feature.properties.nuts_id;
+        if (feature.properties.name) {
+            label += ' ' + feature.properties.name;
+        }
+        if (feature.properties.count) {
+            label += ' (' + feature.properties.count + ')';
+        }
+        layer.bindPopup(label);
     }
 }
 
-L.geoJSON(geodata, {
-    onEachFeature: onEachFeature
-}).addTo(map);
-
-map.fitBounds(feature.getBounds(), {padding: [100, 100]});
+// The layer is served with an ETag so the browser cache revalidates it with a conditional request
+fetch(document.getElementById('map').dataset.layerUrl)
+    .then(response => response.json())
+    .then(geodata => {
+        let feature = L.geoJSON(geodata, {
+            onEachFeature: onEachFeature
+        }).addTo(map);
+        map.fitBounds(feature.getBounds(), {padding: [100, 100]});
+    });
@@ -3,19 +3,24 @@ const attribution = '&copy; <a href="https://www.openstreetmap.org/copyright">Op
 const map = L.map('map')
 
 L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {attribution: attribution}).addTo(map);
-const geodata = JSON.parse(document.getElementById('geodata').textContent);
-
-let feature = L.geoJSON(geodata).bindPopup(function (layer) {
-}).addTo(map);
 
 function onEachFeature(feature, layer) {
-    if (feature.properties && feature.properties.nuts_id) {
-        layer.bindPopup(feature.properties.nuts_id);
+    if (feature.properties && feature.properties.name) {
+        layer.bindPopup(feature.properties.name);
     }
 }
 
-L.geoJSON(geodata, {
-    onEachFeature: onEachFeature
-}).addTo(map);
+// Point, area and multi-area source layers (served with an ETag, revalidated by the browser cache)
+const layerUrls = document.getElementById('map').dataset.layerUrls.split(' ');
 
-map.fitBounds(feature.getBounds(), {padding: [100, 100]});
\ No newline at end of file
+Promise.all(layerUrls.map(url => fetch(url).then(response => response.json())))
+    .then(layers => {
+        let group = L.featureGroup(layers.map(geodata => L.geoJSON(geodata, {
+            onEachFeature: onEachFeature
+        }))).addTo(map);
+        if (group.getBounds().isValid()) {
+            map.fitBounds(group.getBounds(), {padding: [100, 100]});
+        } else {
+            map.setView([50, 10], 4);
+        }
+    });
@@ -34,5 +34,8 @@ urlpatterns = [
     path('', AssetList.as_view(), name='Asset Manager'),
     path('map', AssetMapView.as_view(), name='Map'),
     path('scorecards', views.scorecard_api, name='scorecard_api'),
+    path('scorecards/bulk/', views.scorecard_bulk, name='scorecard_bulk'),
     re_path(r'^scorecards/(?P<pk>[0-9]+)/$', views.scorecard_detail, name='scorecard_detail'),
+    path('sme_scores/', views.sme_scores, name='sme_scores'),
+    path('concentration/<int:portfolio>/', views.concentration_snapshot, name='concentration_snapshot'),
 ]
@@ -32,7 +32,7 @@ class EmissionFactor(models.Model):
 
     """
 
-    EF_ID = models.IntegerField(blank=True, null=True,
+    EF_ID = models.IntegerField(blank=True, null=True, unique=True,
                                 help_text='Standard Description')
 
     IPCC_Category = models.CharField(max_length=80, blank=True, null=True,
@@ -20,6 +20,8 @@
 
 from django.contrib.gis.db.models import PointField
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.urls import reverse
 
 
@@ -65,3 +67,62 @@ class NUTS3PointData(models.Model):
     class Meta:
         verbose_name = "NUTS3 Point Geometry"
         verbose_name_plural = "NUTS3 Point Geometries"
+
+
+# Process wide lookup index of NUTS3 region points with the table fingerprint it was loaded at (see nuts3_index)
+_nuts3_index = None
+
+
+def nuts3_fingerprint():
+    """
+    A cheap fingerprint of the NUTS3 point table (row count and maximum primary key)
+
+    """
+    return tuple(NUTS3PointData.objects.aggregate(n=models.Count('pk'), last=models.Max('pk')).values())
+
+
+def nuts3_index():
+    """
+    A dictionary of nuts_id to the (WGS84) point coordinates and name of the region
+
+    The index is loaded with a single query and cached in the process. It is reused as long as the table
+    fingerprint is unchanged, so that bulk loads and changes made by other processes are picked up. Saves
+    and deletes in this process (which may leave the fingerprint unchanged) invalidate it directly.
+
+    """
+    global _nuts3_index
+    fingerprint = nuts3_fingerprint()
+    if _nuts3_index is None or _nuts3_index[0] != fingerprint:
+        index = {}
+        for nuts_id, point, name in NUTS3PointData.objects.values_list('nuts_id', 'coordinates', 'name_latn'):
+            if point.srid and point.srid != 4326:
+                point = point.transform(4326, clone=True)
+            index[nuts_id] = {'coordinates': point.coords, 'name': name}
+        _nuts3_index = (fingerprint, index)
+    return _nuts3_index[1]
+
+
+@receiver(post_save, sender=NUTS3PointData)
+@receiver(post_delete, sender=NUTS3PointData)
+def invalidate_nuts3_index(sender, **kwargs):
+    global _nuts3_index
+    _nuts3_index = None
+
+
+def nuts3_features(region_counts):
+    """
+    GeoJSON features for a list of (nuts_id, count) pairs, one point feature per known region
+
+    """
+    index = nuts3_index()
+    features = []
+    for nuts_id, count in region_counts:
+        region = index.get(nuts_id)
+        if region is None:
+            continue
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': region['coordinates']},
+            'properties': {'nuts_id': nuts_id, 'name': region['name'], 'count': count},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
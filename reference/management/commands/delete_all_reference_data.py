@@ -32,12 +32,12 @@ class Command(BaseCommand):
     help = 'Deletes all reference data from the database (no backup!)'
     Debug = False
 
-    CPVData.objects.all().delete()
-    EmissionFactor.objects.all().delete()
-    BuildingEmissionFactor.objects.all().delete()
-    GPCSector.objects.all().delete()
-    NUTS3PointData.objects.all().delete()
-    ReferenceIntensity.objects.all().delete()
-
     def handle(self, *args, **options):
+        CPVData.objects.all().delete()
+        EmissionFactor.objects.all().delete()
+        BuildingEmissionFactor.objects.all().delete()
+        GPCSector.objects.all().delete()
+        NUTS3PointData.objects.all().delete()
+        ReferenceIntensity.objects.all().delete()
+
         self.stdout.write(self.style.SUCCESS('Deleted all reference data. Good Luck!'))
@@ -18,35 +18,41 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader
 from reference.CPVData import CPVData, CPV_LEVEL_DICT
 
 
-class Command(BaseCommand):
-    help = 'Load common procurement vocabulary as a csv file into equinox'
+class CPVLoader(CSVLoader):
+    """
+    CPV_ID, short_code, level, description
 
-    def handle(self, *args, **kwargs):
-        # Delete existing objects
-        CPVData.objects.all().delete()
+    """
+    model = CPVData
+    columns = {
+        'CPV_ID': 'CPV_ID',
+        'description': 'description',
+        'short_code': 'short_code',
+        'level': 'level',
+    }
 
-        # Import data from file
-        data = pd.read_csv("cpvdata.csv", header='infer', delimiter=',')
+    def normalize(self, chunk):
+        return chunk.assign(level=chunk['level'].map(CPV_LEVEL_DICT))
 
-        """
-        CPV_ID, short_code, level, description
-    
-        """
-        indata = []
 
-        for index, entry in data.iterrows():
-            co = CPVData(
-                CPV_ID=entry['CPV_ID'],
-                description=entry['description'],
-                short_code=entry['short_code'],
-                level=CPV_LEVEL_DICT[entry['level']])
+class Command(BatchCommand):
+    help = 'Load common procurement vocabulary as a csv file into equinox'
 
-            indata.append(co)
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='cpvdata.csv', help='The CPV data file (csv)')
+
+    def run(self, *args, **options):
+        # Delete existing objects
+        with self.stage('Delete codes'):
+            CPVData.objects.all().delete()
+
+        # Import data from file
+        with self.stage('Insert codes'):
+            self.rows += CPVLoader().load(options['path'], chunk_size=self.chunk_size)
 
-        CPVData.objects.bulk_create(indata)
+        self.stdout.write(self.style.SUCCESS('Successfully loaded CPV data'))
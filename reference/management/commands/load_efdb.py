@@ -20,49 +20,56 @@
 
 import csv
 
-from django.core.management import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import bulk_load
 from reference.EmissionFactor import EmissionFactor
 
+# The EFDB export columns in file order
+EFDB_FIELDS = [
+    'EF_ID',
+    'IPCC_Category',
+    'Gases',
+    'Fuel',
+    'Parameter_Type',
+    'Description',
+    'Technology_Practices',
+    'Parameter_Conditions',
+    'Regional_Conditions',
+    'Control_Technologies',
+    'Other_Properties',
+    'Value',
+    'Unit',
+    'Equation',
+    'IPCC_Worksheet',
+    'Data_Source',
+    'Technical_Reference',
+    'English_Abstract',
+    'Lower_Bound',
+    'Upper_Bound',
+    'Data_Quality',
+    'Data_Quality_Reference',
+    'Other_Data_Quality',
+    'Data_Provider_Comments',
+    'Other_Comments',
+    'Data_Provider',
+    'Link',
+]
+
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Load an emissions factor csv file into equinox. Currently the only format supported is the IPCC EFDB database (exported as | separated CSV file)'
 
-    def add_arguments(self, parser):
+    def add_job_arguments(self, parser):
         parser.add_argument('--path', type=str)
 
-    def handle(self, *args, **kwargs):
-        path = kwargs['path']
-        with open(path, 'rt') as f:
-            reader = csv.reader(f, delimiter='|')
-            next(reader)
-            for row in reader:
-                EmissionFactor.objects.create(
-                    EF_ID=row[0],
-                    IPCC_Category=row[1],
-                    Gases=row[2],
-                    Fuel=row[3],
-                    Parameter_Type=row[4],
-                    Description=row[5],
-                    Technology_Practices=row[6],
-                    Parameter_Conditions=row[7],
-                    Regional_Conditions=row[8],
-                    Control_Technologies=row[9],
-                    Other_Properties=row[10],
-                    Value=row[11],
-                    Unit=row[12],
-                    Equation=row[13],
-                    IPCC_Worksheet=row[14],
-                    Data_Source=row[15],
-                    Technical_Reference=row[16],
-                    English_Abstract=row[17],
-                    Lower_Bound=row[18],
-                    Upper_Bound=row[19],
-                    Data_Quality=row[20],
-                    Data_Quality_Reference=row[21],
-                    Other_Data_Quality=row[22],
-                    Data_Provider_Comments=row[23],
-                    Other_Comments=row[24],
-                    Data_Provider=row[25],
-                    Link=row[26]
-                )
+    def run(self, *args, **options):
+        path = options['path']
+        with self.stage('Load factors'):
+            with open(path, 'rt') as f:
+                reader = csv.reader(f, delimiter='|')
+                next(reader)
+                # Existing factors (same EF_ID) are updated in place
+                factors = (EmissionFactor(**dict(zip(EFDB_FIELDS, row))) for row in reader)
+                self.rows += bulk_load(EmissionFactor, factors, batch_size=self.chunk_size, unique_fields=['EF_ID'])
+
+        self.stdout.write(self.style.SUCCESS('Successfully loaded emission factors'))
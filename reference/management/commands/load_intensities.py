@@ -18,37 +18,42 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader
 from reference.EmissionIntensity import ReferenceIntensity
 
 
-class Command(BaseCommand):
+class ReferenceIntensityLoader(CSVLoader):
+    """
+    import reference intensity data per NACE sector / EU country (Eurostat)
+
+    """
+    model = ReferenceIntensity
+    columns = {
+        'Sector': 'sector',
+        'Region': 'region',
+        'Value': 'value',
+    }
+    constants = {
+        'Gases': 'GHG',
+        'Unit': 'Kg / EUR',
+        'Data_Source': 'Eurostat',
+    }
+
+
+class Command(BatchCommand):
     help = 'Load common procurement vocabulary as a csv file into equinox'
 
-    def handle(self, *args, **kwargs):
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='reference_intensity.csv', help='The reference intensity file (csv)')
+
+    def run(self, *args, **options):
         # Delete existing objects
-        ReferenceIntensity.objects.all().delete()
+        with self.stage('Delete intensities'):
+            ReferenceIntensity.objects.all().delete()
 
         # Import data from file
-        data = pd.read_csv("reference_intensity.csv", header='infer', delimiter=',')
-
-        """
-        import reference intensity data per NACE sector / EU country (Eurostat)    
-    
-        """
-        indata = []
-
-        for index, entry in data.iterrows():
-            ri = ReferenceIntensity(
-                Sector=entry['sector'],
-                Gases='GHG',
-                Region=entry['region'],
-                Value=entry['value'],
-                Unit="Kg / EUR",
-                Data_Source='Eurostat')
-
-            indata.append(ri)
-
-        ReferenceIntensity.objects.bulk_create(indata)
+        with self.stage('Insert intensities'):
+            self.rows += ReferenceIntensityLoader().load(options['path'], chunk_size=self.chunk_size)
+
+        self.stdout.write(self.style.SUCCESS('Successfully loaded reference intensities'))
@@ -73,9 +73,9 @@ class SummaryStatisticsAdmin(admin.ModelAdmin):
 
 
 class AggregatedStatisticsAdmin(admin.ModelAdmin):
-    fields = ('country', 'sector', 'value_total', 'co2_amount')
-    list_display = ('country', 'sector', 'value_total', 'co2_amount')
-    list_filter = ('sector', 'country')
+    fields = ('level', 'country', 'sector', 'year', 'currency', 'value_total', 'co2_amount')
+    list_display = ('level', 'country', 'sector', 'year', 'currency', 'value_total', 'co2_amount')
+    list_filter = ('level', 'sector', 'country')
 
     save_as = False
     view_on_site = False
@@ -30,3 +30,9 @@ from django.utils.translation import gettext_lazy as _
 class ResultsExplorerConfig(AppConfig):
     name = 'reporting'
     verbose_name = _('Reporting')
+
+    def ready(self):
+        from reporting import geolayers, grid, rollup
+        geolayers.connect_signals()
+        grid.connect_signals()
+        rollup.connect_signals()
@@ -0,0 +1,130 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+import pandas as pd
+from django.db.models import Q
+from django.utils import timezone
+
+from equinox.versions import touch
+from portfolio.EmissionsSource import GPPEmissionsSource
+from reference.EmissionIntensity import intensity, ReferenceIntensity
+from reporting.models import AggregatedStatistics
+
+"""
+Emissions intensity join engine
+
+The reference intensity table is loaded once into an in-memory (sector, region) index
+which is then joined against columnar batches of emissions sources.
+
+* mode = 0 is a testing mode (CPV division based intensities)
+* mode = 1 uses Eurostat CPA based emissions intensities per GPP emissions source
+* mode = 2 uses Eurostat CPA based emissions intensities per CPA/Country Aggregate (EUR amounts only)
+
+"""
+
+# The source model and the columns holding (sector, region, amount) per mode
+EMISSIONS_MODES = {
+    0: (GPPEmissionsSource, ('project__cpv_code', None, 'project__project_budget')),
+    1: (GPPEmissionsSource, ('project__cpa_code', 'project__country', 'project__project_budget')),
+    2: (AggregatedStatistics, ('sector', 'country', 'value_total')),
+}
+
+# The sources each mode applies to: the intensities are in Kg per EUR so per currency
+# aggregates (see reporting.rollup) are only joined for EUR amounts
+EMISSIONS_SCOPES = {
+    2: Q(currency__isnull=True) | Q(currency='EUR'),
+}
+
+
+def intensity_index():
+    """
+    Load all reference intensities with a single query into a (sector, region) indexed series
+
+    Non-numeric values are discarded. Where a (sector, region) pair is duplicated the first entry is used.
+
+    """
+    records = ReferenceIntensity.objects.order_by('pk').values_list('Sector', 'Region', 'Value')
+    frame = pd.DataFrame.from_records(list(records), columns=['sector', 'region', 'multiplier'])
+    frame['multiplier'] = pd.to_numeric(frame['multiplier'], errors='coerce')
+    frame = frame.dropna().drop_duplicates(subset=['sector', 'region'], keep='first')
+    return frame.set_index(['sector', 'region'])['multiplier']
+
+
+def join_intensities(batch, index, mode=2):
+    """
+    Compute the CO2 amount of a columnar batch of sources (pk, sector, region, amount)
+
+    Returns the batch with a co2_amount column which is NaN for sources without a matching intensity
+
+    """
+    amount = pd.to_numeric(batch['amount'], errors='coerce').astype(float)
+    if mode == 0:
+        multiplier = batch['sector'].str[:2].map(intensity).astype(float)
+        multiplier = multiplier.where(amount > 0)
+        co2_amount = np.round(amount * multiplier / 1000000, 1)
+    else:
+        keys = pd.MultiIndex.from_arrays([batch['sector'], batch['region']])
+        multiplier = index.reindex(keys).to_numpy()
+        co2_amount = np.round(amount.to_numpy() * multiplier, 1)
+    return batch.assign(co2_amount=co2_amount)
+
+
+def compute_emissions(mode=2, chunk_size=10000, dry_run=False):
+    """
+    Compute intensity based emissions for all sources of the selected mode
+
+    Sources are streamed in chunks of chunk_size rows, joined against the intensity index
+    and the results written back with bulk_update. Sources without a match are left unchanged.
+
+    :return: dictionary with the total, matched and unmatched source counts
+    """
+    model, columns = EMISSIONS_MODES[mode]
+    fields = ['pk'] + [c for c in columns if c]
+    names = ['pk'] + [n for n, c in zip(['sector', 'region', 'amount'], columns) if c]
+    index = intensity_index() if mode > 0 else None
+
+    total = 0
+    matched = 0
+    last_pk = None
+    while True:
+        # keyset pagination keeps memory bounded and avoids writing into an open cursor
+        queryset = model.objects.filter(EMISSIONS_SCOPES.get(mode, Q())).order_by('pk')
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        chunk = list(queryset.values_list(*fields)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        batch = pd.DataFrame.from_records(chunk, columns=names)
+        batch = join_intensities(batch, index, mode)
+        batch = batch[batch['co2_amount'].notna()]
+        total += len(chunk)
+        matched += len(batch)
+        if not dry_run:
+            # bulk_update does not apply auto_now
+            now = timezone.now()
+            indata = [model(pk=pk, co2_amount=value, last_change_date=now) for pk, value in
+                      zip(batch['pk'].tolist(), batch['co2_amount'].tolist())]
+            model.objects.bulk_update(indata, ['co2_amount', 'last_change_date'], batch_size=chunk_size)
+
+    if not dry_run:
+        touch(model)
+    return {'total': total, 'matched': matched, 'unmatched': total - matched}
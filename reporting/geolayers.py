@@ -0,0 +1,108 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+from functools import partial
+
+from django.core.cache import cache
+from django.core.serializers import serialize
+from django.db.models import Count
+
+from equinox.versions import table_version, track
+from portfolio.Contractor import Contractor
+from portfolio.PortfolioManager import PortfolioManager
+from portfolio.Project import Project
+from portfolio.models import PointSource, AreaSource, MultiAreaSource
+from reference.NUTS3Data import NUTS3PointData, nuts3_features
+
+"""
+Geo layer cache for the reporting maps
+
+Each map layer is serialized once into GeoJSON bytes and kept in the django cache. The layer ETag is
+the data version of the tables the layer is built from (see equinox.versions), read with one indexed
+query on every request, and keys the cached bytes, so a layer is regenerated after any process
+(including bulk loaders) has committed a change to its tables. Layers are served by the geo_layer
+view which supports conditional GET so browsers only download a layer again after it has changed.
+
+"""
+
+
+def region_counts(queryset):
+    """
+    The number of entities per NUTS3 region (grouped in the database)
+
+    """
+    return queryset.exclude(region__isnull=True).values_list('region').annotate(count=Count('pk')).order_by()
+
+
+def nuts3_layer():
+    return nuts3_features((nuts_id, None) for nuts_id in NUTS3PointData.objects.values_list('nuts_id', flat=True))
+
+
+def entity_layer(model):
+    return nuts3_features(region_counts(model.objects.all()))
+
+
+def source_layer(model):
+    return json.loads(serialize('geojson', model.objects.all(), geometry_field='location', fields=('name',)))
+
+
+# layer name: (builder, models the layer is built from)
+GEO_LAYERS = {
+    'nuts3': (nuts3_layer, [NUTS3PointData]),
+    'projects': (partial(entity_layer, Project), [NUTS3PointData, Project]),
+    'managers': (partial(entity_layer, PortfolioManager), [NUTS3PointData, PortfolioManager]),
+    'contractors': (partial(entity_layer, Contractor), [NUTS3PointData, Contractor]),
+    'point_sources': (partial(source_layer, PointSource), [PointSource]),
+    'area_sources': (partial(source_layer, AreaSource), [AreaSource]),
+    'multi_area_sources': (partial(source_layer, MultiAreaSource), [MultiAreaSource]),
+}
+
+
+def layer_etag(name):
+    """
+    The ETag of a layer (the data version of the tables the layer is built from)
+
+    """
+    builder, models = GEO_LAYERS[name]
+    return '"%s"' % table_version(*models)
+
+
+def cache_key(name, etag):
+    return 'geo_layer:%s:%s' % (name, etag.strip('"'))
+
+
+def get_layer(name):
+    """
+    The (etag, GeoJSON bytes) of a layer, built on a cache miss
+
+    """
+    etag = layer_etag(name)
+    content = cache.get(cache_key(name, etag))
+    if content is None:
+        builder, models = GEO_LAYERS[name]
+        content = json.dumps(builder(), separators=(',', ':')).encode('utf-8')
+        cache.set(cache_key(name, etag), content, None)
+    return etag, content
+
+
+def connect_signals():
+    track(*{model for builder, models in GEO_LAYERS.values() for model in models})
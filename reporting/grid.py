@@ -0,0 +1,91 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+from django.core.cache import cache
+
+from equinox.versions import table_version, track
+from reporting.models import AggregatedStatistics
+
+"""
+Country x sector grid data service
+
+The aggregated statistics are pulled with one query into a dense (sector x country) numpy matrix
+with sorted sector and country label indexes. The grid is cached under the AggregatedStatistics
+data version (see equinox.versions), which is bumped by saves and deletes and by the bulk writers
+(rollup, compute_emissions) once they commit, in any process.
+
+"""
+
+# NACE section: (name, pictogram)
+NACE_PICTOGRAMS = {s[0]: (s[2:-4], s) for s in [
+    'A_Agriculture.svg',
+    'B_Mining.svg',
+    'C_Manufacture.svg',
+    'D_Electricity.svg',
+    'E_Water.svg',
+    'F_Construction.svg',
+    'G_Trading.svg',
+    'H_Transport.svg',
+    'I_Accommodation.svg',
+    'J_ICT.svg',
+    'K_Finance.svg',
+    'L_RealEstate.svg',
+    'M_Professional.svg',
+    'N_Administrative.svg',
+    'O_PublicSector.svg',
+    'P_Education.svg',
+    'Q_Health.svg',
+    'R_Recreation.svg',
+    'S_OtherServices.svg',
+    'T_Households.svg',
+    'U_NGO.svg',
+]}
+
+
+def data_version():
+    return table_version(AggregatedStatistics)
+
+
+def grid_matrix(field='co2_amount'):
+    """
+    The (sector x country) matrix of an AggregatedStatistics field (at the sector section level)
+
+    Missing cells and null values are zero, duplicate (country, sector) entries are summed
+
+    :return: dictionary with the sorted sectors, the sorted country codes and the matrix
+    """
+    key = 'country_sector_grid:%s:%s' % (data_version(), field)
+    grid = cache.get(key)
+    if grid is None:
+        records = AggregatedStatistics.objects.filter(level='section').exclude(country__isnull=True) \
+            .exclude(country='').exclude(sector__isnull=True).values_list('country', 'sector', field)
+        countries, sectors, values = zip(*records) if records else ((), (), ())
+        country_labels, i = np.unique(np.array(countries, dtype=str), return_inverse=True)
+        sector_labels, j = np.unique(np.array(sectors, dtype=str), return_inverse=True)
+        matrix = np.zeros((len(sector_labels), len(country_labels)))
+        np.add.at(matrix, (j, i), np.nan_to_num(np.array(values, dtype=float)))
+        grid = {'sectors': sector_labels.tolist(), 'countries': country_labels.tolist(), 'matrix': matrix}
+        cache.set(key, grid, None)
+    return grid
+
+
+def connect_signals():
+    track(AggregatedStatistics)
@@ -18,38 +18,28 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from django.core.management import BaseCommand
-
-from reporting.models import SummaryStatistics, AggregatedStatistics
-
-
-class Command(BaseCommand):
-    help = 'Aggregate summary statistics across time for top-level sectors'
-
-    def handle(self, *args, **kwargs):
-        # Delete existing objects
-        AggregatedStatistics.objects.all().delete()
-
-        stats = SummaryStatistics.objects.all()
-
-        # aggregate sectors to top level
-        top_level = {}
-        for entry in stats:
-            dataid = entry.sector[:1]
-            key = (dataid, entry.country)
-            if key in top_level.keys():
-                top_level[key] += entry.value_total
-            else:
-                top_level[key] = entry.value_total
-
-        indata = []
-        for key in top_level:
-            # print(key[0], key[1], top_level[key])
-            co = AggregatedStatistics(
-                country=key[1],
-                sector=key[0],
-                value_total=top_level[key]
-            )
-            indata.append(co)
-
-        AggregatedStatistics.objects.bulk_create(indata)
+from equinox.batch import BatchCommand
+from reporting.rollup import ROLLUP_LEVELS, rollup
+
+
+class Command(BatchCommand):
+    """
+      aggregate summary statistics per country and sector prefix with a database GROUP BY
+      at the selected rollup levels (default all levels)
+      update, create or delete only the aggregated cells of the selected countries (default all)
+
+    """
+    help = 'Aggregate summary statistics for top-level sectors (and other rollup levels)'
+
+    def add_job_arguments(self, parser):
+        parser.add_argument('--country', nargs='*', default=None, help='Country codes to aggregate')
+        parser.add_argument('--level', nargs='*', default=None, choices=list(ROLLUP_LEVELS),
+                            help='Rollup levels to aggregate')
+
+    def run(self, *args, **options):
+        with self.stage('Roll up statistics'):
+            result = rollup(countries=options['country'], levels=options['level'])
+        self.rows += result['created'] + result['updated']
+        self.stdout.write('Aggregated cells created: %d updated: %d deleted: %d' % (
+            result['created'], result['updated'], result['deleted']))
+        self.stdout.write(self.style.SUCCESS('Successfully aggregated summary statistics'))
@@ -18,71 +18,30 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from django.core.management.base import BaseCommand
+from equinox.batch import BatchCommand
+from reporting.emissions import compute_emissions, EMISSIONS_MODES
 
-from portfolio.EmissionsSource import GPPEmissionsSource
-from reference.EmissionIntensity import intensity, ReferenceIntensity
-from reporting.models import AggregatedStatistics
 
-
-class Command(BaseCommand):
+class Command(BatchCommand):
     """
       iterate over procurement portfolio (project portfolio)
-      read emissions intensity from cpv_code dictionary
+      join emissions intensities from an in-memory (sector, region) index
       set co2_amount as emissions intensity times project budget
-      save updated source data   
+      save updated source data in chunks
 
       mode = 0 is a testing mode
       mode = 1 uses Eurostat CPA based emissions intensities per GPP emissions source
       mode = 2 uses Eurostat CPA based emissions intensities per CPA/Country Aggregate
 
     """
-    mode = 2
-
-    if mode == 0:
-        gpp_set = GPPEmissionsSource.objects.all()
-        for source in gpp_set.iterator():
-            if source.project.cpv_code[:2] in intensity and source.project.project_budget > 0:
-                multiplier = intensity[source.project.cpv_code[:2]]
-                source.co2_amount = round(source.project.project_budget * multiplier / 1000000, 1)
-                source.save()
-    elif mode == 1:
-        indata = []
-        i = 0
-        gpp_set = GPPEmissionsSource.objects.all()
-        for source in gpp_set.iterator():
-            i += 1
-            cpa = source.project.cpa_code
-            region = source.project.country
-            ri = None
-            try:
-                ri = ReferenceIntensity.objects.get(Sector=cpa, Region=region)
-            except:
-                pass
-            if ri:
-                multiplier = float(ri.Value)
-                budget = source.project.project_budget
-                source.co2_amount = round(budget * multiplier, 1)
-                indata.append(source)
-        GPPEmissionsSource.objects.bulk_update(indata, ['co2_amount'])
+    help = 'Compute CPA intensity based emissions'
 
-    elif mode == 2:
-        indata = []
-        source_set = AggregatedStatistics.objects.all()
-        for source in source_set.iterator():
-            cpa = source.sector
-            region = source.country
-            ri = None
-            try:
-                ri = ReferenceIntensity.objects.get(Sector=cpa, Region=region)
-            except:
-                pass
-            if ri:
-                multiplier = float(ri.Value)
-                budget = source.value_total
-                source.co2_amount = round(budget * multiplier, 1)
-                indata.append(source)
-        AggregatedStatistics.objects.bulk_update(indata, ['co2_amount'])
+    def add_job_arguments(self, parser):
+        parser.add_argument('--mode', type=int, default=2, choices=sorted(EMISSIONS_MODES))
 
-    def handle(self, *args, **options):
+    def run(self, *args, **options):
+        with self.stage('Compute emissions'):
+            result = compute_emissions(mode=options['mode'], chunk_size=self.chunk_size, dry_run=self.dry_run)
+        self.stdout.write('Sources: %d matched: %d unmatched: %d' % (
+            result['total'], result['matched'], result['unmatched']))
         self.stdout.write(self.style.SUCCESS('Successfully computed CPA intensity based emissions'))
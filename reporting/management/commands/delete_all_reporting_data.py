@@ -28,11 +28,11 @@ class Command(BaseCommand):
     help = 'Deletes all reporting data from the database (no backup!)'
     Debug = False
 
-    SummaryStatistics.objects.all().delete()
-    AggregatedStatistics.objects.all().delete()
-    ResultGroup.objects.all().delete()
-    Calculation.objects.all().delete()
-    Visualization.objects.all().delete()
-
     def handle(self, *args, **options):
+        SummaryStatistics.objects.all().delete()
+        AggregatedStatistics.objects.all().delete()
+        ResultGroup.objects.all().delete()
+        Calculation.objects.all().delete()
+        Visualization.objects.all().delete()
+
         self.stdout.write(self.style.SUCCESS('Deleted all reporting data. Good Luck!'))
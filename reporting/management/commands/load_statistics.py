@@ -18,56 +18,76 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pandas as pd
-from django.core.management import BaseCommand
-
+from equinox.batch import BatchCommand
+from equinox.loaders import CSVLoader
+from reporting import rollup
 from reporting.models import SummaryStatistics
 
 
-class Command(BaseCommand):
+class SummaryStatisticsLoader(CSVLoader):
+    """
+    fields = ('year', 'country', 'sector', 'contracts', 'currency', 'value_total')
+
+    """
+    model = SummaryStatistics
+    columns = {
+        'year': 'year',
+        'country': 'country',
+        'sector': 'cpa',
+        'contracts': 'contract_count',
+        'currency': 'currency',
+        'value_total': 'value_total',
+    }
+
+
+class SingleCurrencyLoader(SummaryStatisticsLoader):
+    """
+    Statistics with all values in EUR (total_value column)
+
+    """
+    columns = {
+        'year': 'year',
+        'country': 'country',
+        'sector': 'cpa',
+        'contracts': 'contract_count',
+        'value_total': 'total_value',
+    }
+    constants = {'currency': 'EUR'}
+
+    def normalize(self, chunk):
+        # Eurostat uses UK for Great Britain
+        return chunk.assign(country=chunk['country'].replace('UK', 'GB'))
+
+
+class Command(BatchCommand):
     help = 'Load summary statistics as a csv file into equinox'
 
-    def handle(self, *args, **kwargs):
-        # Delete existing objects
-        SummaryStatistics.objects.all().delete()
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='reporting/fixtures/country_summary_statistics.csv',
+                            help='The summary statistics file (csv)')
 
+    def run(self, *args, **options):
         mode = 'Multicurrency'
         mode = 'Singlecurrency'
 
-        # Import data from file
-        data = pd.read_csv("reporting/fixtures/country_summary_statistics.csv", header='infer', delimiter=',')
+        if mode == 'Multicurrency':
+            loader = SummaryStatisticsLoader()
+        else:
+            loader = SingleCurrencyLoader()
+
+        # Replace all statistics without per row change tracking
+        with rollup.paused():
+            # Delete existing objects
+            with self.stage('Delete statistics'):
+                SummaryStatistics.objects.all().delete()
 
-        """
-        fields = ('year', 'country', 'sector', 'contracts', 'currency', 'value_total')
-    
-        """
-        indata = []
+            # Import data from file
+            with self.stage('Insert statistics'):
+                self.rows += loader.load(options['path'], chunk_size=self.chunk_size)
 
-        if mode == 'Multicurrency':
-            for index, entry in data.iterrows():
-                co = SummaryStatistics(
-                    year=entry['year'],
-                    country=entry['country'],
-                    sector=entry['cpa'],
-                    contracts=entry['contract_count'],
-                    currency=entry['currency'],
-                    value_total=entry['value_total'])
-                indata.append(co)
-
-        elif mode == 'Singlecurrency':
-            for index, entry in data.iterrows():
-                country = None
-                if entry['country'] == 'UK':
-                    country = 'GB'
-                else:
-                    country = entry['country']
-                co = SummaryStatistics(
-                    year=entry['year'],
-                    country=country,
-                    sector=entry['cpa'],
-                    contracts=entry['contract_count'],
-                    currency='EUR',
-                    value_total=entry['total_value'])
-                indata.append(co)
-
-        SummaryStatistics.objects.bulk_create(indata)
+        with self.stage('Roll up statistics'):
+            result = rollup.rollup()
+        self.stdout.write('Aggregated cells created: %d updated: %d deleted: %d' % (
+            result['created'], result['updated'], result['deleted']))
+
+        self.stdout.write(self.style.SUCCESS('Successfully loaded summary statistics'))
@@ -45,23 +45,39 @@ class SummaryStatistics(models.Model):
         return reverse('admin:summary_statistics_change', kwargs={'pk': self.pk})
 
     class Meta:
+        indexes = [models.Index(fields=['country', 'sector'])]
         verbose_name = "Summary Statistics"
         verbose_name_plural = "Summary Statistics"
 
 
+ROLLUP_LEVEL_CHOICES = [
+    ('section', 'Sector Section'),
+    ('division', 'Sector Division'),
+    ('section_year', 'Sector Section per Year'),
+    ('section_currency', 'Sector Section per Currency'),
+]
+
+
 class AggregatedStatistics(models.Model):
     """
     A Simplified Container for aggregated statistics of C02 / Value per country and sector
-    It provides no temporal or currency dimensions
-    It can hold aggregations of more granular Summary Statistics
+    It can hold aggregations of more granular Summary Statistics at different rollup levels (see reporting.rollup).
+    The default (section) level provides no temporal or currency dimensions
 
     """
 
+    level = models.CharField(max_length=20, default='section', choices=ROLLUP_LEVEL_CHOICES,
+                             help_text="The rollup level of the aggregation")
     country = CountryField(null=True, blank=True, help_text='The Country of the measurement')
     sector = models.CharField(max_length=20, blank=True, null=True, help_text="Business Sector")
+    year = models.IntegerField(null=True, blank=True, help_text='The period of the measurement (per year levels)')
+    currency = models.CharField(max_length=4, blank=True, null=True,
+                                help_text="The currency of the measurement (per currency levels)")
     value_total = models.FloatField(blank=True, null=True, help_text='The monetary value (in common currency units)')
     co2_amount = models.FloatField(null=True, blank=True, help_text='CO2 amount in tonnes')
 
+    last_change_date = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return str(self.pk)
 
@@ -69,6 +85,7 @@ class AggregatedStatistics(models.Model):
         return reverse('admin:aggregated_statistics_change', kwargs={'pk': self.pk})
 
     class Meta:
+        indexes = [models.Index(fields=['level', 'country', 'sector'])]
         verbose_name = "Aggregated Statistics"
         verbose_name_plural = "Aggregated Statistics"
 
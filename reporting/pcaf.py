@@ -0,0 +1,168 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+import pandas as pd
+
+from portfolio.Borrower import Borrower
+from portfolio.EmissionsSource import BuildingEmissionsSource
+from portfolio.Mortgage import Mortgage
+from portfolio.Portfolios import ProjectPortfolio
+
+"""
+PCAF mortgage financed emissions engine
+
+All building emissions sources are loaded with a single query (following the asset, loan,
+borrower and emission factor relations in SQL) into a columnar frame. Per source:
+
+* building emissions = building area * emission factor
+* attribution factor = outstanding (legal) balance / property value at origination
+* financed emissions = attribution factor * building emissions
+
+Sources with a missing or zero property value have an undefined (NaN) attribution factor.
+Financed emissions are aggregated per loan, borrower or portfolio. The PCAF data quality score
+of an aggregate is the average of the source scores weighted by outstanding balance.
+
+"""
+
+# Frame column -> queryset path
+SOURCE_COLUMNS = {
+    'source': 'pk',
+    'portfolio': 'asset__loan_identifier__counterparty_identifier__portfolio_id',
+    'borrower': 'asset__loan_identifier__counterparty_identifier',
+    'loan': 'asset__loan_identifier',
+    'building': 'asset',
+    'balance': 'asset__loan_identifier__legal_balance',
+    'valuation': 'asset__initial_valuation_amount',
+    'area': 'asset__building_area_m2',
+    'emission_factor': 'emissions_factor__Emission_factor',
+    'data_quality': 'emissions_factor__PCAF_data_quality_score',
+}
+
+KEY_COLUMNS = ['source', 'portfolio', 'borrower', 'loan', 'building']
+NUMERIC_COLUMNS = ['balance', 'valuation', 'area', 'emission_factor', 'data_quality']
+
+# Report rows per page
+PAGE_SIZE = 100
+
+# Aggregation level -> (model, label field)
+LEVELS = {
+    'loan': (Mortgage, 'contract_identifier'),
+    'borrower': (Borrower, 'counterparty_identifier'),
+    'portfolio': (ProjectPortfolio, 'name'),
+}
+
+
+def source_frame(queryset=None):
+    """
+    Load the building emissions sources of a queryset with one query into a columnar frame
+
+    """
+    if queryset is None:
+        queryset = BuildingEmissionsSource.objects.all()
+    records = queryset.order_by('pk').values_list(*SOURCE_COLUMNS.values())
+    frame = pd.DataFrame.from_records(list(records), columns=list(SOURCE_COLUMNS))
+    for column in KEY_COLUMNS:
+        frame[column] = frame[column].astype('Int64')
+    for column in NUMERIC_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors='coerce').astype(float)
+    return frame
+
+
+def attribute(frame):
+    """
+    Add the building emissions, attribution factor and financed emissions columns to a source frame
+
+    """
+    balance = frame['balance'].to_numpy()
+    valuation = frame['valuation'].to_numpy()
+    attribution = np.full(len(frame), np.nan)
+    np.divide(balance, valuation, out=attribution, where=valuation > 0)
+    building_emissions = frame['area'].to_numpy() * frame['emission_factor'].to_numpy()
+    return frame.assign(building_emissions=building_emissions, attribution=attribution,
+                        financed_emissions=attribution * building_emissions)
+
+
+def weighted_quality(frame, keys):
+    """
+    Balance weighted average data quality score per key (NaN where no source has both)
+
+    """
+    valid = frame['data_quality'].notna() & frame['balance'].notna()
+    weights = frame['balance'].where(valid, 0.0)
+    scores = (frame['data_quality'] * weights).where(valid, 0.0)
+    totals = pd.DataFrame({'scores': scores, 'weights': weights}).groupby(keys).sum()
+    return totals['scores'] / totals['weights'].replace(0.0, np.nan)
+
+
+def aggregate(frame, level):
+    """
+    Aggregate an attributed source frame per loan, borrower or portfolio
+
+    Balances are counted once per loan, emissions are summed over all sources
+    (sources with an undefined attribution factor do not contribute financed emissions).
+
+    """
+    if level not in LEVELS:
+        raise ValueError('Unknown aggregation level: %s' % level)
+    keys = frame[level].fillna(-1).astype(np.int64)
+    grouped = frame.groupby(keys)
+    table = pd.DataFrame({
+        'sources': grouped.size(),
+        'building_emissions': grouped['building_emissions'].sum(),
+        'financed_emissions': grouped['financed_emissions'].sum(),
+    })
+    loans = frame.assign(key=keys).drop_duplicates('loan')
+    table['balance'] = loans.groupby('key')['balance'].sum()
+    table['data_quality'] = weighted_quality(frame, keys)
+    table.index.name = level
+    return table.reset_index()
+
+
+def totals(frame):
+    """
+    Book level totals of an attributed source frame
+
+    Economic emission intensity is the financed emissions per million of outstanding balance
+
+    """
+    balance = float(frame.drop_duplicates('loan')['balance'].sum())
+    financed = float(frame['financed_emissions'].sum())
+    quality = weighted_quality(frame, np.zeros(len(frame), dtype=np.int64))
+    return {
+        'sources': len(frame),
+        'loans': int(frame['loan'].nunique()),
+        'borrowers': int(frame['borrower'].nunique()),
+        'unattributed': int(frame['attribution'].isna().sum()),
+        'balance': balance,
+        'financed_emissions': financed,
+        'data_quality': float(quality.iloc[0]) if len(quality) else np.nan,
+        'intensity': financed / balance * 1e6 if balance > 0 else np.nan,
+    }
+
+
+def labels(level, keys):
+    """
+    Display labels of the loans, borrowers or portfolios in keys (one query)
+
+    """
+    model, field = LEVELS[level]
+    keys = [int(k) for k in keys if pd.notna(k)]
+    return dict(model.objects.filter(pk__in=keys).values_list('pk', field))
@@ -0,0 +1,246 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Substr
+from django.db.models.signals import post_init, post_save, post_delete
+from django.utils import timezone
+
+from equinox.versions import touch
+from reporting.emissions import intensity_index, join_intensities
+from reporting.models import SummaryStatistics, AggregatedStatistics
+
+"""
+Incremental rollup of SummaryStatistics into AggregatedStatistics
+
+Each rollup level aggregates the value_total of summary statistics per country and sector prefix
+(and optionally per year or currency) with a database GROUP BY. A rollup can be restricted to the
+cells affected by a set of changed (country, sector) source keys or to a set of countries, in which
+case only those cells are updated, created or deleted. The co2_amount of created and updated cells
+is recomputed from the emissions intensities (see reporting.emissions, mode 2) so that it never
+refers to a previous value_total. The intensities are EUR based, so only the EUR (or currency-less)
+part of the value of a cell is priced; a cell without such a part has no co2_amount.
+
+Saved and deleted SummaryStatistics rows are tracked through signals (including the previous key
+of an updated row) and rolled up once when the enclosing transaction commits. Bulk loaders pause
+the tracking and run a rollup of their own scope.
+
+"""
+
+# level: (sector prefix length, additional dimensions)
+ROLLUP_LEVELS = {
+    'section': (1, []),
+    'division': (2, []),
+    'section_year': (1, ['year']),
+    'section_currency': (1, ['currency']),
+}
+
+# summary statistics in the scope of the EUR based intensities
+PRICED = Q(currency='EUR') | Q(currency__isnull=True)
+
+
+def source_scope(keys, length):
+    """
+    Q selecting the summary statistics under the cells of a set of (country, sector) keys
+
+    """
+    prefixes = defaultdict(set)
+    for country, sector in keys:
+        if sector:
+            prefixes[country].add(sector[:length])
+    if not prefixes:
+        return Q(pk__in=[])
+    return reduce(or_, [Q(country=country) & reduce(or_, [Q(sector__startswith=p) for p in sorted(values)])
+                        for country, values in prefixes.items()])
+
+
+def cell_scope(keys, length):
+    """
+    Q selecting the aggregated cells of a set of (country, sector) keys
+
+    """
+    prefixes = defaultdict(set)
+    for country, sector in keys:
+        if sector:
+            prefixes[country].add(sector[:length])
+    if not prefixes:
+        return Q(pk__in=[])
+    return reduce(or_, [Q(country=country, sector__in=values) for country, values in prefixes.items()])
+
+
+def aggregate(level, source):
+    """
+    GROUP BY of a summary statistics queryset at a rollup level
+
+    :return: dictionary (country, sector prefix, year, currency) -> (value total, priced value total)
+    """
+    length, dimensions = ROLLUP_LEVELS[level]
+    rows = source.exclude(sector__isnull=True).annotate(prefix=Substr('sector', 1, length)) \
+        .values('country', 'prefix', *dimensions) \
+        .annotate(total=Sum('value_total'), priced=Sum('value_total', filter=PRICED)).order_by()
+    return {(row['country'], row['prefix'], row.get('year'), row.get('currency')): (row['total'], row['priced'])
+            for row in rows}
+
+
+def cell_emissions(cells, amounts, index):
+    """
+    Set the co2_amount of aggregated cells from their priced amounts (None without a matching intensity)
+
+    :param amounts: the EUR (or currency-less) value total of each cell, None if there is none
+    """
+    batch = pd.DataFrame({'sector': [c.sector for c in cells], 'region': [c.country.code for c in cells],
+                          'amount': amounts})
+    co2_amount = join_intensities(batch, index)['co2_amount']
+    for cell, value in zip(cells, co2_amount.tolist()):
+        cell.co2_amount = None if math.isnan(value) else value
+
+
+def rollup(keys=None, countries=None, levels=None):
+    """
+    Recompute aggregated statistics cells
+
+    :param keys: changed (country, sector) source keys (only their cells are recomputed)
+    :param countries: countries to recompute (ignored if keys are given)
+    :param levels: rollup levels (default all)
+    :return: dictionary with the created, updated and deleted cell counts
+    """
+    result = {'created': 0, 'updated': 0, 'deleted': 0}
+    index = None
+    with transaction.atomic():
+        for level in levels or ROLLUP_LEVELS:
+            length, dimensions = ROLLUP_LEVELS[level]
+            source = SummaryStatistics.objects.all()
+            cells = AggregatedStatistics.objects.filter(level=level)
+            if keys is not None:
+                source = source.filter(source_scope(keys, length))
+                cells = cells.filter(cell_scope(keys, length))
+            elif countries is not None:
+                source = source.filter(country__in=countries)
+                cells = cells.filter(country__in=countries)
+
+            fresh = aggregate(level, source)
+            existing = {(country, sector, year, currency): (pk, value) for pk, country, sector, year, currency, value in
+                        cells.values_list('pk', 'country', 'sector', 'year', 'currency', 'value_total')}
+
+            now = timezone.now()
+            changed = [key for key, (value, priced) in fresh.items()
+                       if key in existing and existing[key][1] != value]
+            new = [key for key in fresh if key not in existing]
+            updated = [AggregatedStatistics(pk=existing[key][0], country=key[0], sector=key[1], currency=key[3],
+                                            value_total=fresh[key][0], last_change_date=now) for key in changed]
+            created = [AggregatedStatistics(level=level, country=key[0], sector=key[1], year=key[2], currency=key[3],
+                                            value_total=fresh[key][0]) for key in new]
+            deleted = [pk for key, (pk, value) in existing.items() if key not in fresh]
+
+            if updated or created:
+                # loaded once per rollup, only if any cell changed
+                index = intensity_index() if index is None else index
+                cell_emissions(updated + created, [fresh[key][1] for key in changed + new], index)
+
+            AggregatedStatistics.objects.bulk_update(updated, ['value_total', 'co2_amount', 'last_change_date'],
+                                                     batch_size=1000)
+            AggregatedStatistics.objects.bulk_create(created, batch_size=1000)
+            AggregatedStatistics.objects.filter(pk__in=deleted).delete()
+            result['created'] += len(created)
+            result['updated'] += len(updated)
+            result['deleted'] += len(deleted)
+        if any(result.values()):
+            touch(AggregatedStatistics)
+    return result
+
+
+#
+# Change tracking
+#
+
+_pending = threading.local()
+
+
+def source_key(instance):
+    # the raw field values, so that deferred fields are not loaded
+    country = instance.__dict__.get('country')
+    return str(country) if country else None, instance.__dict__.get('sector')
+
+
+def remember_key(sender, instance, **kwargs):
+    instance._rollup_key = source_key(instance)
+
+
+def mark_changed(keys):
+    if not hasattr(_pending, 'keys'):
+        _pending.keys = set()
+    _pending.keys.update(keys)
+    # every change registers a flush; the first one to run after the commit does the work
+    transaction.on_commit(flush)
+
+
+def flush():
+    keys = getattr(_pending, 'keys', None)
+    if keys:
+        _pending.keys = set()
+        rollup(keys=keys)
+
+
+def track_save(sender, instance, **kwargs):
+    keys = {source_key(instance)}
+    previous = getattr(instance, '_rollup_key', None)
+    if previous is not None:
+        keys.add(previous)
+    instance._rollup_key = source_key(instance)
+    mark_changed(keys)
+
+
+def track_delete(sender, instance, **kwargs):
+    mark_changed({source_key(instance)})
+
+
+def connect_signals():
+    post_init.connect(remember_key, sender=SummaryStatistics, dispatch_uid='rollup_init')
+    post_save.connect(track_save, sender=SummaryStatistics, dispatch_uid='rollup_save')
+    post_delete.connect(track_delete, sender=SummaryStatistics, dispatch_uid='rollup_delete')
+
+
+def disconnect_signals():
+    post_init.disconnect(sender=SummaryStatistics, dispatch_uid='rollup_init')
+    post_save.disconnect(sender=SummaryStatistics, dispatch_uid='rollup_save')
+    post_delete.disconnect(sender=SummaryStatistics, dispatch_uid='rollup_delete')
+
+
+@contextmanager
+def paused():
+    """
+    Pause change tracking (e.g. during bulk loads, which also restores fast queryset deletes)
+
+    The caller is responsible for rolling up the loaded scope
+    """
+    disconnect_signals()
+    try:
+        yield
+    finally:
+        connect_signals()
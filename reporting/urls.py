@@ -42,6 +42,7 @@ urlpatterns = [
     re_path(r'^contractor_nuts3_map$', views.contractor_nuts3_map, name='contractor_nuts3_map'),
     re_path(r'^manager_nuts3_map$', views.manager_nuts3_map, name='manager_nuts3_map'),
     re_path(r'^project_nuts3_map$', views.project_nuts3_map, name='project_nuts3_map'),
+    path('geo_layer/<str:layer>', views.geo_layer, name='geo_layer'),
     re_path(r'^visualization_country$', views.visualization_country, name='visualization_country'),
     re_path(r'^visualization_sector$', views.visualization_sector, name='visualization_sector'),
     re_path(r'^visualization_grid$', views.visualization_grid, name='visualization_grid'),
@@ -21,18 +21,20 @@
 
 import json
 
+import numpy as np
 import pandas as pd
 from django.contrib.auth.decorators import login_required
-from django.core.serializers import serialize
+from django.core.paginator import Paginator
 from django.db.models import Sum
 from django.http import Http404
 from django.http import HttpResponse
 from django.template import RequestContext, loader
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.views.decorators.http import condition
 
 from portfolio.Asset import ProjectAsset
 from portfolio.Contractor import Contractor
-from portfolio.EmissionsSource import GPCEmissionsSource, BuildingEmissionsSource
+from portfolio.EmissionsSource import GPCEmissionsSource
 from portfolio.EmissionsSource import GPPEmissionsSource
 from portfolio.PortfolioManager import PortfolioManager
 from portfolio.Portfolios import ProjectPortfolio
@@ -40,9 +42,11 @@ from portfolio.Project import Project
 from portfolio.ProjectActivity import ProjectActivity
 from portfolio.ProjectEvent import ProjectEvent
 from portfolio.models import MultiAreaSource
-from reference.NUTS3Data import NUTS3PointData
+from reporting import pcaf
 from reporting.forms import CustomPortfolioAggregatesForm, portfolio_attributes, aggregation_choices
-from reporting.models import Calculation, SummaryStatistics, AggregatedStatistics, Visualization
+from reporting.geolayers import GEO_LAYERS, get_layer, layer_etag
+from reporting.grid import NACE_PICTOGRAMS, grid_matrix
+from reporting.models import Calculation, SummaryStatistics, Visualization
 
 """
 
@@ -278,62 +282,54 @@ def credit_portfolio_stats_view(request, pk):
 
 @login_required(login_url='/login/')
 def pcaf_mortgage_report(request):
-    t = loader.get_template('reporting/pcaf_mortgage_report.html')
-    context = RequestContext(request, {})
-
     """ Construct a PCAF Mortgage Emissions report and a Portfolio Carbon Footprint
-    
-    Select Emissions Sources where the asset is Residential Building
-    asset.asset_class = 0
-    
-    Aggregate total emission per asset (sum of emissions sources, weighted average DQ score)
-    
-    
-    Select Loans that are 
-    - Residential Mortgages (asset_class == 0)
-    - with total_balance > 0
+
+    The report lists financed emissions per emissions source (level=source, the default) or
+    aggregated per loan, borrower or portfolio (level=loan|borrower|portfolio), paginated with
+    pcaf.PAGE_SIZE rows per page. Book level totals are always computed over all sources.
 
     """
+    t = loader.get_template('reporting/pcaf_mortgage_report.html')
+    context = RequestContext(request, {})
 
-    for be in BuildingEmissionsSource.objects.all():
-        print(80 * '=')
-        print(be.asset.loan_identifier.counterparty_identifier)
-        print(be.asset.loan_identifier)
-        print(be.asset.loan_identifier.legal_balance)
-        print(be.asset.initial_valuation_amount)
-        print(be.asset.building_area_m2)
-        print(be.emissions_factor.Emission_factor)
+    level = request.GET.get('level', 'source')
+    if level != 'source' and level not in pcaf.LEVELS:
+        raise Http404("Unknown aggregation level")
 
-    table_header = []
-    table_header.append('Borrower')
-    table_header.append('Loan')
-    table_header.append('Legal Balance')
-    table_header.append('Building')
-    table_header.append('Initial Valuation')
-    table_header.append('Area')
-    table_header.append('Emission Factor')
-    table_header.append('Attribution Factor')
-    table_header.append('Financed Emissions')
+    frame = pcaf.attribute(pcaf.source_frame())
+    context.update({'Totals': pcaf.totals(frame)})
+
+    if level == 'source':
+        table = frame
+        columns = ['borrower', 'loan', 'balance', 'building', 'valuation', 'area', 'emission_factor',
+                   'data_quality', 'attribution', 'building_emissions', 'financed_emissions']
+        table_header = ['Borrower', 'Loan', 'Legal Balance', 'Building', 'Initial Valuation', 'Area',
+                        'Emission Factor', 'Data Quality', 'Attribution Factor', 'Building Emissions',
+                        'Financed Emissions']
+    else:
+        table = pcaf.aggregate(frame, level)
+        columns = [level, 'sources', 'balance', 'building_emissions', 'financed_emissions', 'data_quality']
+        table_header = [level.capitalize(), 'Sources', 'Legal Balance', 'Building Emissions',
+                        'Financed Emissions', 'Weighted Data Quality']
+
+    # paginate row positions so that only the displayed page is materialized
+    paginator = Paginator(range(len(table)), pcaf.PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+    rows = table.iloc[list(page.object_list)]
+
+    # resolve the display labels of the page with one query per key column
+    label_columns = ['borrower', 'loan'] if level == 'source' else [level]
+    for column in label_columns:
+        names = pcaf.labels(column, rows[column].unique())
+        rows = rows.assign(**{column: [names.get(k, '-') if pd.notna(k) else '-' for k in rows[column]]})
 
     table_rows = {}
-    key = 0
-    for be in BuildingEmissionsSource.objects.all():
-        value = []
-        value.append(be.asset.loan_identifier.counterparty_identifier)
-        value.append(be.asset.loan_identifier)
-        value.append(be.asset.loan_identifier.legal_balance)
-        value.append(be.asset_id)
-        value.append(be.asset.initial_valuation_amount)
-        value.append(be.asset.building_area_m2)
-        value.append(be.emissions_factor.Emission_factor)
-        value.append(be.asset.loan_identifier.legal_balance / be.asset.initial_valuation_amount)
-        value.append(be.asset.building_area_m2 * be.emissions_factor.Emission_factor)
-        table_rows[key] = value
-        key += 1
-        print(key, value)
+    for key, value in enumerate(rows[columns].itertuples(index=False)):
+        table_rows[key] = ['-' if pd.isna(c) else c for c in value]
 
     context.update({'TableHeader': table_header})
     context.update({'TableRows': table_rows})
+    context.update({'Level': level, 'Levels': ['source'] + list(pcaf.LEVELS), 'Page': page})
     return HttpResponse(t.template.render(context))
 
 
@@ -417,6 +413,19 @@ def scope_2_report(request):
     return HttpResponse(t.template.render(context))
 
 
+@login_required(login_url='/login/')
+@condition(etag_func=lambda request, layer: layer_etag(layer) if layer in GEO_LAYERS else None)
+def geo_layer(request, layer):
+    """
+    Serve a cached GeoJSON map layer (supports conditional GET)
+
+    """
+    if layer not in GEO_LAYERS:
+        raise Http404("Map layer does not exist")
+    etag, content = get_layer(layer)
+    return HttpResponse(content, content_type='application/geo+json')
+
+
 @login_required(login_url='/login/')
 def project_nuts3_map(request):
     t = loader.get_template('reporting/portfolio_map.html')
@@ -427,21 +436,7 @@ def project_nuts3_map(request):
 
     """
 
-    portfolio_data = Project.objects.all()
-    nuts_data = []
-    iter = 1
-    for co in portfolio_data.iterator():
-        nuts = co.region
-        if iter < 100:
-            try:
-                nuts_data.append(NUTS3PointData.objects.get(nuts_id=nuts))
-            except:
-                pass
-            iter += 1
-        else:
-            break
-    geodata = json.loads(serialize("geojson", nuts_data))
-    context.update({'geodata': geodata})
+    context.update({'layer_url': reverse('reporting:geo_layer', kwargs={'layer': 'projects'})})
 
     return HttpResponse(t.template.render(context))
 
@@ -456,26 +451,7 @@ def manager_nuts3_map(request):
 
     """
 
-    # ATTN this is not performant for interactive use due to the large number of lookups
-    # TODO pre-process geometric elements per mappable entity
-
-    portfolio_data = PortfolioManager.objects.all()
-    nuts_data = []
-    iter = 1
-    marker_limit = 3000  # avoid loading huge datasets
-
-    for co in portfolio_data.iterator():
-        nuts = co.region
-        if iter < marker_limit:
-            try:
-                nuts_data.append(NUTS3PointData.objects.get(nuts_id=nuts))
-            except:
-                pass
-            iter += 1
-        else:
-            break
-    geodata = json.loads(serialize("geojson", nuts_data))
-    context.update({'geodata': geodata})
+    context.update({'layer_url': reverse('reporting:geo_layer', kwargs={'layer': 'managers'})})
 
     return HttpResponse(t.template.render(context))
 
@@ -485,34 +461,12 @@ def contractor_nuts3_map(request):
     t = loader.get_template('reporting/portfolio_map.html')
     context = RequestContext(request, {})
 
-    # ATTN this is not performant for interactive use due to the large number of lookups
-    # TODO pre-process geometric elements per mappable entity
-
     """
     Compile a global portfolio map of contractor entities using their NUTS3 representative point geometries
 
     """
 
-    marker_limit = 3000  # avoid loading huge datasets
-
-    # geometry = json.loads(serialize("geojson", PointSource.objects.all()))
-    # geometry = json.loads(serialize("geojson", AreaSource.objects.all()))
-    # geodata = json.loads(serialize("geojson", NUTS3PointData.objects.all()))
-    portfolio_data = Contractor.objects.all()
-    nuts_data = []
-    iter = 1
-    for co in portfolio_data.iterator():
-        nuts = co.region
-        if iter < marker_limit:
-            try:
-                nuts_data.append(NUTS3PointData.objects.get(nuts_id=nuts))
-            except:
-                pass
-            iter += 1
-        else:
-            break
-    geodata = json.loads(serialize("geojson", nuts_data))
-    context.update({'geodata': geodata})
+    context.update({'layer_url': reverse('reporting:geo_layer', kwargs={'layer': 'contractors'})})
 
     return HttpResponse(t.template.render(context))
 
@@ -657,65 +611,18 @@ def visualization_grid(request):
     Visualization - Country-Sector Grid View
 
     """
-    img_list_raw = ['A_Agriculture.svg',
-                    'B_Mining.svg',
-                    'C_Manufacture.svg',
-                    'D_Electricity.svg',
-                    'E_Water.svg',
-                    'F_Construction.svg',
-                    'G_Trading.svg',
-                    'H_Transport.svg',
-                    'I_Accommodation.svg',
-                    'J_ICT.svg',
-                    'K_Finance.svg',
-                    'L_RealEstate.svg',
-                    'M_Professional.svg',
-                    'N_Administrative.svg',
-                    'O_PublicSector.svg',
-                    'P_Education.svg',
-                    'Q_Health.svg',
-                    'R_Recreation.svg',
-                    'S_OtherServices.svg',
-                    'T_Households.svg',
-                    'U_NGO.svg'
-                    ]
-
-    name_list = [s[2:-4] for s in img_list_raw]
-    entries = AggregatedStatistics.objects.all()
-    countryset = [x[0] for x in AggregatedStatistics.objects.all().values_list('country').distinct()]
-    sectorset = [x[0] for x in AggregatedStatistics.objects.all().values_list('sector').distinct()]
-    countryset.sort()
-    sectorset.sort()
-
-    values = {}
-    my_countries = {}
-    sectors = {}
-    for entry in entries:
-        i = countryset.index(entry.country)
-        j = sectorset.index(entry.sector)
-        my_countries[i] = entry.country.code
-        sectors[j] = entry.sector
-        if entry.co2_amount:
-            values[(i, j)] = entry.co2_amount
-        else:
-            values[(i, j)] = 0
-
-    s_keys = list(my_countries.keys())
-    s_keys.sort()
-    s_countries = {}
-    for key in s_keys:
-        s_countries[key] = my_countries[key]
+    grid = grid_matrix('co2_amount')
 
-    s_keys = list(sectors.keys())
-    s_keys.sort()
-    s_sectors = {}
-    for key in s_keys:
-        s_sectors[key] = sectors[key]
+    # circle radius per cell
+    radius = np.sqrt(grid['matrix'] / 100000000).round(3).tolist()
+    rows = []
+    for sector, cells in zip(grid['sectors'], radius):
+        name, img = NACE_PICTOGRAMS.get(sector[:1], (sector, None))
+        rows.append({'sector': sector, 'name': name, 'img': img, 'cells': cells})
 
     t = loader.get_template('reporting/visualization_grid.html')
     context = RequestContext(request, {})
-    context.update({'img_list': img_list_raw, 'name_list': name_list})
-    context.update({'values': values, 'sectors': s_sectors, 'my_countries': s_countries})
+    context.update({'countries': grid['countries'], 'rows': rows})
     return HttpResponse(t.template.render(context))
 
 
@@ -30,3 +30,8 @@ class RiskConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'risk'
     verbose_name = _('Risk')
+
+    def ready(self):
+        from risk import concentration, scorecards
+        concentration.connect_signals()
+        scorecards.connect_signals()
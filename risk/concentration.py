@@ -0,0 +1,251 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from portfolio.Portfolios import PortfolioTable
+
+"""
+Incremental concentration tracker for limit monitoring
+
+For every portfolio and dimension (obligor, sector, country) the exposures (EAD) of the portfolio
+table rows are aggregated into buckets (one per obligor, sector or country). The tracker keeps running
+sums over the bucket exposures (sum x, sum x^2, sum x log x) and a max-heap of bucket exposures, so
+that HHI and Shannon entropy are available in constant time, updates take O(log k) and top-n shares
+O(n log k) for k buckets.
+
+The tracker is loaded with one query on first use and then kept current by the post_save / post_delete
+signals of PortfolioTable rows, applied once the enclosing transaction commits (no extra queries, the
+last seen state of each row is kept in memory). Reads and updates are serialized with a lock, so the
+tracker can be shared by the threads of a worker. The state is per process: every web worker keeps its own tracker and only sees the signals of its own
+saves. Floating point drift and changes made outside the ORM (bulk updates, other processes) are
+corrected by a full reconcile once the state is older than RECONCILE_INTERVAL seconds. The
+reconcile_concentration command computes the measures from a fresh reconcile (e.g. for scheduled limit
+reports) and the concentration API endpoint serves the snapshot of the worker handling the request
+(?reconcile=1 forces a reconcile first, staff users only).
+
+"""
+
+DIMENSIONS = ['Obligor_ID', 'Sector', 'Country']
+
+RECONCILE_INTERVAL = 3600
+
+
+def xlogx(x):
+    return x * math.log(x) if x > 0 else 0.0
+
+
+class RunningConcentration(object):
+    """
+    Running sums and order statistics over a set of keyed positive amounts
+
+    Not thread safe (top_n reorders the heap), see ConcentrationTracker
+    """
+
+    def __init__(self):
+        self.amounts = {}
+        # max-heap of (-amount, sequence, key) entries, an entry is stale once its key has a newer sequence
+        self.heap = []
+        self.entries = {}
+        self.sequence = itertools.count()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.total_xlogx = 0.0
+
+    def add(self, key, delta):
+        """
+        Add delta to the amount of a key (amounts that drop to zero or below are removed)
+
+        """
+        old = self.amounts.get(key, 0.0)
+        new = old + delta
+        if old > 0:
+            self.total -= old
+            self.total_sq -= old * old
+            self.total_xlogx -= xlogx(old)
+        if new > 0:
+            self.amounts[key] = new
+            self.total += new
+            self.total_sq += new * new
+            self.total_xlogx += xlogx(new)
+            self.entries[key] = next(self.sequence)
+            heapq.heappush(self.heap, (-new, self.entries[key], key))
+        else:
+            self.amounts.pop(key, None)
+            self.entries.pop(key, None)
+        if len(self.heap) > 2 * len(self.amounts) + 16:
+            self.compact()
+
+    def valid(self, entry):
+        return self.entries.get(entry[2]) == entry[1]
+
+    def compact(self):
+        """ Drop the stale heap entries """
+        self.heap = [entry for entry in self.heap if self.valid(entry)]
+        heapq.heapify(self.heap)
+
+    @property
+    def count(self):
+        return len(self.amounts)
+
+    def hhi(self, normalized=True):
+        n = self.count
+        if n == 0:
+            return 0
+        h = self.total_sq / self.total ** 2
+        if normalized:
+            return (h - 1.0 / n) / (1.0 - 1.0 / n) if n > 1 else 1.0
+        return h
+
+    def top_n(self, n):
+        """ Share of the n largest amounts (concentration ratio) """
+        if self.count == 0:
+            return 0
+        if n <= 0:
+            return 0.0
+        largest = []
+        while self.heap and len(largest) < n:
+            entry = heapq.heappop(self.heap)
+            if self.valid(entry):
+                largest.append(entry)
+        for entry in largest:
+            heapq.heappush(self.heap, entry)
+        return -sum(entry[0] for entry in largest) / self.total
+
+    def shannon(self, normalized=True):
+        n = self.count
+        if n == 0:
+            return 0
+        # - sum w log w with w = x / S
+        h = math.log(self.total) - self.total_xlogx / self.total
+        if normalized:
+            return 1.0 - h / math.log(n) if n > 1 else 1.0
+        return h
+
+
+class ConcentrationTracker(object):
+    """
+    Running concentration measures per (portfolio, dimension)
+
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.measures = {}
+        self.loaded_at = None
+        self.lock = threading.RLock()
+
+    def measure(self, portfolio, dimension):
+        key = (portfolio, dimension)
+        if key not in self.measures:
+            self.measures[key] = RunningConcentration()
+        return self.measures[key]
+
+    def apply(self, row, sign):
+        portfolio, ead = row[0], row[1]
+        if not ead:
+            return
+        for dimension, bucket in zip(DIMENSIONS, row[2:]):
+            self.measure(portfolio, dimension).add(bucket, sign * ead)
+
+    def update(self, pk, row):
+        """
+        Replace the contribution of a portfolio table row (row is None for a deleted row)
+
+        row = (portfolio id, EAD, Obligor_ID, Sector, Country)
+        """
+        with self.lock:
+            old = self.rows.pop(pk, None)
+            if old is not None:
+                self.apply(old, -1)
+            if row is not None:
+                self.rows[pk] = row
+                self.apply(row, 1)
+
+    def reconcile(self):
+        """
+        Rebuild all running sums from the database with one query
+
+        """
+        records = list(PortfolioTable.objects.values_list('pk', 'portfolio_id_id', 'EAD', *DIMENSIONS))
+        with self.lock:
+            self.rows = {}
+            self.measures = {}
+            for pk, *row in records:
+                self.update(pk, tuple(row))
+            self.loaded_at = time.monotonic()
+
+    @property
+    def stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > RECONCILE_INTERVAL
+
+    def snapshot(self, portfolio, dimension='Obligor_ID', n=5):
+        """
+        The current concentration measures of a portfolio along a dimension
+
+        :return: dictionary with exposure, items, hhi (normalized), top_n and shannon (normalized)
+        """
+        if self.stale:
+            self.reconcile()
+        with self.lock:
+            measure = self.measures.get((portfolio, dimension)) or RunningConcentration()
+            return {
+                'exposure': measure.total,
+                'items': measure.count,
+                'hhi': measure.hhi(),
+                'top_n': measure.top_n(n),
+                'shannon': measure.shannon(),
+            }
+
+
+# Process wide concentration tracker (see ConcentrationTracker)
+tracker = ConcentrationTracker()
+
+
+def row_state(instance):
+    return instance.portfolio_id_id, instance.EAD, instance.Obligor_ID, instance.Sector, instance.Country
+
+
+def apply_update(pk, row):
+    # an unloaded tracker picks up all changes on its first reconcile
+    if tracker.loaded_at is not None:
+        tracker.update(pk, row)
+
+
+def track_save(sender, instance, **kwargs):
+    # only committed changes are applied (rolled back saves never reach the tracker)
+    transaction.on_commit(partial(apply_update, instance.pk, row_state(instance)))
+
+
+def track_delete(sender, instance, **kwargs):
+    transaction.on_commit(partial(apply_update, instance.pk, None))
+
+
+def connect_signals():
+    post_save.connect(track_save, sender=PortfolioTable, dispatch_uid='concentration_save')
+    post_delete.connect(track_delete, sender=PortfolioTable, dispatch_uid='concentration_delete')
@@ -22,6 +22,10 @@
 import numpy as np
 import pandas as pd
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scipy import sparse
+from scipy.stats import norm
 
 # ADJUST THIS TO REFLECT YOUR OWN ENVIRONMENT!
 # Set the full path including trailing slash
@@ -88,9 +92,11 @@ class Index(object):
         if n < 0 or n > data.size:
             raise TypeError('n must be an positive integer smaller than the data size')
         else:
-            data = np.array(sorted(data, reverse=True))
             weights = self.get_weights(data)
-            return weights[:n].sum()
+            if n == 0:
+                return 0.0
+            # select the top-n weights without a full sort
+            return -np.partition(-weights, n - 1)[:n].sum()
 
     def berger_parker(self, data):
         """ Calculate the Berger Parker Index (special version of the Concentration Ratio)
@@ -180,7 +186,7 @@ class Index(object):
 
         `Open Risk Manual Entry for Gini Index <https://www.openriskmanual.org/wiki/Gini_Index>`_
         """
-        data = np.array(sorted(data, reverse=True))
+        data = -np.sort(-np.asarray(data))
         weights = self.get_weights(data)
         n = weights.size
         if n == 0:
@@ -309,7 +315,7 @@ class Index(object):
             h = np.exp(n_weights).sum()
             return mu + (np.log(h) - np.log(n)) / alpha
 
-    def ellison_glaeser(self, data, na, ni):
+    def ellison_glaeser(self, data, na=None, ni=None):
         """ Ellison and Glaeser (1997) indexes of industrial concentration.
 
         Implemented as in equation (5) of original reference
@@ -317,93 +323,421 @@ class Index(object):
         Exposure    Area        Industry
         Float       Categorical Categorical
 
-        .. note:: The ordering of the columns is important. The index is not symmetric with respect to area and industry factors
+        Area and industry categories can be any labels (they are factorized). The industry x area
+        exposure shares are held in a sparse matrix so only observed pairs take memory.
+
+        .. note:: The index is not symmetric with respect to area and industry factors
 
         :param data: exposure data
         :type data: pandas dataframe
-        :param na: number of areas
+        :param na: number of areas (deprecated, inferred from the data)
         :type na: integer
-        :param ni: number of industries
+        :param ni: number of industries (deprecated, inferred from the data)
         :type ni: integer
-        :return: EG Indexes (list)
+        :return: EG Indexes (pandas series indexed by industry label)
 
         `Open Risk Manual Entry for Ellison-Glaeser Index <https://www.openriskmanual.org/wiki/Ellison_Glaeser_Index>`_
         """
+        exposure = data['Exposure'].to_numpy(dtype=float)
+        area_codes, areas = pd.factorize(data['Area'], sort=True)
+        industry_codes, industries = pd.factorize(data['Industry'], sort=True)
+        na = len(areas)
+        ni = len(industries)
+
+        # Compute area fraction of total and area HHI
+        area_totals = np.bincount(area_codes, weights=exposure, minlength=na)
+        xa = area_totals / area_totals.sum()
+        hhi_g = np.square(xa).sum()
+
+        # Industry totals and industry specific (exposure level) HHI
+        industry_totals = np.bincount(industry_codes, weights=exposure, minlength=ni)
+        hhi_i = np.bincount(industry_codes, weights=np.square(exposure), minlength=ni) / np.square(industry_totals)
+
+        # Industry / area fraction of industry total (duplicate pairs are summed)
+        s = sparse.csr_matrix((exposure / industry_totals[industry_codes], (industry_codes, area_codes)),
+                              shape=(ni, na))
+
+        # sum over areas of (s_ia - x_a)^2 expanded so that only non-zero shares are visited
+        egi = np.asarray(s.multiply(s).sum(axis=1)).ravel() - 2.0 * (s @ xa) + hhi_g
+        # original EG formula scaled so that uniform distribution has zero gi
+        gi = egi / (1.0 - hhi_g) / (1 - hhi_i)
+        return pd.Series(gi, index=industries, name='EG')
+
+    #
+    # Batched evaluation: each row of a 2D array is a separate dataset (e.g. a bootstrap resample)
+    #
+
+    def row_weights(self, data):
+        """ Calculate the weights of each row of a 2D array
+
+        :param data: Positive data, one dataset per row
+        :type data: numpy array
+        :return: Row normalized weights (2D array)
+        :raise: TypeError if a row has non-positive total size
+        """
+        data = np.atleast_2d(np.asarray(data, dtype=float))
+        ts = data.sum(axis=1, keepdims=True)
+        if np.any(ts <= 0):
+            raise TypeError('Input data vector must have positive values')
+        return np.true_divide(data, ts)
+
+    @staticmethod
+    def _xlogx(weights):
+        # w * log(w) with the convention 0 * log(0) = 0
+        log_weights = np.log(weights, out=np.zeros_like(weights), where=weights > 0)
+        return np.multiply(weights, log_weights)
+
+    @staticmethod
+    def _nonzero(weights):
+        return np.count_nonzero(weights, axis=1)
+
+    def _cr_rows(self, data, weights, n):
+        if n < 0 or n > weights.shape[1]:
+            raise TypeError('n must be an positive integer smaller than the data size')
+        if n == 0:
+            return np.zeros(weights.shape[0])
+        # select the top-n weights of each row without a full sort
+        return -np.partition(-weights, n - 1, axis=1)[:, :n].sum(axis=1)
+
+    def _berger_parker_rows(self, data, weights):
+        return weights.max(axis=1)
+
+    def _hhi_rows(self, data, weights, normalized=True):
+        n = weights.shape[1]
+        h = np.square(weights).sum(axis=1)
+        if normalized:
+            return (h - 1.0 / n) / (1.0 - 1.0 / n)
+        return h
+
+    def _hk_rows(self, data, weights, a):
+        if a <= 0:
+            raise TypeError('Alpha must be strictly positive')
+        elif a == 1:
+            return np.exp(self._xlogx(weights).sum(axis=1))
+        return np.power(np.power(weights, a).sum(axis=1), 1.0 / (a - 1.0))
+
+    def _hoover_rows(self, data, weights):
+        return 0.5 * np.absolute(weights - 1.0 / weights.shape[1]).sum(axis=1)
+
+    def _gini_rows(self, data, weights):
+        n = weights.shape[1]
+        ordered = -np.sort(-weights, axis=1)
+        i = np.arange(1, n + 1)
+        return 1.0 + (1.0 - 2.0 * ordered.dot(i)) / n
+
+    def _shannon_rows(self, data, weights, normalized=True):
+        h = - self._xlogx(weights).sum(axis=1)
+        if normalized:
+            return 1.0 - h / np.log(self._nonzero(weights))
+        return h
+
+    def _atkinson_rows(self, data, weights, epsilon):
+        n = weights.shape[1]
+        if epsilon <= 0:
+            raise TypeError('Epsilon must be strictly positive (>0.0)')
+        elif epsilon == 1:
+            nz = self._nonzero(weights)
+            log_weights = np.log(weights, out=np.zeros_like(weights), where=weights > 0)
+            return 1 - nz * np.exp(log_weights.sum(axis=1) / nz)
+        n2 = np.power(n, epsilon / (epsilon - 1.0))
+        h1 = np.power(weights, 1.0 - epsilon).sum(axis=1)
+        return 1 - n2 * np.power(h1, 1.0 / (1.0 - epsilon))
+
+    def _gei_rows(self, data, weights, alpha):
+        n = weights.shape[1]
+        if alpha == 0:
+            nz = self._nonzero(weights)
+            log_weights = np.log(weights, out=np.zeros_like(weights), where=weights > 0)
+            return - (np.log(nz) + log_weights.sum(axis=1) / nz)
+        elif alpha == 1:
+            return np.log(self._nonzero(weights)) + self._xlogx(weights).sum(axis=1)
+        h1 = np.power(n, alpha) * np.power(weights, alpha).sum(axis=1) - n
+        return h1 / n / alpha / (alpha - 1.0)
+
+    def _theil_rows(self, data, weights):
+        return self._gei_rows(data, weights, 1)
+
+    def _kolm_rows(self, data, weights, alpha):
+        n = weights.shape[1]
+        mu = data.mean(axis=1)
+        h = np.exp(- n * alpha * mu[:, None] * weights).sum(axis=1)
+        return mu + (np.log(h) - np.log(n)) / alpha
+
+    def batch_supported(self, name):
+        return hasattr(self, '_%s_rows' % name)
+
+    def callBatchMethod(self, name, data, *args):
+        """ Calculate an index for each row of a 2D array
+
+        Indexes without a batched implementation are evaluated row by row
+
+        :param name: The index name (cr, berger_parker, hhi, hk, hoover, gini, shannon, atkinson, gei, theil, kolm)
+        :param data: Positive data, one dataset per row
+        :type data: numpy array
+        :return: Index values (1D array)
+        """
+        data = np.atleast_2d(np.asarray(data, dtype=float))
+        if self.batch_supported(name):
+            return getattr(self, '_%s_rows' % name)(data, self.row_weights(data), *args)
+        return np.array([self.callMethod(name, row, *args) for row in data])
+
+    def bootstrap(self, data, *args, samples=1000, index='hhi', random_state=None, chunk_size=None,
+                  workers=None):
+        """ Calculate the index for bootstrap resamples of the data
+
+        Resamples are drawn as (chunk_size x n) index matrices and evaluated along the rows, so memory
+        is bounded by the chunk size. Each chunk has its own random stream spawned from the random state,
+        which makes the result reproducible independently of the number of workers.
+
+        :param data: Positive data
+        :type data: numpy array
+        :param samples: Number of bootstrap samples
+        :param index: The index name
+        :param random_state: None, seed, SeedSequence or numpy Generator
+        :param chunk_size: Resamples per chunk (default: about 4 million values per chunk)
+        :param workers: Number of worker processes (default: evaluate in process)
+        :return: Index values of the resamples (1D array)
+        """
+        data = np.asarray(data, dtype=float)
+        n = data.size
+        if chunk_size is None:
+            chunk_size = max(1, (1 << 22) // max(n, 1))
+        sizes = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+        seeds = seed_sequence(random_state).spawn(len(sizes))
+        tasks = [(data, index, args, size, seed) for size, seed in zip(sizes, seeds)]
+        if workers is None or workers == 1 or len(tasks) <= 1:
+            results = [bootstrap_chunk(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(bootstrap_chunk, tasks))
+        return np.concatenate(results) if results else np.empty(0)
+
+    def jackknife(self, data, *args, index='hhi', groups=100, random_state=None):
+        """ Calculate the index for (grouped) leave-out subsamples of the data
+
+        For data sizes up to groups this is the ordinary leave-one-out jackknife. Otherwise the data is
+        shuffled and split into equal blocks which are left out in turn (delete-d jackknife).
+
+        :return: Index values of the subsamples (1D array)
+        """
+        data = np.asarray(data, dtype=float)
+        n = data.size
+        if n <= groups:
+            keep = ~np.eye(n, dtype=bool)
+            return self.callBatchMethod(index, data[None, :].repeat(n, axis=0)[keep].reshape(n, n - 1), *args)
+        rng = np.random.default_rng(seed_sequence(random_state))
+        shuffled = data[rng.permutation(n)]
+        block = n // groups
+        values = []
+        for g in range(groups):
+            subsample = np.concatenate([shuffled[:g * block], shuffled[(g + 1) * block:]])
+            values.append(self.callBatchMethod(index, subsample, *args)[0])
+        return np.array(values)
+
+    #
+    # Segmented evaluation: one exposure vector split into groups by a group id per exposure
+    #
+
+    def segmented(self, values, groups, indexes=('hhi',)):
+        """ Calculate a set of indexes for every group of a segmented exposure vector in one pass
+
+        Weights, group sizes and (when a rank based index is requested) the descending sort within
+        groups are computed once and shared by all indexes. Per group sums use np.bincount.
+
+        :param values: Positive exposures
+        :type values: numpy array
+        :param groups: Group label of each exposure (any hashable labels)
+        :param indexes: Index names or (name, arg, ...) tuples, e.g. ['hhi', 'gini', ('cr', 5)]
+        :return: Tidy dataframe with columns group, index, value
+        :raise: TypeError if a group has non-positive total size
+
+        Concentration ratios of groups with fewer than n exposures are NaN
+        """
+        values = np.asarray(values, dtype=float)
+        codes, labels = pd.factorize(np.asarray(groups), sort=True)
+        k = len(labels)
+
+        # shared sort: by group, descending value within group
+        specs = [(spec,) if isinstance(spec, str) else tuple(spec) for spec in indexes]
+        if any(spec[0] in ('cr', 'berger_parker', 'gini') for spec in specs):
+            order = np.lexsort((-values, codes))
+            values, codes = values[order], codes[order]
+
+        counts = np.bincount(codes, minlength=k)
+        totals = np.bincount(codes, weights=values, minlength=k)
+        if np.any(totals <= 0):
+            raise TypeError('Input data vector must have positive values')
+        n = counts.astype(float)
+        weights = values / totals[codes]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rank = np.arange(values.size) - starts[codes] + 1
+        segment = Segments(codes, k, weights, n, rank, totals / n)
+
+        frames = []
+        for spec in specs:
+            name, args = spec[0], spec[1:]
+            result = getattr(segment, name)(*args)
+            label = name if not args else '%s(%s)' % (name, ', '.join(map(str, args)))
+            frames.append(pd.DataFrame({'group': labels, 'index': label, 'value': result}))
+        return pd.concat(frames, ignore_index=True)
+
+    def compute(self, data, *args, ci=None, samples=None, index='hhi', method='percentile', random_state=None,
+                chunk_size=None, workers=None):
+        """ Calculate an index with an optional bootstrapped confidence interval
+
+        The interval bounds are the (1 - ci) and ci quantiles of the bootstrap distribution
+        (method='percentile') or their bias corrected and accelerated version (method='bca')
 
-        #
-        # Group by area
-        #
-        # Compute area totals and total exposure
-        area_groups = data.groupby(['Area']).sum()
-        area_totals = area_groups['Exposure'].values
-        total_exposure = area_totals.sum()
-
-        # Compute area fraction of total
-        xa = area_totals / total_exposure
-
-        # Compute area HHI
-        hhi_g = self.hhi(area_totals, normalized=False)
-
-        #
-        # Group by industry
-        #
-        industry_groups = data.groupby(['Industry'])
-        hhi_i = []
-        industry_totals = []
-        total = 0
-        eg_indexes = []
-        s = np.zeros((ni, na))
-        for industry_index, group in industry_groups:
-            # compute industry totals
-            # x = group['Exposure'].as_matrix()
-            x = group['Exposure'].values
-            i_total = x.sum()
-            total += i_total
-            industry_totals.append(i_total)
-            # compute industry specific HHI
-            hhi_i_val = self.hhi(x, normalized=False)
-            hhi_i.append(hhi_i_val)
-
-            # compute industry/area fraction of industry total
-            # group industy group further by area and sum up
-            industry_group = pd.DataFrame(group).groupby('Area').sum()
-            # The aggregated area values for this industry
-            ig_values = industry_group.values[:, 0]
-            # The index of the aggregated values
-            ai = list(industry_group.index)
-            # for all area and industry pairs with non-zero exposure
-            for a in range(len(ai)):
-                share = ig_values[a] / i_total
-                s[industry_index, ai[a]] = share
-
-            # compute EG industry concentration index
-            egi = 0
-            for a in range(len(ai)):
-                egi += (s[industry_index, a] - xa[a]) ** 2
-            val = hhi_i[industry_index]
-            # original EG formula scaled so that uniform distribution has zero gi
-            gi = egi / (1.0 - hhi_g) / (1 - val)
-            eg_indexes.append(gi)
-
-        return eg_indexes
-
-    def compute(self, data, *args, ci=None, samples=None, index='hhi'):
-        # Compute bootstraped confidence interval estimates
+        :param data: Positive data
+        :type data: numpy array
+        :param ci: Confidence level (None for the index value only)
+        :param samples: Number of bootstrap samples
+        :param index: The index name
+        :param method: percentile or bca
+        :param random_state: None, seed, SeedSequence or numpy Generator
+        :param chunk_size: Resamples per chunk
+        :param workers: Number of worker processes
+        :return: Index value or (lower bound, value, upper bound)
+        """
 
         # Actual value of the index
         value = self.callMethod(index, data, *args)
-        if ci is not None:
-            sample_values = []
-            for s in range(samples):
-                sample_data = np.random.choice(data, size=len(data), replace=True)
-                sample_values.append(self.callMethod(index, sample_data, *args))
-
-            values = np.array(sample_values)
-            values.sort()
-            lower_bound_index = int((1.0 - ci) * samples)
-            upper_bound_index = int(ci * samples)
-            lower_bound = values[lower_bound_index]
-            upper_bound = values[upper_bound_index]
-            return lower_bound, value, upper_bound
-        else:
+        if ci is None:
             return value
+
+        values = self.bootstrap(data, *args, samples=samples, index=index, random_state=random_state,
+                                chunk_size=chunk_size, workers=workers)
+        values.sort()
+        alphas = np.array([1.0 - ci, ci])
+        if method == 'bca':
+            # bias correction from the share of resamples below the actual value
+            z0 = norm.ppf(np.clip(np.mean(values < value), 1.0 / samples, 1.0 - 1.0 / samples))
+            # acceleration from the jackknife skewness
+            jack = self.jackknife(data, *args, index=index, random_state=random_state)
+            d = jack.mean() - jack
+            denominator = 6.0 * np.power(np.square(d).sum(), 1.5)
+            a = np.power(d, 3).sum() / denominator if denominator > 0 else 0.0
+            z = norm.ppf(alphas)
+            alphas = norm.cdf(z0 + (z0 + z) / (1.0 - a * (z0 + z)))
+        elif method != 'percentile':
+            raise ValueError('Unknown confidence interval method: %s' % method)
+        lower_bound_index, upper_bound_index = np.clip((alphas * samples).astype(int), 0, samples - 1)
+        return values[lower_bound_index], value, values[upper_bound_index]
+
+
+class Segments(object):
+    """ Per group index kernels over a shared segmented weights vector (see Index.segmented)
+
+    """
+
+    def __init__(self, codes, k, weights, n, rank, mu):
+        self.codes = codes
+        self.k = k
+        self.weights = weights
+        self.n = n
+        self.rank = rank
+        self.mu = mu
+        self._xlogx = None
+        self._log_weights = None
+        self._nz = None
+
+    def sum(self, x):
+        return np.bincount(self.codes, weights=x, minlength=self.k)
+
+    @property
+    def xlogx(self):
+        if self._xlogx is None:
+            self._xlogx = np.multiply(self.weights, self.log_weights)
+        return self._xlogx
+
+    @property
+    def log_weights(self):
+        # log(w) with zero weights mapped to zero
+        if self._log_weights is None:
+            w = self.weights
+            self._log_weights = np.log(w, out=np.zeros_like(w), where=w > 0)
+        return self._log_weights
+
+    @property
+    def nz(self):
+        if self._nz is None:
+            self._nz = self.sum((self.weights > 0).astype(float))
+        return self._nz
+
+    def cr(self, n):
+        if n < 0:
+            raise TypeError('n must be an positive integer smaller than the data size')
+        return np.where(self.n >= n, self.sum(self.weights * (self.rank <= n)), np.nan)
+
+    def berger_parker(self):
+        return self.cr(1)
+
+    def hhi(self, normalized=True):
+        h = self.sum(np.square(self.weights))
+        if normalized:
+            return (h - 1.0 / self.n) / (1.0 - 1.0 / self.n)
+        return h
+
+    def hk(self, a):
+        if a <= 0:
+            raise TypeError('Alpha must be strictly positive')
+        elif a == 1:
+            return np.exp(self.sum(self.xlogx))
+        return np.power(self.sum(np.power(self.weights, a)), 1.0 / (a - 1.0))
+
+    def hoover(self):
+        return 0.5 * self.sum(np.absolute(self.weights - 1.0 / self.n[self.codes]))
+
+    def gini(self):
+        return 1.0 + (1.0 - 2.0 * self.sum(self.rank * self.weights)) / self.n
+
+    def shannon(self, normalized=True):
+        h = - self.sum(self.xlogx)
+        if normalized:
+            return 1.0 - h / np.log(self.nz)
+        return h
+
+    def atkinson(self, epsilon):
+        if epsilon <= 0:
+            raise TypeError('Epsilon must be strictly positive (>0.0)')
+        elif epsilon == 1:
+            return 1 - self.nz * np.exp(self.sum(self.log_weights) / self.nz)
+        n2 = np.power(self.n, epsilon / (epsilon - 1.0))
+        h1 = self.sum(np.power(self.weights, 1.0 - epsilon))
+        return 1 - n2 * np.power(h1, 1.0 / (1.0 - epsilon))
+
+    def gei(self, alpha):
+        if alpha == 0:
+            return - (np.log(self.nz) + self.sum(self.log_weights) / self.nz)
+        elif alpha == 1:
+            return np.log(self.nz) + self.sum(self.xlogx)
+        h1 = np.power(self.n, alpha) * self.sum(np.power(self.weights, alpha)) - self.n
+        return h1 / self.n / alpha / (alpha - 1.0)
+
+    def theil(self):
+        return self.gei(1)
+
+    def kolm(self, alpha):
+        h = self.sum(np.exp(- self.n[self.codes] * alpha * self.mu[self.codes] * self.weights))
+        return self.mu + (np.log(h) - np.log(self.n)) / alpha
+
+
+def seed_sequence(random_state=None):
+    """ Convert a random state (None, seed, SeedSequence or Generator) into a SeedSequence
+
+    """
+    if isinstance(random_state, np.random.SeedSequence):
+        return random_state
+    if isinstance(random_state, np.random.Generator):
+        return np.random.SeedSequence(random_state.integers(0, 2 ** 32, size=4).tolist())
+    return np.random.SeedSequence(random_state)
+
+
+def bootstrap_chunk(task):
+    """ Evaluate an index over a chunk of bootstrap resamples (worker function)
+
+    """
+    data, index, args, size, seed = task
+    rng = np.random.default_rng(seed)
+    resamples = data[rng.integers(0, data.size, size=(size, data.size))]
+    return Index().callBatchMethod(index, resamples, *args)
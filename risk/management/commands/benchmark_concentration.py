@@ -0,0 +1,64 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from risk.ghgMetrics.concentrationMetrics import Index
+
+DASHBOARD_INDEXES = ['hhi', ('cr', 5), ('cr', 10), 'berger_parker', ('hk', 2), 'hoover', 'gini', 'shannon',
+                     ('atkinson', 0.5), ('gei', 2), 'theil', ('kolm', 0.1)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the segmented concentration index calculation against per group index calls'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exposures', type=int, default=100000, help='Number of exposures')
+        parser.add_argument('--groups', type=int, default=1000, help='Number of groups (portfolio slices)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the synthetic exposures')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        values = rng.lognormal(mean=10, sigma=2, size=options['exposures'])
+        groups = rng.integers(0, options['groups'], size=options['exposures'])
+        index = Index()
+
+        start_time = time.time()
+        table = index.segmented(values, groups, DASHBOARD_INDEXES)
+        segmented_time = time.time() - start_time
+
+        start_time = time.time()
+        order = np.argsort(groups, kind='stable')
+        bounds = np.flatnonzero(np.diff(groups[order])) + 1
+        for group_values in np.split(values[order], bounds):
+            for spec in DASHBOARD_INDEXES:
+                name, spec_args = (spec, ()) if isinstance(spec, str) else (spec[0], spec[1:])
+                if name == 'cr' and spec_args[0] > group_values.size:
+                    continue
+                index.callMethod(name, group_values, *spec_args)
+        per_call_time = time.time() - start_time
+
+        self.stdout.write('> Indexes: %d x %d groups' % (len(DASHBOARD_INDEXES), table['group'].nunique()))
+        self.stdout.write('> Segmented: %.3f seconds' % segmented_time)
+        self.stdout.write('> Per call: %.3f seconds' % per_call_time)
+        self.stdout.write('> Speedup: %.1fx' % (per_call_time / max(segmented_time, 1e-9)))
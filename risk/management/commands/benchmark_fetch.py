@@ -0,0 +1,47 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from risk.openRiskScore.creditscore_library import SME_FIELDS, fetch_columns
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent against page by page fetching of a paginated portfolio data endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='URL of the paginated (Eve style) portfolio data endpoint')
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent requests')
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        columns = fetch_columns(options['url'], SME_FIELDS, workers=1)
+        sequential_time = time.time() - start_time
+
+        start_time = time.time()
+        fetch_columns(options['url'], SME_FIELDS, workers=options['workers'])
+        concurrent_time = time.time() - start_time
+
+        self.stdout.write('> Obligors: %d' % len(columns['client_id']))
+        self.stdout.write('> Sequential: %.3f seconds' % sequential_time)
+        self.stdout.write('> Concurrent (%d workers): %.3f seconds' % (options['workers'], concurrent_time))
+        self.stdout.write('> Speedup: %.1fx' % (sequential_time / max(concurrent_time, 1e-9)))
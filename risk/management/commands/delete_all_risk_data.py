@@ -31,10 +31,10 @@ class Command(BaseCommand):
     help = 'Deletes all risk data from the database (no backup!)'
     Debug = False
 
-    ActivityBarrier.objects.all().delete()
-    Scenario.objects.all().delete()
-    Scorecard.objects.all().delete()
-    Limitflow.objects.all().delete()
-
     def handle(self, *args, **options):
+        ActivityBarrier.objects.all().delete()
+        Scenario.objects.all().delete()
+        Scorecard.objects.all().delete()
+        Limitflow.objects.all().delete()
+
         self.stdout.write(self.style.SUCCESS('Deleted all risk data. Good Luck!'))
@@ -19,52 +19,55 @@
 # SOFTWARE.
 
 import pandas as pd
-from django.core.management.base import BaseCommand
 
+from equinox.batch import BatchCommand
 from risk.Scenarios import Scenario
 
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = 'Imports scenario data'
 
-    # Delete existing objects
-    Scenario.objects.all().delete()
+    def add_job_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='Scenario.json', help='The scenario data file (json)')
 
-    # Import data from file
-    data = pd.read_json("Scenario.json")
+    def run(self, *args, **options):
+        # Delete existing objects
+        Scenario.objects.all().delete()
 
-    """
+        # Import data from file
+        data = pd.read_json(options['path'])
 
-    name = models.CharField(max_length=200, help_text="A way to identify the scenario projection")
-    description = models.TextField(blank=True, null=True, help_text="Scenario Description")
-    cutoff_date = models.DateTimeField(blank=True, null=True,
-    scenario_type = models.CharField(blank=True, null=True, max_length=80, help_text="Scenario Type or Category")
-    scenario_no = models.IntegerField(default=1, help_text="Number of Scenarios")
-    scenario_probabilities = models.JSONField(blank=True, null=True, help_text="Scenario Probabilities (Optional). 
-    factor_no = models.IntegerField(default=1, help_text="The Number of Scenario Factors (Variables)")
-    factor_values = models.JSONField(blank=True, null=True, help_text="Factor Values under the Projection as a 
-    factor_units = models.JSONField(blank=True, null=True, help_text="Factor Variable Name / Units")
-    timepoint_no = models.IntegerField(default=1, help_text="Number of Timepoints (Periods + 1)")
-    timepoints = models.JSONField(blank=True, null=True, help_text="Timepoint Values")
-    
-    """
-    indata = []
-    serial = 0
-    for index, entry in data.iterrows():
-        sc = Scenario(
-            name=entry['name'],
-            description='Scenario Description',
-            cutoff_date=entry['cutoff_date'],
-            scenario_type=entry['scenario_type'],
-            factor_values=entry['factor_values'],
-            factor_units=entry['factor_units'],
-            timepoint_no=len(entry['timepoints']),
-            timepoints=entry['timepoints'])
-        serial += 1
+        """
 
-        indata.append(sc)
+        name = models.CharField(max_length=200, help_text="A way to identify the scenario projection")
+        description = models.TextField(blank=True, null=True, help_text="Scenario Description")
+        cutoff_date = models.DateTimeField(blank=True, null=True,
+        scenario_type = models.CharField(blank=True, null=True, max_length=80, help_text="Scenario Type or Category")
+        scenario_no = models.IntegerField(default=1, help_text="Number of Scenarios")
+        scenario_probabilities = models.JSONField(blank=True, null=True, help_text="Scenario Probabilities (Optional). 
+        factor_no = models.IntegerField(default=1, help_text="The Number of Scenario Factors (Variables)")
+        factor_values = models.JSONField(blank=True, null=True, help_text="Factor Values under the Projection as a 
+        factor_units = models.JSONField(blank=True, null=True, help_text="Factor Variable Name / Units")
+        timepoint_no = models.IntegerField(default=1, help_text="Number of Timepoints (Periods + 1)")
+        timepoints = models.JSONField(blank=True, null=True, help_text="Timepoint Values")
 
-    Scenario.objects.bulk_create(indata)
+        """
+        indata = []
+        serial = 0
+        for index, entry in data.iterrows():
+            sc = Scenario(
+                name=entry['name'],
+                description='Scenario Description',
+                cutoff_date=entry['cutoff_date'],
+                scenario_type=entry['scenario_type'],
+                factor_values=entry['factor_values'],
+                factor_units=entry['factor_units'],
+                timepoint_no=len(entry['timepoints']),
+                timepoints=entry['timepoints'])
+            serial += 1
+
+            indata.append(sc)
+
+        Scenario.objects.bulk_create(indata, batch_size=self.chunk_size)
 
-    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Successfully inserted scenario data into db'))
@@ -0,0 +1,52 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from equinox.batch import BatchCommand
+from risk.concentration import DIMENSIONS, tracker
+
+
+class Command(BatchCommand):
+    """
+      rebuild the concentration tracker from the portfolio table (one query)
+      report the concentration measures of every portfolio along the selected dimensions
+
+      the tracker state is per process, running web workers reconcile their own trackers
+      after RECONCILE_INTERVAL seconds (or on a request with ?reconcile=1)
+
+    """
+    help = 'Reconcile the portfolio concentration tracker and report the concentration measures'
+
+    def add_job_arguments(self, parser):
+        parser.add_argument('--dimension', choices=DIMENSIONS, action='append',
+                            help='Dimension to report (default all)')
+        parser.add_argument('--top', type=int, default=5, help='Number of largest buckets for the top-n share')
+
+    def run(self, *args, **options):
+        with self.stage('Reconcile'):
+            tracker.reconcile()
+        self.rows += len(tracker.rows)
+        dimensions = options['dimension'] or DIMENSIONS
+        for portfolio in sorted({portfolio for portfolio, dimension in tracker.measures}):
+            for dimension in dimensions:
+                snapshot = tracker.snapshot(portfolio, dimension, n=options['top'])
+                self.stdout.write('Portfolio: %s %s items: %d exposure: %.2f hhi: %.4f top %d: %.4f shannon: %.4f' % (
+                    portfolio, dimension, snapshot['items'], snapshot['exposure'], snapshot['hhi'], options['top'],
+                    snapshot['top_n'], snapshot['shannon']))
+        self.stdout.write(self.style.SUCCESS('Successfully reconciled the concentration tracker'))
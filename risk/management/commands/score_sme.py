@@ -0,0 +1,46 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from equinox.batch import BatchCommand
+from risk.scoring import score_borrowers
+
+
+class Command(BatchCommand):
+    """
+      iterate over the borrowers (of a portfolio) in chunks
+      compute the SME z-score probability of default from the financial statement fields
+      save the probabilities of default in chunks
+
+    """
+    help = 'Compute SME z-score probabilities of default for borrowers'
+
+    def add_job_arguments(self, parser):
+        parser.add_argument('--weights', type=float, nargs=6, required=True,
+                            help='Intercept and the five financial ratio weights')
+        parser.add_argument('--portfolio', type=int, default=None, help='Score only borrowers of this portfolio')
+
+    def run(self, *args, **options):
+        with self.stage('Score borrowers'):
+            result = score_borrowers(options['weights'], portfolio=options['portfolio'],
+                                     chunk_size=self.chunk_size, dry_run=self.dry_run)
+        self.rows += result['total']
+        self.stdout.write('Borrowers: %d scored: %d unscored: %d' % (
+            result['total'], result['scored'], result['unscored']))
+        self.stdout.write(self.style.SUCCESS('Successfully computed SME z-score probabilities of default'))
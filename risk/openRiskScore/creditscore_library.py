@@ -19,91 +19,154 @@
 # SOFTWARE.
 
 
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import requests
-
-
-def get_all_data(data_url):
-    s = requests.Session()
-    page = 1
-    response = s.get(data_url)
-    dataList = []
-    resp_json = response.json()
-    dataList.append(resp_json["_items"])
-    # print("LINKS", resp_json["_links"]["next"])
-    # print("ITEMS", resp_json["_items"])
-    while resp_json["_links"].has_key("next"):
-        page += 1
-        new_url = data_url + "?page=" + str(page)
-        response = s.get(new_url)
-        resp_json = response.json()
-        # print("LINKS", resp_json["_links"])
-        dataList.append(resp_json["_items"])
-    # print("TOTAL ->", dataList)
-    return dataList
+from requests.adapters import HTTPAdapter
+from scipy.special import expit
+from urllib3.util.retry import Retry
+
+"""
+Portfolio data fetcher for paginated (Eve style) REST endpoints
+
+A page has the form {"_items": [...], "_links": {"next": ..., "last": {"href": "...?page=N"}},
+"_meta": {"page": 1, "max_results": 25, "total": 1000}}
+
+The page count is read from the first response (_meta, else the last link) and the remaining pages
+are fetched concurrently over a pooled session with bounded concurrency and retries on transient
+errors. Each page is parsed into numpy arrays as it arrives.
+
+"""
+
+# obligor attributes used by the SME z-score model
+SME_FIELDS = ['Ebitda', 'Total_Assets', 'Short_Term_Debt', 'Equity_Book_Value', 'Retained_Earnings', 'Cash',
+              'Interest_Expenses']
+
+
+def pooled_session(workers=8, retries=3, backoff=0.2):
+    """
+    A requests session with a connection pool of workers connections and retries on transient errors
+
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET']))
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def page_count(resp_json):
+    """
+    The number of pages of a paginated response, or None if it cannot be determined
+
+    """
+    meta = resp_json.get('_meta', {})
+    if meta.get('max_results') and meta.get('total') is not None:
+        return max(1, math.ceil(meta['total'] / meta['max_results']))
+    last = resp_json.get('_links', {}).get('last')
+    if last:
+        match = re.search(r'[?&]page=(\d+)', last.get('href', ''))
+        if match:
+            return int(match.group(1))
+    if 'next' not in resp_json.get('_links', {}):
+        return 1
+    return None
+
+
+def fetch_pages(data_url, parse, workers=8, retries=3, timeout=30):
+    """
+    Fetch all pages of a paginated endpoint and return the parsed pages in page order
+
+    :param parse: function applied to the _items list of each page (in the worker threads)
+    """
+    with pooled_session(workers, retries) as session:
+        def get(page):
+            response = session.get(data_url, params={'page': page}, timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+
+        first = get(1)
+        pages = [parse(first['_items'])]
+        count = page_count(first)
+        if count is None:
+            # no page count available: follow the next links
+            resp_json = first
+            page = 1
+            while 'next' in resp_json['_links']:
+                page += 1
+                resp_json = get(page)
+                pages.append(parse(resp_json['_items']))
+        elif count > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pages.extend(executor.map(lambda page: parse(get(page)['_items']), range(2, count + 1)))
+    return pages
+
+
+def fetch_columns(data_url, fields, id_field='client_id', **kwargs):
+    """
+    Fetch all pages of a paginated endpoint into columnar arrays
+
+    :return: dictionary with an object array of identifiers (id_field) and a float array per field
+    """
+    def parse(items):
+        n = len(items)
+        columns = {id_field: np.array([entry[id_field] for entry in items], dtype=object)}
+        for field in fields:
+            columns[field] = np.fromiter((entry[field] for entry in items), dtype=float, count=n)
+        return columns
+
+    pages = fetch_pages(data_url, parse, **kwargs)
+    return {key: np.concatenate([page[key] for page in pages]) for key in [id_field] + list(fields)}
+
+
+def get_all_data(data_url, **kwargs):
+    """
+    Fetch all pages of a paginated endpoint as a list of item lists (one per page)
+
+    """
+    return fetch_pages(data_url, lambda items: items, **kwargs)
+
+
+def sme_z_score(columns, weights):
+    """
+    Probability of default of the SME z-score model for columnar (numpy) obligor data
+
+    The z-score is a linear combination of five financial ratios and the PD its logistic transform,
+    evaluated with expit for numerical stability. Obligors with undefined ratios get a NaN PD.
+
+    :param columns: dictionary of SME_FIELDS arrays
+    :param weights: intercept and the five ratio weights
+    """
+    ebitda = columns['Ebitda']
+    total_assets = columns['Total_Assets']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = [
+            np.true_divide(ebitda, total_assets),
+            np.true_divide(columns['Short_Term_Debt'], columns['Equity_Book_Value']),
+            np.true_divide(columns['Retained_Earnings'], total_assets),
+            np.true_divide(columns['Cash'], total_assets),
+            np.true_divide(ebitda, columns['Interest_Expenses']),
+        ]
+        x = np.full_like(ebitda, weights[0], dtype=float)
+        for weight, ratio in zip(weights[1:], ratios):
+            x += weight * ratio
+    x[~np.isfinite(x)] = np.nan
+    # PD = 1 - exp(x) / (1 + exp(x))
+    return expit(-x)
 
 
 # the concentration index collection (ADD OTHER functions)
 def calculate_sme_z_score(portfolio_url, model_inputs):
     # Step 1: Get portfolio data (client attributes)
 
-    client_data_raw = get_all_data(portfolio_url)
-    # print("TOTAL -> ", client_data_raw)
-
-    id = []
-    v1 = []
-    v2 = []
-    v3 = []
-    v4 = []
-    v5 = []
-    v6 = []
-    v7 = []
-
-    # iterate over all obligor attribute vectors
-
-    # for entry in client_data_raw['_items']:
-    for dlist in client_data_raw:
-        for entry in dlist:
-            id.append(entry['client_id'])
-            v1.append(entry['Ebitda'])
-            v2.append(entry['Total_Assets'])
-            v3.append(entry['Short_Term_Debt'])
-            v4.append(entry['Equity_Book_Value'])
-            v5.append(entry['Retained_Earnings'])
-            v6.append(entry['Cash'])
-            v7.append(entry['Interest_Expenses'])
-
-    v1s = np.array(v1)
-    v2s = np.array(v2)
-    v3s = np.array(v3)
-    v4s = np.array(v4)
-    v5s = np.array(v5)
-    v6s = np.array(v6)
-    v7s = np.array(v7)
-
-    r1 = np.true_divide(v1s, v2s)
-    r2 = np.true_divide(v3s, v4s)
-    r3 = np.true_divide(v5s, v2s)
-    r4 = np.true_divide(v6s, v2s)
-    r5 = np.true_divide(v1s, v7s)
-    r0 = np.ones_like(r1)
-
-    w = model_inputs['weights']
-
-    # calculate z-score as linear combination
-
-    x = np.multiply(r1, w[1]) \
-        + np.multiply(r2, w[2]) \
-        + np.multiply(r3, w[3]) \
-        + np.multiply(r4, w[4]) \
-        + np.multiply(r5, w[5]) \
-        + np.multiply(r0, w[0])
-
-    # calculate probability of default
-
-    t1 = np.exp(x)
-    t2 = np.ones_like(x) + t1
-    p = 1 - np.true_divide(t1, t2)
-
-    # print('result', p)
+    columns = fetch_columns(portfolio_url, SME_FIELDS)
+
+    # Step 2: calculate the probability of default
+    p = sme_z_score(columns, model_inputs['weights'])
+
     return {"result": p.tolist()}
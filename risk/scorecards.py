@@ -0,0 +1,208 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from equinox.loaders import batched
+from equinox.versions import table_version, track
+from portfolio.Contractor import Contractor
+from portfolio.Loan import Loan
+from portfolio.Operator import Operator
+from portfolio.Project import Project
+from portfolio.ProjectCompany import ProjectCompany
+from portfolio.Revenue import Revenue
+from portfolio.Sponsor import Sponsor
+from portfolio.Stakeholders import Stakeholders
+from risk.Scorecard import Scorecard
+
+"""
+Scorecard assembly service
+
+The scorecard_data of a project company collects the EBA slotting characteristics held by the
+project company, its project and the first (by pk) revenue, sponsor, operator, contractor,
+stakeholders and loan records linked to it. Scorecard data for any number of project companies
+is assembled with one query per source model (per batch of ids) and a scorecard is only written
+back when its data has changed.
+
+Serialized scorecard sets are cached under the data version of the input tables (see
+equinox.versions, one indexed query per request), together with an ETag for conditional GET, so
+changes committed by any process invalidate them.
+
+"""
+
+# characteristic: (source, field)
+SCORECARD_FIELDS = {
+    "1.1": ('revenue', 'market_conditions'),
+    "1.2": ('project_company', 'financial_ratios'),
+    "1.3": ('revenue', 'stress_analysis'),
+    "1.4.1": ('project_company', 'refinancing_risk'),
+    "1.4.2": ('loan', 'amortisation_schedule'),
+    "1.4.3": ('loan', 'foreign_exchange_risk'),
+    "2.1": ('stakeholders', 'political_risk'),
+    "2.2": ('stakeholders', 'force_majeure_risk'),
+    "2.3": ('stakeholders', 'government_support'),
+    "2.4": ('stakeholders', 'legal_and_regulatory_risk'),
+    "2.5": ('stakeholders', 'project_approval_risk'),
+    "2.6": ('stakeholders', 'legal_regime'),
+    "3.1": ('project', 'design_and_technology_risk'),
+    "3.2.1": ('contractor', 'permitting_and_siting'),
+    "3.2.2": ('contractor', 'type_of_construction_contract'),
+    "3.2.3": ('project', 'completion_risk'),
+    "3.2.4": ('contractor', 'completion_guarantees_and_liquidated_damages'),
+    "3.2.5": ('contractor', 'contractor_track_record'),
+    "3.3.1": ('operator', 'o_and_m_contract'),
+    "3.3.2": ('operator', 'operator_track_record'),
+    "3.4.1": ('revenue', 'revenue_contract_robustness'),
+    "3.4.2": ('revenue', 'offtake_contract_case'),
+    "3.4.3": ('revenue', 'no_offtake_contract_case'),
+    "3.5.1": ('revenue', 'supply_cost_risks'),
+    "3.5.2": ('revenue', 'reserve_risk'),
+    "4.1": ('sponsor', 'sponsor_financial_strength'),
+    "4.2": ('sponsor', 'sponsor_track_record'),
+    "4.3": ('sponsor', 'sponsor_support'),
+    "5.1": ('project_company', 'assignment_of_contracts_and_accounts'),
+    "5.2": ('project_company', 'pledge_of_assets'),
+    "5.3": ('project_company', 'control_over_cash_flow'),
+    "5.4": ('project_company', 'covenant_package'),
+    "5.5": ('project_company', 'reserve_funds'),
+}
+
+# Models linked to the project company (first record by pk is used)
+SCORECARD_SOURCES = {
+    'revenue': Revenue,
+    'sponsor': Sponsor,
+    'operator': Operator,
+    'contractor': Contractor,
+    'stakeholders': Stakeholders,
+    'loan': Loan,
+}
+
+# Models whose state the cached scorecards depend on
+SCORECARD_MODELS = [Scorecard, ProjectCompany, Project] + list(SCORECARD_SOURCES.values())
+
+# Keeps the number of query parameters within the database limits
+ID_BATCH_SIZE = 900
+
+
+def source_fields(source):
+    return [field for key, (name, field) in SCORECARD_FIELDS.items() if name == source]
+
+
+def source_rows(company_ids):
+    """
+    The field values of each scorecard source per project company id
+
+    :return: dictionary source -> {project company id: {field: value}}
+    """
+    rows = {source: {} for source in ['project_company', 'project'] + list(SCORECARD_SOURCES)}
+
+    company_fields = source_fields('project_company')
+    project_fields = source_fields('project')
+    queryset = ProjectCompany.objects.filter(pk__in=company_ids).values_list(
+        'pk', *company_fields, *['project__' + f for f in project_fields])
+    for record in queryset:
+        pk, values = record[0], record[1:]
+        rows['project_company'][pk] = dict(zip(company_fields, values[:len(company_fields)]))
+        rows['project'][pk] = dict(zip(project_fields, values[len(company_fields):]))
+
+    for source, model in SCORECARD_SOURCES.items():
+        fields = source_fields(source)
+        queryset = model.objects.filter(project_company__in=company_ids).order_by('project_company', 'pk')
+        for record in queryset.values_list('project_company', *fields):
+            # keep the first record of each project company
+            rows[source].setdefault(record[0], dict(zip(fields, record[1:])))
+    return rows
+
+
+def assemble(company_ids):
+    """
+    Assemble the scorecard data of many project companies in a constant number of queries per batch
+
+    Characteristics of missing source records are None
+
+    :return: dictionary project company id -> scorecard data
+    """
+    result = {}
+    for batch in batched(sorted(set(company_ids)), ID_BATCH_SIZE):
+        rows = source_rows(batch)
+        for pk in batch:
+            if pk not in rows['project_company']:
+                continue
+            result[pk] = {key: rows[source].get(pk, {}).get(field) for key, (source, field) in
+                          SCORECARD_FIELDS.items()}
+    return result
+
+
+def refresh(scorecards):
+    """
+    Update the scorecard_data of a list of scorecards, saving only those whose data has changed
+
+    :return: the number of updated scorecards
+    """
+    data = assemble(s.project_company_id for s in scorecards if s.project_company_id is not None)
+    changed = []
+    now = timezone.now()
+    for scorecard in scorecards:
+        scorecard_data = data.get(scorecard.project_company_id)
+        if scorecard_data is not None and scorecard_data != scorecard.scorecard_data:
+            scorecard.scorecard_data = scorecard_data
+            scorecard.last_change_date = now
+            changed.append(scorecard)
+    # bulk_update sends no signals so refreshing does not invalidate the cache
+    Scorecard.objects.bulk_update(changed, ['scorecard_data', 'last_change_date'], batch_size=ID_BATCH_SIZE)
+    return len(changed)
+
+
+def data_version():
+    return table_version(*SCORECARD_MODELS)
+
+
+def cache_key(ids, version):
+    digest = hashlib.sha1(','.join(map(str, ids)).encode('utf-8')).hexdigest()
+    return 'scorecards:%s:%s' % (version, digest)
+
+
+def get_scorecards(ids, serialize):
+    """
+    The (etag, data) of a set of scorecards, refreshed and serialized on a cache miss
+
+    :param ids: scorecard ids
+    :param serialize: function serializing a list of scorecards
+    """
+    ids = sorted(set(ids))
+    key = cache_key(ids, data_version())
+    entry = cache.get(key)
+    if entry is None:
+        scorecards = [scorecard for batch in batched(ids, ID_BATCH_SIZE)
+                      for scorecard in Scorecard.objects.filter(pk__in=batch).order_by('pk')]
+        refresh(scorecards)
+        data = serialize(scorecards)
+        content = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+        entry = ('"%s"' % hashlib.sha1(content).hexdigest(), data)
+        cache.set(key, entry, None)
+    return entry
+
+
+def connect_signals():
+    track(*SCORECARD_MODELS)
@@ -0,0 +1,82 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+
+from portfolio.Borrower import Borrower
+from risk.openRiskScore.creditscore_library import sme_z_score
+
+"""
+Batch SME z-score scoring of the obligors held in the database
+
+Borrowers are read in chunks (keyset pagination over the primary key) of financial statement fields
+into numpy arrays, scored with the vectorized SME z-score model and the probabilities of default
+written back with bulk_update. Memory use is bounded by the chunk size, independently of the
+portfolio size.
+
+"""
+
+# SME z-score model input: Borrower field
+SME_MODEL_FIELDS = {
+    'Ebitda': 'annual_ebit',
+    'Total_Assets': 'total_assets',
+    'Short_Term_Debt': 'total_debt',
+    'Equity_Book_Value': 'net_assets',
+    'Retained_Earnings': 'retained_earnings',
+    'Cash': 'cash_and_cash_equivalent_items',
+    'Interest_Expenses': 'interest_expenses',
+}
+
+
+def score_borrowers(weights, portfolio=None, chunk_size=10000, dry_run=False):
+    """
+    Score all borrowers (of a portfolio) and store their probability of default
+
+    Borrowers with missing or degenerate inputs get a null probability of default
+
+    :param weights: intercept and the five ratio weights of the z-score model
+    :return: dictionary with the total, scored and unscored borrower counts
+    """
+    queryset = Borrower.objects.order_by('pk')
+    if portfolio is not None:
+        queryset = queryset.filter(portfolio_id=portfolio)
+
+    total = 0
+    scored = 0
+    last_pk = None
+    while True:
+        chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset.values_list('pk', *SME_MODEL_FIELDS.values())[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        # None becomes NaN
+        data = np.array(chunk, dtype=float)
+        columns = {name: data[:, i + 1] for i, name in enumerate(SME_MODEL_FIELDS)}
+        pd_values = sme_z_score(columns, weights)
+        valid = np.isfinite(pd_values)
+        total += len(chunk)
+        scored += int(valid.sum())
+        if not dry_run:
+            indata = [Borrower(pk=row[0], probability_of_default=float(value) if ok else None)
+                      for row, value, ok in zip(chunk, pd_values.tolist(), valid.tolist())]
+            Borrower.objects.bulk_update(indata, ['probability_of_default'], batch_size=chunk_size)
+
+    return {'total': total, 'scored': scored, 'unscored': total - scored}
@@ -76,3 +76,22 @@ class DocPage(models.Model):
     class Meta:
         verbose_name = "Documentation Page"
         verbose_name_plural = "Documentation Pages"
+
+
+class DataVersion(models.Model):
+    """
+    A version counter of a model table, bumped after each committed change (see equinox.versions)
+
+    Cached views of database tables are keyed by these counters so that a cache hit costs one
+    indexed lookup and changes committed by any process invalidate the cache.
+
+    """
+    label = models.CharField(max_length=100, unique=True, help_text="The app_label.ModelName of the table")
+    version = models.BigIntegerField(default=0, help_text="The number of committed changes")
+
+    def __str__(self):
+        return self.label
+
+    class Meta:
+        verbose_name = "Data Version"
+        verbose_name_plural = "Data Versions"
@@ -18,9 +18,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from django.core.cache import cache
 from django.test import TestCase
 
 from equinox.serializers import ScorecardSerializer
+from equinox.versions import touch
+from portfolio.Project import Project
+from portfolio.ProjectCompany import ProjectCompany
+from portfolio.Revenue import Revenue
+from risk import scorecards
 from risk.Scorecard import Scorecard
 
 
@@ -31,6 +37,11 @@ class APITests(TestCase):
     def test_api_root_status_code(self):
         response = self.client.get('/api/')
         self.assertEquals(response.status_code, 200)
+        endpoints = {name: url for group in response.data for links in group.values() for link in links
+                     for name, url in link.items()}
+        self.assertTrue(endpoints['scorecard_bulk'].endswith('/api/portfolio_data/scorecards/bulk/'))
+        self.assertTrue(endpoints['sme_scores'].endswith('/api/portfolio_data/sme_scores/'))
+        self.assertTrue(endpoints['concentration'].endswith('/api/portfolio_data/concentration/{portfolio}/'))
 
     def test_scorecard_api_endpoint(self):
         Scorecard.objects.create(scorecard_identifier='Test')
@@ -39,3 +50,67 @@ class APITests(TestCase):
         api_link = serializer.get_link(scorecard)
         test_link = "/api/portfolio_data/scorecards/" + str(scorecard.pk)
         self.assertEquals(api_link, test_link)
+
+
+class ScorecardAssemblyTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.companies = []
+        for i in range(3):
+            project = Project.objects.create(project_identifier='P%d' % i, completion_risk=i)
+            company = ProjectCompany.objects.create(project=project, reserve_funds=1)
+            Revenue.objects.create(project_company=company, revenue_group_identifier='R%d' % i, market_conditions=i)
+            Revenue.objects.create(project_company=company, revenue_group_identifier='X', market_conditions=9)
+            Scorecard.objects.create(scorecard_identifier='S%d' % i, project_company=company)
+            self.companies.append(company)
+
+    def test_assemble(self):
+        with self.assertNumQueries(1 + len(scorecards.SCORECARD_SOURCES)):
+            data = scorecards.assemble(c.pk for c in self.companies)
+        first = data[self.companies[1].pk]
+        self.assertEquals(1, first['1.1'])
+        self.assertEquals(1, first['3.2.3'])
+        self.assertEquals(1, first['5.5'])
+        self.assertIsNone(first['4.1'])
+
+    def test_refresh_only_changed(self):
+        objects = list(Scorecard.objects.all())
+        self.assertEquals(3, scorecards.refresh(objects))
+        self.assertEquals(0, scorecards.refresh(list(Scorecard.objects.all())))
+
+    def test_bulk_endpoint(self):
+        ids = ','.join(str(pk) for pk in Scorecard.objects.values_list('pk', flat=True))
+        response = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': ids})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(3, len(response.json()))
+        etag = response['ETag']
+        response = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': ids}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 304)
+        Revenue.objects.filter(revenue_group_identifier='R0').update(market_conditions=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Revenue.objects.get(revenue_group_identifier='R0').save()
+        response = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': ids}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        response = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': 'a,b'})
+        self.assertEquals(response.status_code, 400)
+
+    def test_bulk_endpoint_etag_match(self):
+        ids = ','.join(str(pk) for pk in Scorecard.objects.values_list('pk', flat=True))
+        etag = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': ids})['ETag']
+        # a tag containing the current one is not a match
+        response = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': ids},
+                                   HTTP_IF_NONE_MATCH='"%s0"' % etag.strip('"'))
+        self.assertEquals(response.status_code, 200)
+        response = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': ids},
+                                   HTTP_IF_NONE_MATCH='"other", W/%s' % etag)
+        self.assertEquals(response.status_code, 304)
+        response = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': ids}, HTTP_IF_NONE_MATCH='*')
+        self.assertEquals(response.status_code, 304)
+        # changes made without signals are seen once the writer touches the table
+        with self.captureOnCommitCallbacks(execute=True):
+            Scorecard.objects.filter(scorecard_identifier='S0').update(scorecard_identifier='Bulk')
+            touch(Scorecard)
+        response = self.client.get('/api/portfolio_data/scorecards/bulk/', {'ids': ids}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertIn('Bulk', [s['scorecard_identifier'] for s in response.json()])
@@ -0,0 +1,76 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from policy.cube import build, cube_payload
+from policy.models import DataSeries, PolicyCube
+
+
+def create_series(df_name, dates, values):
+    ds = DataSeries(identifier=df_name + '.RR', df_name=df_name, agg_level='Country', activity='RR')
+    ds.set_series(dates, values)
+    ds.save()
+    return ds
+
+
+class PolicyCubeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        create_series('FR', ['2020-03-02', '2020-03-03'], [2.0, 3.0])
+        create_series('DE', ['2020-03-01', '2020-03-03'], [1.0, 5.0])
+
+    def test_build(self):
+        cube, reloaded = build('RR')
+        self.assertEquals(2, reloaded)
+        self.assertEquals(['DE', 'FR'], cube.countries)
+        self.assertEquals('2020-03-01', cube.start_date.isoformat())
+        array = PolicyCube.objects.get().get_array()
+        self.assertEquals((2, 3), array.shape)
+        self.assertEquals([1.0, 5.0, 2.0, 3.0], array[~(array != array)].tolist())
+        self.assertEquals(0, build('RR')[1])
+
+    def test_incremental(self):
+        build('RR')
+        ds = DataSeries.objects.get(df_name='FR')
+        ds.set_series(['2020-03-03', '2020-03-04'], [4.0, 6.0])
+        ds.save()
+        create_series('AT', ['2020-02-29'], [7.0])
+        cube, reloaded = build('RR')
+        self.assertEquals(2, reloaded)
+        self.assertEquals(['AT', 'DE', 'FR'], cube.countries)
+        payload = cube_payload('RR')
+        self.assertEquals(['2020-02-29', '2020-03-01', '2020-03-02', '2020-03-03', '2020-03-04'], payload['dates'])
+        self.assertEquals([[7.0, None, None, None, None], [None, 1.0, None, 5.0, None],
+                           [None, None, None, 4.0, 6.0]], payload['values'])
+        self.assertEquals([7.0, 1.0, None, 4.5, 6.0], payload['statistics']['mean'])
+
+    def test_view(self):
+        build('RR')
+        response = self.client.get('/policy/cube/RR', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals('gzip', response['Content-Encoding'])
+        self.assertEquals(['DE', 'FR'], json.loads(gzip.decompress(response.content))['countries'])
+        self.assertEquals(404, self.client.get('/policy/cube/PA').status_code)
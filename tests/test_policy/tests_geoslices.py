@@ -0,0 +1,79 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from equinox.versions import touch
+from policy import geoslices
+from policy.geoslices import list_payload, map_payload, members
+from policy.models import DataSeries, GeoSlice
+
+
+class GeoSliceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for identifier, values in [('DE.RR', [1.0, 2.0]), ('FR.RR', [3.0]), ('IT.RR', [4.0])]:
+            ds = DataSeries(identifier=identifier, title=identifier, title_long=identifier + ' (long)')
+            ds.set_series(['2020-03-01', '2020-03-02'][:len(values)], values)
+            ds.save()
+        self.geoslice = GeoSlice.objects.create(identifier='EU.RR', dataset_id=['FR.RR', 'DE.RR', 'XX.RR'])
+
+    def test_members(self):
+        with self.assertNumQueries(1):
+            rows = members(self.geoslice.dataset_id, ['title'])
+        self.assertEquals([{'identifier': 'FR.RR', 'title': 'FR.RR'}, {'identifier': 'DE.RR', 'title': 'DE.RR'}], rows)
+
+    def test_batches(self):
+        geoslices.ID_BATCH_SIZE = 2
+        try:
+            with self.assertNumQueries(2):
+                rows = members(['IT.RR', 'FR.RR', 'DE.RR'], ['title'])
+        finally:
+            geoslices.ID_BATCH_SIZE = 900
+        self.assertEquals(['IT.RR', 'FR.RR', 'DE.RR'], [row['identifier'] for row in rows])
+
+    def test_map(self):
+        dataset = map_payload(self.geoslice)
+        self.assertEquals(['FR', 'DE'], list(dataset))
+        self.assertEquals(['2020-03-01', '2020-03-02'], dataset['DE']['dates'])
+        self.assertEquals([1.0, 2.0], dataset['DE']['values'])
+        # the DataSeries version only
+        with self.assertNumQueries(1):
+            map_payload(self.geoslice)
+
+    def test_bulk_invalidation(self):
+        map_payload(self.geoslice)
+        list_payload(self.geoslice)
+        with self.captureOnCommitCallbacks(execute=True):
+            DataSeries.objects.filter(identifier='DE.RR').update(title='DE')
+            touch(DataSeries)
+        self.assertEquals('DE', list_payload(self.geoslice)[1]['title'])
+        with self.captureOnCommitCallbacks(execute=True):
+            DataSeries.objects.filter(identifier='DE.RR').delete()
+        self.assertEquals(['FR'], list(map_payload(self.geoslice)))
+
+    def test_list(self):
+        series_list = list_payload(self.geoslice)
+        self.assertEquals(['FR.RR', 'DE.RR'], [row['identifier'] for row in series_list])
+        self.geoslice.dataset_id = ['IT.RR']
+        self.geoslice.save()
+        self.assertEquals(['IT.RR'], [row['identifier'] for row in list_payload(self.geoslice)])
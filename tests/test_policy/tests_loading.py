@@ -0,0 +1,78 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+
+from policy.loading import sync_dataseries
+from policy.models import DataSeries
+
+METRICS = {'T': 40.0, 'T-1': 40.0, 'T-2': 0.0, 'T-3': 0.0}
+
+
+def catalog_entry(identifier, status='Valid'):
+    return {'ID': identifier, 'DF_NAME': 'DE', 'Status': status, 'REF_AREA': 'DE.BY', 'AGG_LEVEL': 'Region',
+            'ACTIVITY': 'RR', 'TITLE': identifier, 'TITLE_COMPL': identifier, 'URL': '', 'UNIT': '%'}
+
+
+class LoadingTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.datapath = self.directory.name + '/'
+        os.makedirs(self.datapath + 'dataflows/DE')
+        for identifier in ['A', 'B', 'C']:
+            self.write(identifier, [1.0, 2.0])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, identifier, values):
+        data = {'Field Type': 'numerical', 'Code List': None, 'Frequency': 'D', 'Metrics': METRICS,
+                'Geometry_1D': {}, 'Dates': ['2020-03-01', '2020-03-02'], 'Values': values, 'Delta': [0.0, 1.0],
+                'PDelta': [0.0, 1.0], 'LastDate': '2020-03-02'}
+        with open(self.datapath + 'dataflows/DE/' + identifier + '.P.json', 'w') as f:
+            json.dump(data, f)
+
+    def test_sync(self):
+        catalog = [catalog_entry('A'), catalog_entry('B'), catalog_entry('C', status='Invalid')]
+        result = sync_dataseries(catalog, self.datapath)
+        self.assertEquals((3, 2, 2, 0, 0), (result['total'], result['tracked'], result['created'], result['updated'],
+                                            result['deleted']))
+        self.assertEquals({'red': 2}, dict(result['colors']))
+        unchanged = DataSeries.objects.get(identifier='A')
+        self.assertEquals('BY', unchanged.region)
+
+        # B changes, A vanishes, C becomes valid
+        self.write('B', [1.0, 3.0])
+        catalog = [catalog_entry('B'), catalog_entry('C')]
+        result = sync_dataseries(catalog, self.datapath)
+        self.assertEquals((1, 1, 1, 0), (result['created'], result['updated'], result['deleted'],
+                                         result['unchanged']))
+        self.assertEquals(['B', 'C'], sorted(DataSeries.objects.values_list('identifier', flat=True)))
+        self.assertEquals([1.0, 3.0], DataSeries.objects.get(identifier='B').get_values().tolist())
+
+        result = sync_dataseries(catalog, self.datapath)
+        self.assertEquals((0, 0, 0, 2), (result['created'], result['updated'], result['deleted'],
+                                         result['unchanged']))
+        self.assertEquals({'red': 2}, dict(result['colors']))
@@ -0,0 +1,73 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.test import TestCase
+
+from policy.metrics import activity_metrics, materialize, paired_metrics, refresh
+from policy.models import DataSeries, SeriesMetrics
+
+
+def create_series(df_name, activity, mean):
+    return DataSeries.objects.create(identifier=df_name + '.' + activity, df_name=df_name, agg_level='Country',
+                                     activity=activity, metrics={'Min': mean - 1, 'Max': mean + 1, 'Mean': mean,
+                                                                 'T': mean, 'Vol': 0.5, 'Orders': 1})
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        series_list = [create_series('DE', 'RR', 1.0), create_series('FR', 'RR', 2.0), create_series('DE', 'PA', 3.0),
+                       create_series('AT', 'PA', 4.0)]
+        materialize(series_list)
+
+    def test_materialize(self):
+        self.assertEquals(4, SeriesMetrics.objects.count())
+        entry = SeriesMetrics.objects.get(df_name='FR')
+        self.assertEquals((1.0, 3.0, 2.0, 1), (entry.min_value, entry.max_value, entry.latest, entry.orders))
+        self.assertIsNone(entry.skew)
+        self.assertEquals(4, refresh())
+        self.assertEquals(4, SeriesMetrics.objects.count())
+
+    def test_rematerialize(self):
+        # the rows of already materialized series are replaced
+        self.assertEquals(4, materialize(list(DataSeries.objects.all())))
+        self.assertEquals(4, SeriesMetrics.objects.count())
+
+    def test_activity(self):
+        with self.assertNumQueries(1):
+            rows = activity_metrics('RR', ['Max', 'Mean'])
+        self.assertEquals([('DE', 2.0, 1.0), ('FR', 3.0, 2.0)], rows)
+
+    def test_pairs(self):
+        with self.assertNumQueries(1):
+            pairs = paired_metrics('RR', 'PA', ['Mean', 'T'])
+        self.assertEquals([{'df_name': 'DE', 'Mean_1': 1.0, 'T_1': 1.0, 'Mean_2': 3.0, 'T_2': 3.0}],
+                          pairs.to_dict('records'))
+
+    def test_cascade(self):
+        DataSeries.objects.filter(df_name='DE').delete()
+        self.assertEquals(['AT', 'FR'], sorted(SeriesMetrics.objects.values_list('df_name', flat=True)))
+
+    def test_views(self):
+        response = self.client.get('/policy/statistics/country/table/RR')
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, 'France')
+        response = self.client.get('/policy/statistics/country/histogram/PA/Mean')
+        self.assertEquals([3.0, 4.0], response.context['values'])
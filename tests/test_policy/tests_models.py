@@ -22,6 +22,7 @@
 from django.test import TestCase
 
 from policy.models import DashBoardParams, DataFlow, DataSeries, GeoSlice
+from policy.timeseries import load_series
 
 
 class PolicyModelTests(TestCase):
@@ -45,3 +46,21 @@ class PolicyModelTests(TestCase):
         GeoSlice.objects.create(identifier='test')
         instance = GeoSlice.objects.get()
         self.assertEquals("test", str(instance))
+
+    def test_dataseries_series(self):
+        ds = DataSeries(identifier='test', metrics={'Max': 2.0})
+        ds.set_series(['2020-03-01', '2020-03-02'], [1.0, 2.0], [0.0, 1.0], [0.0, 1.0])
+        ds.save()
+        instance = DataSeries.objects.get()
+        self.assertEquals(['2020-03-01', '2020-03-02'], instance.get_dates())
+        self.assertEquals([1.0, 2.0], instance.get_values().tolist())
+        self.assertEquals(2.0, instance.get_metrics()['Max'])
+
+    def test_load_series(self):
+        for identifier, values in [('A', [1.0, 2.0]), ('B', [3.0])]:
+            ds = DataSeries(identifier=identifier)
+            ds.set_series(['2020-03-01', '2020-03-02'][:len(values)], values)
+            ds.save()
+        data = load_series(DataSeries.objects.order_by('identifier'))
+        self.assertEquals(['A', 'A', 'B'], data['identifier'].tolist())
+        self.assertEquals([1.0, 2.0, 3.0], data['value'].tolist())
@@ -0,0 +1,53 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from policy.processing import differences, series_metrics, process_series
+
+
+class PolicyProcessingTests(SimpleTestCase):
+
+    def test_differences(self):
+        diffs, pdiffs = differences([0.0, 1.0, 2.0, 0.0, 4.0])
+        self.assertEquals([0.0, 1.0, 1.0, -2.0, 4.0], diffs.tolist())
+        self.assertEquals([0.0, 0.0, 1.0, -1.0, 0.0], pdiffs.tolist())
+
+    def test_series_metrics(self):
+        metrics = series_metrics([0.0, 1.0, 2.0, 0.0, 4.0, 6.0])
+        self.assertEquals(6.0, metrics['Max'])
+        self.assertEquals(1.5, metrics['Median'])
+        self.assertEquals(4.0, metrics['T-1'])
+        self.assertEquals(1, metrics['Orders'])
+
+    def test_insufficient(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for n, status in [(1, 'Insufficient'), (3, 'Insufficient'), (4, 'Valid')]:
+                input_file = os.path.join(directory, 'A.json')
+                with open(input_file, 'w') as f:
+                    json.dump({'Dates': ['2020-03-0%d' % (i + 1) for i in range(n)],
+                               'Values': [float(i) for i in range(n)]}, f)
+                task = {'data': {'Identifier': 'A', 'Field Type': 'numerical', 'Frequency': 'D'},
+                        'input_file': input_file, 'output_file': None, 'carry': [], 'write': False}
+                self.assertEquals(('A', status), process_series(task))
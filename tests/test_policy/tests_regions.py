@@ -0,0 +1,65 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from equinox.versions import touch
+from policy.models import DataFlow, DataSeries
+from policy.regions import region_counts
+
+
+class RegionCountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        DataFlow.objects.create(name='DE', identifier='DE', dimensions=[
+            {'DimName': 'Reference Area', 'ActualCodes': {'DE': 'Germany', 'DE.BY': 'Bavaria', 'DE.BE': 'Berlin'}}])
+        for identifier, region, color in [('DE.RR', '', 'red'), ('DE.BY.RR', 'BY', 'red'),
+                                          ('DE.BY.GP', 'BY', 'gray'), ('DE.BY.MU.RR', 'BY.MU', 'orange')]:
+            DataSeries.objects.create(identifier=identifier, df_name='DE', region=region, color=color)
+
+    def test_counts(self):
+        # the data version and the grouped counts
+        with self.assertNumQueries(2):
+            counts = region_counts('DE')
+        self.assertEquals({'BY': {'dashboard_n': 3, 'live_n': 2}}, counts)
+        with self.assertNumQueries(1):
+            region_counts('DE')
+
+    def test_invalidation(self):
+        region_counts('DE')
+        with self.captureOnCommitCallbacks(execute=True):
+            DataSeries.objects.create(identifier='DE.BE.RR', df_name='DE', region='BE', color='yellow')
+        self.assertEquals({'dashboard_n': 1, 'live_n': 1}, region_counts('DE')['BE'])
+
+    def test_bulk_invalidation(self):
+        region_counts('DE')
+        with self.captureOnCommitCallbacks(execute=True):
+            DataSeries.objects.bulk_create([DataSeries(identifier='DE.BE.GP', df_name='DE', region='BE', color='gray')])
+            touch(DataSeries)
+        self.assertEquals({'dashboard_n': 1, 'live_n': 0}, region_counts('DE')['BE'])
+
+    def test_view(self):
+        response = self.client.get('/policy/dataflow/country/DE')
+        self.assertEquals(response.status_code, 200)
+        regions = {region['title']: (region['dashboard_n'], region['live_n'])
+                   for region in response.context['region_list']}
+        self.assertEquals({'BY': (3, 2), 'BE': (0, 0)}, regions)
@@ -0,0 +1,94 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from policy.models import DataSeries
+from policy.queries import MAP_QUERY, MAX_POINTS, PLOT_QUERY, parse_query
+from policy.timeseries import pack_series, unpack_series, lttb, query_series
+
+DATES = (np.datetime64('2020-01-01') + np.arange(90)).astype(str)
+
+
+class TimeseriesQueryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.records = unpack_series(pack_series(DATES, np.arange(90, dtype=float)))
+
+    def test_range(self):
+        result = query_series(self.records, start='2020-02-01', end='2020-02-03')
+        self.assertEquals(['2020-02-01', '2020-02-02', '2020-02-03'], result['dates'])
+        self.assertEquals([31.0, 32.0, 33.0], result['values'])
+
+    def test_resample(self):
+        result = query_series(self.records, frequency='M', how='last')
+        self.assertEquals(['2020-01-01', '2020-02-01', '2020-03-01'], result['dates'])
+        self.assertEquals([30.0, 59.0, 89.0], result['values'])
+        result = query_series(self.records, end='2020-01-31', frequency='M', how='mean')
+        self.assertEquals([15.0], result['values'])
+
+    def test_lttb(self):
+        values = np.zeros(1000)
+        values[500] = 100.0
+        indexes = lttb(np.arange(1000), values, 10)
+        self.assertEquals(10, len(indexes))
+        self.assertEquals((0, 999), (indexes[0], indexes[-1]))
+        self.assertIn(500, indexes)
+        self.assertEquals(list(range(5)), lttb(np.arange(5), np.zeros(5), 10).tolist())
+
+    def test_parse(self):
+        self.assertEquals({'start': '2020-01-01', 'end': None, 'frequency': 'W', 'how': 'max', 'points': 100},
+                          parse_query({'start': '2020-01-01', 'frequency': 'W', 'how': 'max', 'points': '100'}))
+        for params in [{'start': 'x'}, {'frequency': 'Q'}, {'how': 'sum'}, {'points': '2'}]:
+            with self.assertRaises(ValueError):
+                parse_query(params)
+
+    def test_parse_defaults(self):
+        self.assertEquals(1000, parse_query({}, defaults=PLOT_QUERY)['points'])
+        self.assertEquals(50, parse_query({'points': '50'}, defaults=PLOT_QUERY)['points'])
+        self.assertEquals('W', parse_query({'points': ''}, defaults=MAP_QUERY)['frequency'])
+
+
+class TimeseriesViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        ds = DataSeries(identifier='DE.RR')
+        ds.set_series(DATES, np.arange(90, dtype=float))
+        ds.save()
+
+    def test_query(self):
+        response = self.client.get('/policy/dataseries/query/DE.RR', {'frequency': 'W', 'points': 5})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(5, len(response.json()['dates']))
+        response = self.client.get('/policy/dataseries/query/DE.RR', {'how': 'sum'})
+        self.assertEquals(response.status_code, 400)
+
+    def test_plot(self):
+        DataSeries.objects.filter(identifier='DE.RR').update(metrics={'Min': 0.0, 'Max': 89.0, 'Mean': 44.5, 'T': 89.0})
+        response = self.client.get('/policy/dataseries/plot/DE.RR', {'points': 10})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(10, len(json.loads(response.context['series'])['dates']))
+        response = self.client.get('/policy/dataseries/plot/DE.RR', {'points': MAX_POINTS + 1})
+        self.assertEquals(response.status_code, 400)
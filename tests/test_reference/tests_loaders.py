@@ -0,0 +1,73 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import tempfile
+
+from django.test import TestCase
+
+from equinox.loaders import bulk_load, CSVLoader
+from portfolio.management.commands.load_pe import ProjectEventLoader
+from reference.EmissionFactor import EmissionFactor
+from reference.EmissionIntensity import ReferenceIntensity
+
+
+class BulkLoadTests(TestCase):
+
+    def test_bulk_load(self):
+        factors = (EmissionFactor(EF_ID=i, Value=str(i)) for i in range(5))
+        self.assertEquals(5, bulk_load(EmissionFactor, factors, batch_size=2))
+        self.assertEquals(5, EmissionFactor.objects.count())
+
+    def test_bulk_load_upsert(self):
+        bulk_load(EmissionFactor, [EmissionFactor(EF_ID=1, Value='1'), EmissionFactor(EF_ID=2, Value='2')],
+                  unique_fields=['EF_ID'])
+        bulk_load(EmissionFactor, [EmissionFactor(EF_ID=2, Value='20'), EmissionFactor(EF_ID=3, Value='3')],
+                  unique_fields=['EF_ID'])
+        self.assertEquals(3, EmissionFactor.objects.count())
+        self.assertEquals('20', EmissionFactor.objects.get(EF_ID=2).Value)
+
+
+class IntensityLoader(CSVLoader):
+    model = ReferenceIntensity
+    columns = {'Sector': 'sector', 'Region': 'region', 'Value': 'value'}
+    foreign_keys = {}
+    constants = {'Gases': 'GHG'}
+
+
+class CSVLoaderTests(TestCase):
+
+    def write_csv(self, content):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_load(self):
+        path = self.write_csv('sector,region,value\nC,DE,0.5\nF,,2.0\nG,FR,1.0\n')
+        self.assertEquals(3, IntensityLoader().load(path, chunk_size=2))
+        self.assertEquals(3, ReferenceIntensity.objects.filter(Gases='GHG').count())
+        self.assertIsNone(ReferenceIntensity.objects.get(Sector='F').Region)
+
+    def test_unmatched_foreign_key(self):
+        path = self.write_csv('PK,PROJECT,TYPE,PUB_DATE,SHORT_DESCR\n1,99,Award,2020-01-01,test\n')
+        with self.assertRaises(ValueError):
+            list(ProjectEventLoader().objects(path))
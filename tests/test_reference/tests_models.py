@@ -25,7 +25,7 @@ from reference.CPVData import CPVData
 from reference.EmissionFactor import BuildingEmissionFactor
 from reference.EmissionIntensity import ReferenceIntensity
 from reference.GPCSector import GPCSector
-from reference.NUTS3Data import NUTS3PointData
+from reference.NUTS3Data import NUTS3PointData, nuts3_index, nuts3_features
 
 
 class ReferenceModelTests(TestCase):
@@ -52,6 +52,18 @@ class ReferenceModelTests(TestCase):
         instance = NUTS3PointData.objects.get()
         self.assertEquals("test", str(instance))
 
+    def test_nuts3_index(self):
+        NUTS3PointData.objects.create(nuts_id='DEF0', coordinates='POINT(10 54)')
+        self.assertEquals((10.0, 54.0), nuts3_index()['DEF0']['coordinates'])
+        NUTS3PointData.objects.create(nuts_id='DEF1', coordinates='POINT(9 54)')
+        self.assertIn('DEF1', nuts3_index())
+        # bulk loads send no signals
+        NUTS3PointData.objects.bulk_create([NUTS3PointData(nuts_id='DEF2', coordinates='POINT(8 54)')])
+        self.assertIn('DEF2', nuts3_index())
+        geodata = nuts3_features([('DEF0', 3), ('XXXX', 1)])
+        self.assertEquals(1, len(geodata['features']))
+        self.assertEquals(3, geodata['features'][0]['properties']['count'])
+
     def test_references_intensity_str(self):
         ReferenceIntensity.objects.create()
         instance = ReferenceIntensity.objects.get()
@@ -0,0 +1,71 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from reference.EmissionIntensity import ReferenceIntensity
+from reporting.emissions import compute_emissions
+from reporting.models import AggregatedStatistics
+
+
+class EmissionsEngineTests(TestCase):
+
+    def setUp(self):
+        ReferenceIntensity.objects.create(Sector='C', Region='DE', Value='0.5')
+        ReferenceIntensity.objects.create(Sector='F', Region='DE', Value='2.0')
+        AggregatedStatistics.objects.create(sector='C', country='DE', value_total=100.0)
+        AggregatedStatistics.objects.create(sector='F', country='DE', value_total=10.0)
+        AggregatedStatistics.objects.create(sector='F', country='FR', value_total=10.0)
+
+    def test_aggregate_mode(self):
+        result = compute_emissions(mode=2, chunk_size=2)
+        self.assertEquals({'total': 3, 'matched': 2, 'unmatched': 1}, result)
+        self.assertEquals(50.0, AggregatedStatistics.objects.get(sector='C').co2_amount)
+        self.assertEquals(20.0, AggregatedStatistics.objects.get(sector='F', country='DE').co2_amount)
+        self.assertIsNone(AggregatedStatistics.objects.get(country='FR').co2_amount)
+
+    def test_aggregate_currency(self):
+        AggregatedStatistics.objects.create(level='section_currency', sector='C', country='DE', currency='EUR',
+                                            value_total=10.0)
+        AggregatedStatistics.objects.create(level='section_currency', sector='C', country='DE', currency='USD',
+                                            value_total=10.0)
+        result = compute_emissions(mode=2)
+        self.assertEquals({'total': 4, 'matched': 3, 'unmatched': 1}, result)
+        self.assertEquals(5.0, AggregatedStatistics.objects.get(currency='EUR').co2_amount)
+        self.assertIsNone(AggregatedStatistics.objects.get(currency='USD').co2_amount)
+
+    def test_dry_run(self):
+        result = compute_emissions(mode=2, dry_run=True)
+        self.assertEquals(2, result['matched'])
+        self.assertFalse(AggregatedStatistics.objects.filter(co2_amount__isnull=False).exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command('compute_emissions', mode=2, chunk_size=1, stdout=out)
+        self.assertIn('matched: 2 unmatched: 1', out.getvalue())
+        self.assertEquals(50.0, AggregatedStatistics.objects.get(sector='C').co2_amount)
+
+    def test_command_dry_run(self):
+        call_command('compute_emissions', dry_run=True, stdout=StringIO())
+        self.assertFalse(AggregatedStatistics.objects.filter(co2_amount__isnull=False).exists())
@@ -0,0 +1,62 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from equinox.versions import touch
+from portfolio.models import PointSource
+from reporting.geolayers import get_layer
+
+
+class GeoLayerTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create(username='test'))
+
+    def test_layer_invalidation(self):
+        etag, content = get_layer('point_sources')
+        self.assertEquals(etag, get_layer('point_sources')[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            PointSource.objects.create(name='test', location='POINT(10 50)')
+        etag2, content2 = get_layer('point_sources')
+        self.assertNotEquals(etag, etag2)
+        self.assertIn(b'test', content2)
+
+    def test_bulk_invalidation(self):
+        etag = get_layer('point_sources')[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            PointSource.objects.bulk_create([PointSource(name='bulk', location='POINT(10 50)')])
+            touch(PointSource)
+        etag2, content2 = get_layer('point_sources')
+        self.assertNotEquals(etag, etag2)
+        self.assertIn(b'bulk', content2)
+
+    def test_conditional_get(self):
+        response = self.client.get('/reporting/geo_layer/point_sources')
+        self.assertEquals(response.status_code, 200)
+        response = self.client.get('/reporting/geo_layer/point_sources', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(response.status_code, 304)
+
+    def test_unknown_layer(self):
+        response = self.client.get('/reporting/geo_layer/unknown')
+        self.assertEquals(response.status_code, 404)
@@ -0,0 +1,67 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from equinox.versions import touch
+from reporting.grid import grid_matrix
+from reporting.models import AggregatedStatistics
+
+
+class GridTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        AggregatedStatistics.objects.create(country='DE', sector='C', co2_amount=4.0)
+        AggregatedStatistics.objects.create(country='FR', sector='C', co2_amount=None)
+        AggregatedStatistics.objects.create(country='AT', sector='F', co2_amount=9.0)
+
+    def test_matrix(self):
+        # the data version and the grid
+        with self.assertNumQueries(2):
+            grid = grid_matrix()
+        self.assertEquals(['C', 'F'], grid['sectors'])
+        self.assertEquals(['AT', 'DE', 'FR'], grid['countries'])
+        self.assertEquals([[0.0, 4.0, 0.0], [9.0, 0.0, 0.0]], grid['matrix'].tolist())
+        with self.assertNumQueries(1):
+            grid_matrix()
+
+    def test_invalidation(self):
+        grid_matrix()
+        entry = AggregatedStatistics.objects.get(country='FR')
+        entry.co2_amount = 1.0
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.save()
+        self.assertEquals(1.0, grid_matrix()['matrix'][0, 2])
+
+    def test_bulk_invalidation(self):
+        grid_matrix()
+        with self.captureOnCommitCallbacks(execute=True):
+            AggregatedStatistics.objects.bulk_create([AggregatedStatistics(country='IT', sector='F', co2_amount=2.0)])
+            touch(AggregatedStatistics)
+        self.assertEquals(['AT', 'DE', 'FR', 'IT'], grid_matrix()['countries'])
+
+    def test_view(self):
+        self.client.force_login(User.objects.create(username='test'))
+        response = self.client.get('/reporting/visualization_grid')
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, 'Manufacture')
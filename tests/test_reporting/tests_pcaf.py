@@ -0,0 +1,75 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from portfolio.Asset import Building
+from portfolio.Borrower import Borrower
+from portfolio.EmissionsSource import BuildingEmissionsSource
+from portfolio.Mortgage import Mortgage
+from portfolio.Portfolios import ProjectPortfolio
+from reference.EmissionFactor import BuildingEmissionFactor
+from reporting import pcaf
+
+
+class PCAFEngineTests(TestCase):
+
+    def setUp(self):
+        portfolio = ProjectPortfolio.objects.create(name='Mortgages')
+        borrower = Borrower.objects.create(counterparty_identifier='B1', portfolio_id=portfolio)
+        loan = Mortgage.objects.create(contract_identifier='L1', counterparty_identifier=borrower,
+                                       legal_balance=100)
+        ef1 = BuildingEmissionFactor.objects.create(Emission_factor=1.0, PCAF_data_quality_score=3)
+        ef2 = BuildingEmissionFactor.objects.create(Emission_factor=2.0, PCAF_data_quality_score=5)
+        b1 = Building.objects.create(loan_identifier=loan, initial_valuation_amount=200, building_area_m2=10)
+        b2 = Building.objects.create(loan_identifier=loan, initial_valuation_amount=0, building_area_m2=30)
+        BuildingEmissionsSource.objects.create(asset=b1, emissions_factor=ef1)
+        BuildingEmissionsSource.objects.create(asset=b1, emissions_factor=ef2)
+        BuildingEmissionsSource.objects.create(asset=b2, emissions_factor=ef1)
+
+    def test_attribution(self):
+        with self.assertNumQueries(1):
+            frame = pcaf.attribute(pcaf.source_frame())
+        self.assertEquals([0.5, 0.5], frame['attribution'].tolist()[:2])
+        self.assertEquals([5.0, 10.0], frame['financed_emissions'].tolist()[:2])
+        self.assertTrue(frame['attribution'].isna().iloc[2])
+
+    def test_aggregation(self):
+        frame = pcaf.attribute(pcaf.source_frame())
+        table = pcaf.aggregate(frame, 'borrower')
+        self.assertEquals(1, len(table))
+        row = table.iloc[0]
+        self.assertEquals(3, row['sources'])
+        self.assertEquals(100.0, row['balance'])
+        self.assertEquals(15.0, row['financed_emissions'])
+        self.assertAlmostEquals(11.0 / 3, row['data_quality'])
+        totals = pcaf.totals(frame)
+        self.assertEquals(1, totals['unattributed'])
+        self.assertEquals(150000.0, totals['intensity'])
+
+    def test_report(self):
+        self.client.force_login(User.objects.create(username='test'))
+        for level in ['source', 'loan', 'borrower', 'portfolio']:
+            response = self.client.get('/reporting/pcaf_mortgage_report', {'level': level})
+            self.assertEquals(response.status_code, 200)
+            self.assertContains(response, 'Mortgages' if level == 'portfolio' else 'B1' if level != 'loan' else 'L1')
+        response = self.client.get('/reporting/pcaf_mortgage_report', {'level': 'unknown'})
+        self.assertEquals(response.status_code, 404)
@@ -0,0 +1,100 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.test import TestCase
+
+from reference.EmissionIntensity import ReferenceIntensity
+from reporting.models import AggregatedStatistics, SummaryStatistics
+from reporting.rollup import rollup
+
+
+def cells(level):
+    return {(c.country.code, c.sector, c.year, c.currency): c.value_total for c in
+            AggregatedStatistics.objects.filter(level=level)}
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        SummaryStatistics.objects.create(country='DE', sector='C10', year=2020, currency='EUR', value_total=1.0)
+        SummaryStatistics.objects.create(country='DE', sector='C11', year=2021, currency='EUR', value_total=2.0)
+        SummaryStatistics.objects.create(country='DE', sector='C20', year=2021, currency='USD', value_total=4.0)
+        SummaryStatistics.objects.create(country='FR', sector='F41', year=2020, currency='EUR', value_total=8.0)
+        AggregatedStatistics.objects.all().delete()
+        rollup()
+
+    def test_levels(self):
+        self.assertEquals({('DE', 'C', None, None): 7.0, ('FR', 'F', None, None): 8.0}, cells('section'))
+        self.assertEquals({('DE', 'C1', None, None): 3.0, ('DE', 'C2', None, None): 4.0,
+                           ('FR', 'F4', None, None): 8.0}, cells('division'))
+        self.assertEquals({('DE', 'C', 2020, None): 1.0, ('DE', 'C', 2021, None): 6.0,
+                           ('FR', 'F', 2020, None): 8.0}, cells('section_year'))
+        self.assertEquals({('DE', 'C', None, 'EUR'): 3.0, ('DE', 'C', None, 'USD'): 4.0,
+                           ('FR', 'F', None, 'EUR'): 8.0}, cells('section_currency'))
+        self.assertEquals({'created': 0, 'updated': 0, 'deleted': 0}, rollup())
+
+    def test_save(self):
+        untouched = AggregatedStatistics.objects.get(level='section', country='FR')
+        with self.captureOnCommitCallbacks(execute=True):
+            SummaryStatistics.objects.create(country='DE', sector='C12', year=2022, currency='EUR', value_total=16.0)
+        self.assertEquals(23.0, cells('section')[('DE', 'C', None, None)])
+        self.assertEquals(19.0, cells('division')[('DE', 'C1', None, None)])
+        self.assertEquals(16.0, cells('section_year')[('DE', 'C', 2022, None)])
+        self.assertEquals(untouched.pk, AggregatedStatistics.objects.get(level='section', country='FR').pk)
+
+    def test_move(self):
+        entry = SummaryStatistics.objects.get(sector='F41')
+        entry.country = 'AT'
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.save()
+        self.assertEquals({('AT', 'F', None, None): 8.0, ('DE', 'C', None, None): 7.0}, cells('section'))
+
+    def test_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SummaryStatistics.objects.filter(sector='C20').delete()
+        self.assertEquals(3.0, cells('section')[('DE', 'C', None, None)])
+        self.assertNotIn(('DE', 'C2', None, None), cells('division'))
+        self.assertNotIn(('DE', 'C', None, 'USD'), cells('section_currency'))
+
+    def test_countries(self):
+        AggregatedStatistics.objects.filter(level='section').update(value_total=0.0)
+        result = rollup(countries=['FR'], levels=['section'])
+        self.assertEquals({'created': 0, 'updated': 1, 'deleted': 0}, result)
+        self.assertEquals({('DE', 'C', None, None): 0.0, ('FR', 'F', None, None): 8.0}, cells('section'))
+
+    def test_emissions(self):
+        ReferenceIntensity.objects.create(Sector='C', Region='DE', Value='0.5')
+        AggregatedStatistics.objects.update(co2_amount=99.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            SummaryStatistics.objects.create(country='DE', sector='C12', year=2022, currency='EUR', value_total=5.0)
+            SummaryStatistics.objects.create(country='DE', sector='C21', year=2022, currency='USD', value_total=6.0)
+            SummaryStatistics.objects.create(country='FR', sector='F42', year=2020, currency='EUR', value_total=1.0)
+
+        def co2_amount(**kwargs):
+            return AggregatedStatistics.objects.get(country='DE', sector='C', **kwargs).co2_amount
+
+        # EUR amounts only
+        self.assertEquals(4.0, co2_amount(level='section'))
+        self.assertEquals(2.5, co2_amount(level='section_year', year=2022))
+        self.assertEquals(99.0, co2_amount(level='section_year', year=2020))
+        self.assertEquals(4.0, co2_amount(level='section_currency', currency='EUR'))
+        self.assertIsNone(co2_amount(level='section_currency', currency='USD'))
+        # no matching intensity
+        self.assertIsNone(AggregatedStatistics.objects.get(level='section', country='FR').co2_amount)
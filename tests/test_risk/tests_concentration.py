@@ -0,0 +1,183 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+from portfolio.Portfolios import ProjectPortfolio, PortfolioTable
+from risk.concentration import tracker
+from risk.ghgMetrics.concentrationMetrics import Index
+
+
+class ConcentrationBootstrapTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = Index()
+        self.data = np.random.default_rng(0).lognormal(size=(4, 40))
+
+    def test_batch_matches_single(self):
+        for name, args in [('cr', (3,)), ('hhi', ()), ('gini', ()), ('shannon', ()), ('theil', ()),
+                           ('atkinson', (0.5,)), ('gei', (2,)), ('kolm', (0.1,))]:
+            batch = self.index.callBatchMethod(name, self.data, *args)
+            single = [self.index.callMethod(name, row, *args) for row in self.data]
+            np.testing.assert_allclose(batch, single)
+
+    def test_bootstrap_reproducible(self):
+        data = self.data[0]
+        first = self.index.bootstrap(data, samples=50, index='gini', random_state=1, chunk_size=7)
+        second = self.index.bootstrap(data, samples=50, index='gini', random_state=1, chunk_size=7, workers=2)
+        self.assertEquals(50, len(first))
+        np.testing.assert_array_equal(first, second)
+
+    def test_confidence_intervals(self):
+        data = self.data[0]
+        for method in ['percentile', 'bca']:
+            lower, value, upper = self.index.compute(data, ci=0.95, samples=200, index='hhi', method=method,
+                                                     random_state=1)
+            self.assertLessEqual(lower, upper)
+            self.assertAlmostEquals(self.index.hhi(data), value)
+        self.assertRaises(ValueError, self.index.compute, data, ci=0.95, samples=10, method='unknown')
+
+
+class ConcentrationSegmentedTests(SimpleTestCase):
+
+    def test_segmented_matches_single(self):
+        index = Index()
+        rng = np.random.default_rng(0)
+        values = rng.lognormal(size=300)
+        groups = rng.choice(['DE', 'FR', 'IT'], size=300)
+        specs = ['hhi', ('cr', 5), 'gini', 'shannon', ('atkinson', 0.5), 'theil', ('kolm', 0.1)]
+        table = index.segmented(values, groups, specs).set_index(['group', 'index'])['value']
+        for spec in specs:
+            name, args = (spec, ()) if isinstance(spec, str) else (spec[0], spec[1:])
+            label = name if not args else '%s(%s)' % (name, ', '.join(map(str, args)))
+            for group in ['DE', 'FR', 'IT']:
+                expected = index.callMethod(name, values[groups == group], *args)
+                self.assertAlmostEquals(expected, table[(group, label)])
+
+    def test_segmented_small_groups(self):
+        table = Index().segmented([1.0, 2.0, 3.0], ['a', 'b', 'b'], [('cr', 2)])
+        self.assertTrue(np.isnan(table['value'][0]))
+        self.assertAlmostEquals(1.0, table['value'][1])
+
+
+class EllisonGlaeserTests(SimpleTestCase):
+
+    def test_labels_and_values(self):
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame({'Exposure': rng.lognormal(size=200),
+                             'Area': rng.choice(['DE1', 'DE2', 'FR1', 'IT1'], size=200),
+                             'Industry': rng.choice(['C10', 'F41'], size=200)})
+        result = Index().ellison_glaeser(data)
+        self.assertEquals(['C10', 'F41'], list(result.index))
+
+        # dense reference calculation
+        xa = data.groupby('Area')['Exposure'].sum()
+        xa = xa / xa.sum()
+        hhi_g = np.square(xa).sum()
+        for industry, group in data.groupby('Industry'):
+            total = group['Exposure'].sum()
+            hhi_i = np.square(group['Exposure'] / total).sum()
+            shares = group.groupby('Area')['Exposure'].sum().reindex(xa.index, fill_value=0) / total
+            expected = np.square(shares - xa).sum() / (1 - hhi_g) / (1 - hhi_i)
+            self.assertAlmostEquals(expected, result[industry])
+
+
+class ConcentrationTrackerTests(TestCase):
+
+    def setUp(self):
+        self.portfolio = ProjectPortfolio.objects.create(name='Test')
+        self.rows = [PortfolioTable.objects.create(portfolio_id=self.portfolio, Obligor_ID=obligor, EAD=ead, Sector=1)
+                     for obligor, ead in [('A', 10.0), ('B', 20.0), ('C', 30.0), ('A', 40.0)]]
+        tracker.loaded_at = None
+
+    def assertTracks(self, exposures):
+        index = Index()
+        exposures = np.array(exposures)
+        snapshot = tracker.snapshot(self.portfolio.pk, 'Obligor_ID', n=2)
+        self.assertAlmostEquals(index.hhi(exposures), snapshot['hhi'])
+        self.assertAlmostEquals(index.cr(exposures, 2), snapshot['top_n'])
+        self.assertAlmostEquals(index.shannon(exposures), snapshot['shannon'])
+
+    def test_incremental_updates(self):
+        self.assertTracks([50.0, 20.0, 30.0])
+        with self.assertNumQueries(0):
+            tracker.snapshot(self.portfolio.pk)
+        self.rows[1].EAD = 5.0
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rows[1].save()
+            PortfolioTable.objects.create(portfolio_id=self.portfolio, Obligor_ID='D', EAD=25.0, Sector=1)
+            self.rows[2].delete()
+        with self.assertNumQueries(0):
+            self.assertTracks([50.0, 5.0, 25.0])
+        self.assertEquals(1, tracker.snapshot(self.portfolio.pk, 'Sector')['items'])
+
+    def test_reconcile(self):
+        tracker.snapshot(self.portfolio.pk)
+        # changes that bypass the signals are picked up by the reconcile
+        PortfolioTable.objects.filter(Obligor_ID='C').update(EAD=0.0)
+        tracker.reconcile()
+        self.assertTracks([50.0, 20.0])
+
+    def test_rollback(self):
+        tracker.snapshot(self.portfolio.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.rows[1].EAD = 500.0
+                self.rows[1].save()
+                transaction.set_rollback(True)
+        self.assertTracks([50.0, 20.0, 30.0])
+
+    def test_top_n_after_updates(self):
+        tracker.snapshot(self.portfolio.pk)
+        for ead in [5.0, 60.0, 15.0, 35.0]:
+            self.rows[1].EAD = ead
+            with self.captureOnCommitCallbacks(execute=True):
+                self.rows[1].save()
+        self.assertTracks([50.0, 35.0, 30.0])
+        self.assertAlmostEquals(50.0 / 115.0, tracker.snapshot(self.portfolio.pk, n=1)['top_n'])
+
+    def test_reconcile_command(self):
+        out = StringIO()
+        call_command('reconcile_concentration', '--dimension', 'Obligor_ID', stdout=out)
+        self.assertIn('Obligor_ID items: 3', out.getvalue())
+
+    def test_snapshot_endpoint(self):
+        user = User.objects.create(username='test')
+        self.client.force_login(user)
+        url = '/api/portfolio_data/concentration/%d/' % self.portfolio.pk
+        response = self.client.get(url, {'dimension': 'Obligor_ID', 'n': 2})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(3, response.json()['items'])
+        # forced reconciles are restricted to staff
+        response = self.client.get(url, {'reconcile': 1})
+        self.assertEquals(response.status_code, 403)
+        user.is_staff = True
+        user.save()
+        response = self.client.get(url, {'reconcile': 1})
+        self.assertEquals(response.status_code, 200)
+        response = self.client.get(url, {'dimension': 'unknown'})
+        self.assertEquals(response.status_code, 400)
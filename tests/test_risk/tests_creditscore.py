@@ -0,0 +1,126 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from risk.openRiskScore.creditscore_library import SME_FIELDS, calculate_sme_z_score, fetch_columns, get_all_data
+
+
+class PortfolioStandIn(BaseHTTPRequestHandler):
+    """
+    Local stand-in for a paginated (Eve style) portfolio data endpoint
+
+    Serves server.total synthetic obligors in pages of server.page_size, fails the first request
+    of each page in server.flaky with a 503 and waits server.latency seconds per request. The
+    largest number of requests in flight at once is recorded in server.max_in_flight
+
+    """
+
+    def do_GET(self):
+        server = self.server
+        page = int(parse_qs(urlparse(self.path).query).get('page', ['1'])[0])
+        with server.lock:
+            server.requests += 1
+            fail = page in server.flaky
+            server.flaky.discard(page)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.latency)
+        with server.lock:
+            server.in_flight -= 1
+        if fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        pages = -(-server.total // server.page_size)
+        start = (page - 1) * server.page_size
+        items = [dict({'client_id': 'C%d' % i}, **{field: float(i + k + 1) for k, field in enumerate(SME_FIELDS)})
+                 for i in range(start, min(start + server.page_size, server.total))]
+        links = {'last': {'href': 'portfolio?page=%d' % pages}}
+        if page < pages:
+            links['next'] = {'href': 'portfolio?page=%d' % (page + 1)}
+        body = json.dumps({'_items': items, '_links': links,
+                           '_meta': {'page': page, 'max_results': server.page_size, 'total': server.total}})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    # a backlog for concurrent clients (the default of 5 drops connections)
+    request_queue_size = 64
+
+
+class PortfolioFetcherTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = StandInServer(('127.0.0.1', 0), PortfolioStandIn)
+        self.server.total = 1000
+        self.server.page_size = 25
+        self.server.latency = 0.0
+        self.server.flaky = set()
+        self.server.requests = 0
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.lock = threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/portfolio' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_columns(self):
+        columns = fetch_columns(self.url, SME_FIELDS)
+        self.assertEquals(1000, len(columns['client_id']))
+        self.assertEquals('C999', columns['client_id'][-1])
+        np.testing.assert_array_equal(np.arange(1000) + 1.0, columns['Ebitda'])
+        self.assertEquals(40, self.server.requests)
+
+    def test_retry(self):
+        self.server.flaky = {1, 7}
+        pages = get_all_data(self.url)
+        self.assertEquals(40, len(pages))
+        self.assertEquals(42, self.server.requests)
+
+    def test_z_score(self):
+        result = calculate_sme_z_score(self.url, {'weights': [0.0, 1.0, 0.0, 0.0, 0.0, 0.0]})['result']
+        self.assertEquals(1000, len(result))
+        self.assertAlmostEquals(1.0 / (1.0 + np.exp(0.5)), result[0])
+
+    def test_concurrency(self):
+        # pages overlap in flight (see the benchmark_fetch command for timings)
+        self.server.latency = 0.01
+        fetch_columns(self.url, SME_FIELDS, workers=1)
+        self.assertEquals(1, self.server.max_in_flight)
+        fetch_columns(self.url, SME_FIELDS, workers=8)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 8)
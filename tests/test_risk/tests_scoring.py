@@ -0,0 +1,80 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from scipy.special import expit
+
+from portfolio.Borrower import Borrower
+from portfolio.Portfolios import ProjectPortfolio
+from risk.scoring import score_borrowers
+
+WEIGHTS = [0.5, 1.0, -1.0, 2.0, 0.5, 0.1]
+
+
+class SMEScoringTests(TestCase):
+
+    def setUp(self):
+        self.portfolio = ProjectPortfolio.objects.create(name='SME')
+        for i in range(1, 6):
+            Borrower.objects.create(counterparty_identifier='B%d' % i, portfolio_id=self.portfolio, annual_ebit=10 * i,
+                                    total_assets=100, total_debt=20, net_assets=40, retained_earnings=5,
+                                    cash_and_cash_equivalent_items=10, interest_expenses=2)
+        # missing inputs
+        Borrower.objects.create(counterparty_identifier='B6', portfolio_id=self.portfolio)
+
+    def test_score_borrowers(self):
+        result = score_borrowers(WEIGHTS, chunk_size=2)
+        self.assertEquals({'total': 6, 'scored': 5, 'unscored': 1}, result)
+        borrower = Borrower.objects.get(counterparty_identifier='B1')
+        x = 0.5 + 1.0 * 0.1 - 1.0 * 0.5 + 2.0 * 0.05 + 0.5 * 0.1 + 0.1 * 5
+        self.assertAlmostEquals(expit(-x), borrower.probability_of_default)
+        self.assertIsNone(Borrower.objects.get(counterparty_identifier='B6').probability_of_default)
+
+    def test_dry_run(self):
+        score_borrowers(WEIGHTS, dry_run=True)
+        self.assertFalse(Borrower.objects.filter(probability_of_default__isnull=False).exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command('score_sme', weights=WEIGHTS, portfolio=self.portfolio.pk, chunk_size=4, stdout=out)
+        self.assertIn('scored: 5 unscored: 1', out.getvalue())
+
+    def test_api(self):
+        response = self.client.post('/api/portfolio_data/sme_scores/', {'weights': WEIGHTS},
+                                    content_type='application/json')
+        self.assertIn(response.status_code, [401, 403])
+        self.client.force_login(User.objects.create(username='test'))
+        # whole book scoring is left to the score_sme command
+        response = self.client.post('/api/portfolio_data/sme_scores/', {'weights': WEIGHTS},
+                                    content_type='application/json')
+        self.assertEquals(response.status_code, 400)
+        response = self.client.post('/api/portfolio_data/sme_scores/',
+                                    {'weights': WEIGHTS, 'portfolio': self.portfolio.pk},
+                                    content_type='application/json')
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(5, response.json()['scored'])
+        response = self.client.post('/api/portfolio_data/sme_scores/',
+                                    {'weights': [1.0], 'portfolio': self.portfolio.pk},
+                                    content_type='application/json')
+        self.assertEquals(response.status_code, 400)
@@ -0,0 +1,52 @@
+# Copyright (c) 2020 - 2024 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from django.db import transaction
+from django.test import TestCase
+
+from equinox.versions import table_version, touch
+from start.models import DataVersion, ORMKeyword
+
+
+class DataVersionTests(TestCase):
+
+    def test_str(self):
+        DataVersion.objects.create(label='test')
+        instance = DataVersion.objects.get()
+        self.assertEquals("test", str(instance))
+
+    def test_touch(self):
+        with self.assertNumQueries(1):
+            self.assertEquals('0-0', table_version(ORMKeyword, DataVersion))
+        with self.captureOnCommitCallbacks(execute=True):
+            touch(ORMKeyword)
+            touch(ORMKeyword)
+        self.assertEquals('1-0', table_version(ORMKeyword, DataVersion))
+        with self.captureOnCommitCallbacks(execute=True):
+            touch(ORMKeyword, DataVersion)
+        self.assertEquals('2-1', table_version(ORMKeyword, DataVersion))
+
+    def test_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                touch(ORMKeyword)
+                transaction.set_rollback(True)
+        self.assertEquals('0', table_version(ORMKeyword))